@@ -0,0 +1,148 @@
+# api/asincrono.py
+"""
+Lecturas de inventario como vistas asíncronas, para servir bajo ASGI
+(``sistema.asgi:application``, ej. ``uvicorn sistema.asgi:application``).
+
+Bajo WSGI cada request ocupa un hilo mientras espera a la caché o a la base;
+aquí esas esperas son ``await`` y un worker atiende muchas conexiones a la vez.
+Por eso nada en estas vistas usa la API síncrona: ORM con ``aget``/``acount``/
+``async for``, caché con ``aget``/``aget_many`` (``sistema/versiones.py``) y el
+usuario con ``request.auser()``.
+
+Autenticación: token de DRF (``Authorization: Token <clave>``, como el resto de
+la API) o la sesión del navegador (para el AJAX del sitio).
+
+Todas responden ETag y 304 con los mismos sellos de versión que sus pares
+síncronas, así que se invalidan por las mismas vías.
+
+Comparación de rendimiento: ``manage.py prueba_carga``.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.authtoken.models import Token
+
+from inventario import consultas
+from inventario.models import StockBodega
+from productos.models import Producto
+from proveedores.models import Proveedor
+from sistema import condicional, contadores
+
+
+# ----------------------------------------------------------
+# AUTENTICACIÓN Y RESPUESTAS
+# ----------------------------------------------------------
+async def _usuario(request):
+    cabecera = request.headers.get('Authorization', '')
+    tipo, _, clave = cabecera.partition(' ')
+    if tipo.lower() == 'token' and clave:
+        try:
+            token = await Token.objects.select_related('user').aget(key=clave.strip())
+        except Token.DoesNotExist:
+            return None
+        return token.user if token.user.is_active else None
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def autenticado(permiso=None):
+    """Exige usuario (401) y, si se indica, un permiso (403)."""
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            user = await _usuario(request)
+            if user is None:
+                return JsonResponse({'error': 'No autenticado'}, status=401)
+            # has_perm puede consultar la base la primera vez (instantánea fría)
+            if permiso and not await sync_to_async(user.has_perm)(permiso):
+                return JsonResponse({'error': 'No autorizado'}, status=403)
+            request.user = user
+            return await vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _responder(request, etag, datos):
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(datos, safe=False)
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ----------------------------------------------------------
+# VISTAS
+# ----------------------------------------------------------
+@autenticado()
+async def lotes_por_producto(request, producto_id):
+    version, lotes = await consultas.alotes_disponibles(producto_id)
+    # Lista vacía: solo entonces se distingue "sin lotes" de "no existe"
+    if not lotes and not await Producto.objects.filter(pk=producto_id).aexists():
+        return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+    return _responder(request, f"lp-{producto_id}-{version}", lotes)
+
+
+@autenticado()
+async def productos_por_proveedor(request, proveedor_id):
+    version, productos = await consultas.aproductos_de_proveedor(proveedor_id)
+    if not productos and not await Proveedor.objects.filter(pk=proveedor_id).aexists():
+        return JsonResponse({'error': 'Proveedor no encontrado'}, status=404)
+    return _responder(request, f"pp-{proveedor_id}-{version}", productos)
+
+
+@autenticado()
+async def stock_producto(request, producto_id):
+    """Stock total y por bodega de un producto."""
+    # Los sellos se leen antes que la base (ver versiones.cacheado)
+    # bodegas: el payload incluye código y nombre de cada bodega
+    sellos = await condicional.asellos('productos', 'inventario', 'bodegas')
+    etag = f"st-{producto_id}-{'.'.join(sellos)}"
+
+    # Revalidación sin tocar la base
+    response = get_conditional_response(request, etag=quote_etag(etag))
+    if response is not None:
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    try:
+        producto = await Producto.objects.only(
+            'sku', 'nombre', 'stock_actual', 'stock_minimo', 'bajo_stock'
+        ).aget(pk=producto_id)
+    except Producto.DoesNotExist:
+        return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+
+    bodegas = [
+        {'bodega': codigo, 'nombre': nombre, 'cantidad': float(cantidad)}
+        async for codigo, nombre, cantidad in StockBodega.objects.filter(producto_id=producto_id)
+        .order_by('bodega__codigo')
+        .values_list('bodega__codigo', 'bodega__nombre', 'cantidad')
+    ]
+    return _responder(request, etag, {
+        'id': producto.pk,
+        'sku': producto.sku,
+        'nombre': producto.nombre,
+        'stock_actual': float(producto.stock_actual),
+        'stock_minimo': float(producto.stock_minimo),
+        'bajo_stock': producto.bajo_stock,
+        'bodegas': bodegas,
+    })
+
+
+@autenticado('sistema.ver_grafica')
+async def dashboard(request):
+    """Mismo JSON que el AJAX del dashboard (``sistema.views.dashboard``)."""
+    totales = await contadores.aobtener()
+    categorias = ['Productos', 'Proveedores', 'Usuarios', 'Inventario']
+    response = JsonResponse({
+        'categorias': categorias,
+        'data_categorias': [totales['productos'], totales['proveedores'],
+                            totales['usuarios'], totales['inventario']],
+    })
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,195 @@
+# api/carga.py
+"""
+Carga masiva del catálogo de productos por SKU (``POST /api/productos/bulk/``).
+
+En vez de un ``POST /api/productos/`` por ítem (validación + chequeos de
+duplicado + INSERT por fila):
+
+- los SKU y EAN existentes se leen por bloques, una consulta por bloque,
+- las filas se validan en memoria con ``ProductoCargaSerializer`` (una sola
+  instancia por lote, sin consultas),
+- se escribe con un ``bulk_create`` que inserta o actualiza, por bloques:
+  ``ON CONFLICT (sku) DO UPDATE`` en SQLite y ``ON DUPLICATE KEY UPDATE`` en
+  MySQL (ver ``utils/upsert.py``). Como en MySQL salta con cualquier clave
+  única, los EAN/UPC que chocarían con otro producto se rechazan antes.
+
+Una fila de un SKU existente solo cambia los campos que trae; una fila nueva
+debe traer los obligatorios. Si alguna fila es inválida no se escribe nada.
+
+``bulk_create`` no dispara señales: índice de búsqueda, contadores, sellos de
+los listados, consultas AJAX y auditoría se actualizan aquí, una vez por lote.
+"""
+from django.db import transaction
+
+from api.serializers import ProductoCargaSerializer
+from inventario import consultas, reposicion
+from inventario.models import MovimientoInventario
+from productos.models import Producto
+from proveedores.models import ProductoProveedor
+from sistema import auditoria, busqueda, condicional, contadores
+from utils.upsert import opciones_upsert
+
+
+TAMANO_BLOQUE = 500
+MODOS = ('upsert', 'crear', 'actualizar')
+
+# Columnas que una carga puede modificar en un producto existente
+# (bajo_stock se deriva del stock: se recalcula después de escribir)
+CAMPOS_ACTUALIZABLES = [
+    f.name for f in Producto._meta.concrete_fields
+    if f.name not in ('id', 'sku', 'stock_actual', 'bajo_stock')
+]
+
+
+def _bloques(valores, tamano=TAMANO_BLOQUE):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def _texto(valor):
+    return str(valor).strip() if valor not in (None, '') else ''
+
+
+def _mensajes(errores):
+    """Aplana los errores de DRF de una fila: ``["campo: mensaje", ...]``."""
+    mensajes = []
+    for campo, lista in errores.items():
+        for mensaje in (lista if isinstance(lista, list) else [lista]):
+            mensajes.append(str(mensaje) if campo == 'non_field_errors' else f"{campo}: {mensaje}")
+    return mensajes
+
+
+def _validar(filas, indices, parcial, problemas):
+    """Valida ``filas[i]`` para ``i`` en ``indices``; devuelve {i: datos validados}."""
+    if not indices:
+        return {}
+    serializer = ProductoCargaSerializer(data=[filas[i] for i in indices], many=True, partial=parcial)
+    if serializer.is_valid():
+        return dict(zip(indices, serializer.validated_data))
+    errores = serializer.errors
+    # DRF >= 3.15: {posición: errores} solo de las filas con error; antes, una lista
+    por_posicion = errores.items() if isinstance(errores, dict) else enumerate(errores)
+    for posicion, errores_fila in por_posicion:
+        if errores_fila:
+            problemas[indices[posicion]].extend(_mensajes(errores_fila))
+    return {}
+
+
+def cargar_productos(filas, usuario=None, modo='upsert'):
+    """
+    Crea o actualiza productos por SKU.
+
+    ``modo``: ``upsert`` (por defecto), ``crear`` (un SKU existente es error) o
+    ``actualizar`` (un SKU inexistente es error).
+
+    Devuelve ``(resumen, errores)``; ``resumen`` es
+    ``{"creados": n, "actualizados": n}``. Si hay errores no se escribe nada;
+    cada error es ``{"fila": indice, "errores": [...]}``.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo inválido: {modo!r}")
+    if not filas:
+        return {"creados": 0, "actualizados": 0}, []
+
+    skus = [_texto(f.get('sku')) for f in filas]
+    eans = [_texto(f.get('ean_upc')) for f in filas]
+    problemas = {i: [] for i in range(len(filas))}
+
+    with transaction.atomic():
+        # ---- Lo existente: una consulta por bloque ----
+        existentes = {}
+        for bloque in _bloques({s for s in skus if s}):
+            for producto in Producto.objects.select_for_update().filter(sku__in=bloque).values():
+                existentes[producto['sku']] = producto
+        duenos_ean = {}
+        for bloque in _bloques({e for e in eans if e}):
+            duenos_ean.update(Producto.objects.filter(ean_upc__in=bloque).values_list('ean_upc', 'sku'))
+
+        # ---- Duplicados y modo, en memoria ----
+        vistos_sku, vistos_ean = {}, {}
+        nuevos, actualizados = [], []
+        for i, (sku, ean) in enumerate(zip(skus, eans)):
+            if not sku:
+                problemas[i].append("El campo SKU es obligatorio.")
+                continue
+            if sku in vistos_sku:
+                problemas[i].append(f"SKU repetido en la carga (fila {vistos_sku[sku]}).")
+                continue
+            vistos_sku[sku] = i
+
+            if sku in existentes:
+                if modo == 'crear':
+                    problemas[i].append("Ya existe un producto con este SKU.")
+                actualizados.append(i)
+            else:
+                if modo == 'actualizar':
+                    problemas[i].append("Producto inexistente.")
+                nuevos.append(i)
+
+            if ean:
+                if duenos_ean.get(ean, sku) != sku:
+                    problemas[i].append("Ya existe un producto con este EAN/UPC.")
+                elif ean in vistos_ean:
+                    problemas[i].append(f"EAN/UPC repetido en la carga (fila {vistos_ean[ean]}).")
+                vistos_ean[ean] = i
+
+        # ---- Validación de campos (sin consultas) ----
+        validados = _validar(filas, nuevos, False, problemas)
+        validados.update(_validar(filas, actualizados, True, problemas))
+
+        errores = [{'fila': i, 'errores': p} for i, p in problemas.items() if p]
+        if errores:
+            transaction.set_rollback(True)
+            return {"creados": 0, "actualizados": 0}, errores
+
+        # ---- Escritura ----
+        objetos = []
+        renombrados = set()
+        for i in nuevos + actualizados:
+            datos = validados[i]
+            if datos.get('ean_upc') == '':
+                datos['ean_upc'] = None  # único: varios '' chocarían entre sí
+            anterior = existentes.get(skus[i])
+            if anterior is not None:
+                if 'nombre' in datos and datos['nombre'] != anterior['nombre']:
+                    renombrados.add(anterior['id'])
+                datos = {c: anterior[c] for c in CAMPOS_ACTUALIZABLES} | datos
+            producto = Producto(**datos)
+            if producto.punto_reorden is None:
+                producto.punto_reorden = producto.stock_minimo  # como Producto.save()
+            objetos.append(producto)
+
+        Producto.objects.bulk_create(
+            objetos,
+            batch_size=TAMANO_BLOQUE,
+            **opciones_upsert(['sku'], CAMPOS_ACTUALIZABLES),
+        )
+
+        # ---- Lo que harían las señales de save(), una vez por lote ----
+        # (por SKU: MySQL no devuelve las PK de bulk_create)
+        for bloque in _bloques(vistos_sku):
+            # El umbral (punto_reorden / stock_minimo) pudo cambiar
+            reposicion.recalcular(Producto.objects.filter(sku__in=bloque))
+            busqueda.indexar(Producto.objects.filter(sku__in=bloque))
+        for bloque in _bloques(renombrados):
+            # Los movimientos copian el nombre del producto en su documento
+            busqueda.indexar(MovimientoInventario.objects.filter(producto_id__in=bloque))
+        if len(renombrados) > TAMANO_BLOQUE:
+            consultas.invalidar_todo()
+        elif renombrados:
+            # Nombre y SKU aparecen en las consultas AJAX (ver inventario/signals.py)
+            consultas.tocar_lotes(*renombrados)
+            consultas.tocar_proveedores(*ProductoProveedor.objects.filter(
+                producto_id__in=renombrados
+            ).values_list('proveedor_id', flat=True))
+        contadores.sumar('productos', len(nuevos))
+        condicional.tocar_modelo(Producto)
+        if usuario is not None and usuario.is_authenticated:
+            auditoria.registrar(
+                usuario.pk,
+                f"Producto creado/modificado: {len(nuevos)} creados y {len(actualizados)} actualizados en lote",
+                'Producto',
+            )
+
+    return {"creados": len(nuevos), "actualizados": len(actualizados)}, []
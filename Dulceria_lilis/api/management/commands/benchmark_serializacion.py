@@ -0,0 +1,106 @@
+# api/management/commands/benchmark_serializacion.py
+"""
+Micro-benchmark del listado de productos: ``ProductoSerializer`` +
+``JSONRenderer`` (camino normal de DRF) contra ``api/rapido.py``
+(``values_list`` + convertidores precompilados + orjson).
+
+Mide la consulta más la serialización de todas las filas, verifica que ambos
+caminos produzcan el mismo JSON (byte a byte) y muestra la mediana de cada uno.
+
+Si hay menos productos que ``--productos`` se generan los que faltan dentro
+de una transacción que se revierte al final (la base queda como estaba).
+
+    python manage.py benchmark_serializacion
+    python manage.py benchmark_serializacion --productos 10000 --repeticiones 7
+    python manage.py benchmark_serializacion --campos sku,nombre,stock_actual
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api import rapido
+from api.serializers import ProductoSerializer
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Compara ProductoSerializer contra el listado rápido (values_list + orjson)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000, help='Filas a serializar')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--campos', default='', help='Subconjunto de campos, como ?fields=')
+
+    def handle(self, *args, **options):
+        if options['productos'] <= 0 or options['repeticiones'] <= 0:
+            raise CommandError('--productos y --repeticiones deben ser mayores que 0')
+        campos = [c.strip() for c in options['campos'].split(',') if c.strip()] or None
+
+        with transaction.atomic():
+            faltan = options['productos'] - Producto.objects.count()
+            if faltan > 0:
+                self.stdout.write(f'🧪 Generando {faltan} productos temporales...')
+                self.generar(faltan)
+            try:
+                self.comparar(options['productos'], options['repeticiones'], campos)
+            finally:
+                transaction.set_rollback(True)
+
+    def generar(self, cantidad):
+        sufijo = f'{time.time_ns():x}'
+        Producto.objects.bulk_create([
+            Producto(
+                sku=f'BENCH-{sufijo}-{i}',
+                nombre=f'Producto de prueba {i}',
+                descripcion='Descripción de prueba ' * 5,
+                categoria=random.choice(['Chocolates', 'Caramelos', 'Bebidas', 'Snacks']),
+                marca=random.choice(['Lilis', 'Costa', 'Ambrosoli', None]),
+                costo_estandar=Decimal(random.randint(100, 5000)),
+                precio_venta=Decimal(random.randint(200, 9000)),
+                stock_minimo=Decimal(10),
+                punto_reorden=Decimal(15),
+                stock_actual=Decimal(random.randint(0, 500)),
+            )
+            for i in range(cantidad)
+        ], batch_size=2000)
+
+    def comparar(self, cantidad, repeticiones, campos):
+        queryset = Producto.objects.order_by('nombre', 'id')[:cantidad]
+        contexto = {'campos': campos}
+        serializer = ProductoSerializer(context=contexto)
+        plan = rapido.compilar(serializer)
+        if plan is None:
+            raise CommandError('ProductoSerializer tiene campos no soportados por el listado rápido')
+
+        def drf():
+            consulta = queryset.only(*campos) if campos else queryset
+            return JSONRenderer().render(ProductoSerializer(consulta, many=True, context=contexto).data)
+
+        def rapida():
+            return rapido.a_json(plan.convertir(queryset.values_list(*plan.columnas)))
+
+        if drf() != rapida():
+            raise CommandError('❌ Los dos caminos no producen el mismo JSON')
+
+        resultados = {}
+        for nombre, funcion in (('ProductoSerializer', drf), ('rapido', rapida)):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                contenido = funcion()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = statistics.median(tiempos)
+            self.stdout.write(
+                f'  {nombre:<20} {resultados[nombre]:>9.1f} ms   {len(contenido) / 1024:>8.1f} KB'
+            )
+
+        motor = 'orjson' if rapido.orjson else 'JSONRenderer'
+        mejora = resultados['ProductoSerializer'] / resultados['rapido']
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {cantidad} productos, mismo JSON; rápido ({motor}) x{mejora:.1f}'
+        ))
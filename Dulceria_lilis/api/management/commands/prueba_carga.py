@@ -0,0 +1,177 @@
+# api/management/commands/prueba_carga.py
+"""
+Prueba de carga HTTP para comparar las lecturas síncronas (WSGI) con las
+asíncronas de ``api/asincrono.py`` (ASGI) bajo concurrencia.
+
+No depende de herramientas externas: un cliente HTTP/1.1 mínimo sobre
+asyncio abre ``--concurrencia`` conexiones keep-alive y reparte entre ellas
+``--peticiones`` GET a cada URL.
+
+Levantar ambos servidores con la misma base y la misma cantidad de workers, ej.:
+
+    gunicorn sistema.wsgi:application -w 2 -b 127.0.0.1:8000
+    uvicorn  sistema.asgi:application --workers 2 --port 8001
+
+y luego:
+
+    python manage.py prueba_carga --usuario admin -c 100 -n 5000 \\
+        http://127.0.0.1:8000/inventario/lotes-por-producto/1/ \\
+        http://127.0.0.1:8001/api/async/lotes-por-producto/1/
+
+Con ``--usuario`` cada request lleva el token DRF del usuario y una sesión
+recién creada, así sirven tanto las vistas del sitio como las de la API.
+"""
+import asyncio
+import statistics
+import time
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+
+# ----------------------------------------------------------
+# CLIENTE HTTP MÍNIMO
+# ----------------------------------------------------------
+async def _leer_respuesta(reader):
+    """Devuelve ``(status, mantener_conexion)`` tras consumir el cuerpo."""
+    linea = await reader.readline()
+    if not linea:
+        raise ConnectionError("conexión cerrada por el servidor")
+    status = int(linea.split()[1])
+
+    cabeceras = {}
+    while True:
+        linea = await reader.readline()
+        if linea in (b'\r\n', b'\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        cabeceras[nombre.strip().lower()] = valor.strip()
+
+    if cabeceras.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            tamano = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(tamano + 2)  # datos + CRLF
+            if tamano == 0:
+                break
+        mantener = True
+    elif 'content-length' in cabeceras:
+        await reader.readexactly(int(cabeceras['content-length']))
+        mantener = True
+    else:
+        await reader.read()  # cuerpo hasta el cierre
+        mantener = False
+
+    if cabeceras.get('connection', '').lower() == 'close':
+        mantener = False
+    return status, mantener
+
+
+async def _trabajador(host, puerto, peticion, pendientes, latencias, estados):
+    conexion = None
+    while pendientes[0] > 0:
+        pendientes[0] -= 1
+        if conexion is None:
+            conexion = await asyncio.open_connection(host, puerto)
+        reader, writer = conexion
+        inicio = time.perf_counter()
+        try:
+            writer.write(peticion)
+            await writer.drain()
+            status, mantener = await _leer_respuesta(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            status, mantener = 0, False
+        latencias.append(time.perf_counter() - inicio)
+        estados[status] = estados.get(status, 0) + 1
+        if not mantener:
+            writer.close()
+            conexion = None
+    if conexion is not None:
+        conexion[1].close()
+
+
+async def _cargar(url, cabeceras, concurrencia, peticiones):
+    partes = urlsplit(url)
+    if partes.scheme != 'http':
+        raise CommandError(f"Solo se admite http:// ({url})")
+    host, puerto = partes.hostname, partes.port or 80
+    ruta = partes.path + (f'?{partes.query}' if partes.query else '')
+
+    lineas = [f'GET {ruta or "/"} HTTP/1.1', f'Host: {partes.netloc}', 'Accept: application/json']
+    lineas += [f'{k}: {v}' for k, v in cabeceras.items()]
+    peticion = ('\r\n'.join(lineas) + '\r\n\r\n').encode('latin-1')
+
+    pendientes, latencias, estados = [peticiones], [], {}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        _trabajador(host, puerto, peticion, pendientes, latencias, estados)
+        for _ in range(concurrencia)
+    ))
+    return time.perf_counter() - inicio, latencias, estados
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga: req/s y latencias p50/p99 de una o más URLs bajo concurrencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs a comparar (http://host:puerto/ruta)')
+        parser.add_argument('-c', '--concurrencia', type=int, default=50, help='Conexiones simultáneas')
+        parser.add_argument('-n', '--peticiones', type=int, default=2000, help='Requests por URL')
+        parser.add_argument('--calentamiento', type=int, default=50,
+                            help='Requests previos (no medidos) por URL')
+        parser.add_argument('--usuario', help='Autentica con token DRF y sesión de este usuario')
+
+    def handle(self, *args, **options):
+        if options['concurrencia'] <= 0 or options['peticiones'] <= 0:
+            raise CommandError("--concurrencia y --peticiones deben ser mayores que 0")
+
+        cabeceras = self.credenciales(options['usuario']) if options['usuario'] else {}
+        resultados = []
+        for url in options['urls']:
+            if options['calentamiento']:
+                asyncio.run(_cargar(url, cabeceras, min(options['concurrencia'], options['calentamiento']),
+                                    options['calentamiento']))
+            self.stdout.write(f"⏱️  {url} (c={options['concurrencia']}, n={options['peticiones']})")
+            duracion, latencias, estados = asyncio.run(
+                _cargar(url, cabeceras, options['concurrencia'], options['peticiones'])
+            )
+            resultados.append((url, duracion, sorted(latencias), estados))
+
+        self.stdout.write(self.style.SUCCESS('\n=== RESUMEN ==='))
+        self.stdout.write(f"  {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'media ms':>9}  estados  url")
+        for url, duracion, latencias, estados in resultados:
+            self.stdout.write(
+                f"  {len(latencias) / duracion:>9.1f}"
+                f" {_percentil(latencias, 0.50) * 1000:>9.2f}"
+                f" {_percentil(latencias, 0.99) * 1000:>9.2f}"
+                f" {statistics.fmean(latencias) * 1000:>9.2f}"
+                f"  {dict(sorted(estados.items()))}  {url}"
+            )
+            errores = sum(n for s, n in estados.items() if not 200 <= s < 400)
+            if errores:
+                self.stdout.write(self.style.WARNING(f"  ⚠️  {errores} respuestas con error en {url}"))
+
+    def credenciales(self, username):
+        """Token DRF y cookie de sesión para ``username``."""
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario '{username}'")
+
+        token, _ = Token.objects.get_or_create(user=user)
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[-1]
+        sesion[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        sesion.create()
+        return {
+            'Authorization': f'Token {token.key}',
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={sesion.session_key}',
+        }
@@ -0,0 +1,38 @@
+# api/pagination.py
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class ProductoCursorPagination(CursorPagination):
+    """
+    Paginación por cursor del listado de productos: cada página es un rango
+    sobre un índice (``WHERE nombre > ... ORDER BY nombre LIMIT n``), sin
+    ``COUNT(*)`` ni ``OFFSET``, así que cuesta lo mismo la página 1 que la 400.
+
+    ``?ordering=`` solo admite columnas indexadas (ver ``Producto.Meta``); el
+    ``id`` desempata nombres repetidos.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('nombre', 'id')
+    ordering_param = 'ordering'
+
+    ORDENES = {
+        'nombre': ('nombre', 'id'),
+        '-nombre': ('-nombre', '-id'),
+        'sku': ('sku',),
+        '-sku': ('-sku',),
+        'id': ('id',),
+        '-id': ('-id',),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        orden = request.query_params.get(self.ordering_param)
+        if not orden:
+            return self.ordering
+        if orden not in self.ORDENES:
+            raise ValidationError({
+                self.ordering_param: f"Orden no permitido. Opciones: {', '.join(self.ORDENES)}"
+            })
+        return self.ORDENES[orden]
@@ -0,0 +1,174 @@
+# api/rapido.py
+"""
+Listados de solo lectura sin instancias de serializer.
+
+``ModelSerializer`` arma un objeto por fila y pasa cada valor por
+``field.to_representation`` (con ``DecimalField`` creando un contexto decimal
+por valor). Para listados grandes ese costo domina el request.
+
+``compilar(serializer)`` traduce los campos del serializer a un ``Plan``:
+columnas para ``.values_list()`` y un convertidor precalculado por campo que
+reproduce exactamente la salida de DRF. Las filas salen de la base como
+tuplas y se convierten a dicts en un solo bucle; el JSON se escribe con
+``orjson`` si está instalado (opcional) o con el ``JSONRenderer`` de DRF.
+
+Si el serializer tiene algún campo no soportado (``SerializerMethodField``,
+relaciones, fuentes con puntos, fechas con hora...) ``compilar`` devuelve
+None y la vista usa el camino normal.
+
+Se activa por viewset con ``ListadoRapidoMixin`` (``listado_rapido = True``);
+``manage.py benchmark_serializacion`` compara ambos caminos.
+"""
+import decimal
+import functools
+
+from django.http import HttpResponse
+from rest_framework import serializers
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+
+# Campos cuyo to_representation no cambia el valor que entrega la base
+_IDENTIDAD = (
+    serializers.CharField, serializers.URLField, serializers.EmailField, serializers.SlugField,
+    serializers.IntegerField, serializers.BooleanField, serializers.FloatField,
+)
+
+
+def _decimal(campo):
+    if not getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        return None
+    if campo.localize or campo.normalize_output:
+        return None
+    if campo.decimal_places is None:
+        return lambda v: f'{v:f}'
+    if campo.rounding is None:
+        # Mismo redondeo que quantize() con el contexto por defecto, sin
+        # crear un Decimal intermedio (los valores de la base caben en max_digits)
+        formato = f'.{campo.decimal_places}f'
+        return lambda v: format(v, formato)
+
+    exponente = decimal.Decimal('.1') ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    rounding = campo.rounding
+    return lambda v: f'{v.quantize(exponente, rounding=rounding, context=contexto):f}'
+
+
+def _convertidor(campo):
+    """``(soportado, convertidor)``; convertidor None = el valor va tal cual."""
+    tipo = type(campo)
+    if tipo is serializers.BigIntegerField:
+        return True, (str if getattr(campo, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING) else None)
+    if tipo in _IDENTIDAD:
+        return True, None
+    if tipo is serializers.DecimalField:
+        convertir = _decimal(campo)
+        return convertir is not None, convertir
+    if tipo is serializers.DateField:
+        formato = getattr(campo, 'format', api_settings.DATE_FORMAT)
+        if formato is None:
+            return True, None
+        if formato.lower() == 'iso-8601':
+            return True, lambda v: v.isoformat()
+        return True, lambda v: v.strftime(formato)
+    return False, None
+
+
+class Plan:
+    """Columnas a pedir y cómo convertir cada una."""
+
+    def __init__(self, campos):
+        # campos: [(clave de salida, columna, convertidor)]
+        self.campos = [(clave, i, convertir) for i, (clave, _, convertir) in enumerate(campos)]
+        self.columnas = [columna for _, columna, _ in campos]
+
+    def convertir(self, filas):
+        campos = self.campos
+        return [
+            {clave: valor if (valor := fila[i]) is None or convertir is None else convertir(valor)
+             for clave, i, convertir in campos}
+            for fila in filas
+        ]
+
+
+def compilar(serializer):
+    """``Plan`` para los campos legibles de ``serializer``, o None si alguno no se soporta."""
+    campos = []
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        if not campo.source or '.' in campo.source or campo.source == '*':
+            return None
+        soportado, convertir = _convertidor(campo)
+        if not soportado:
+            return None
+        campos.append((campo.field_name, campo.source, convertir))
+    return Plan(campos)
+
+
+def a_json(datos):
+    """Mismo resultado que ``JSONRenderer().render(datos)``, con orjson si se puede."""
+    renderer = JSONRenderer
+    if orjson is None or renderer.ensure_ascii or not renderer.compact:
+        return renderer().render(datos)
+    # JSONRenderer escapa estos separadores (válidos en JSON, no en JavaScript)
+    return orjson.dumps(datos).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+# ----------------------------------------------------------
+# MIXIN PARA VIEWSETS
+# ----------------------------------------------------------
+PLANES_EN_CACHE = 128
+
+
+@functools.lru_cache(maxsize=PLANES_EN_CACHE)
+def plan_para(serializer_class, campos):
+    """
+    ``Plan`` de ``serializer_class`` con ``campos`` (nombres ya validados,
+    ordenados). Los campos del serializer dependen solo de
+    ``context['campos']`` (``CamposDinamicosMixin``): el orden de salida sigue
+    siendo el declarado. Cada subconjunto de ``?fields=`` es una clave
+    distinta: la caché es acotada (LRU), no un dict que crece sin límite.
+    """
+    return compilar(serializer_class(context={'campos': list(campos)}))
+
+
+class ListadoRapidoMixin:
+    """
+    ``list()`` con ``values_list`` + ``Plan`` cuando la respuesta es JSON.
+    El resto (filtros, ``get_queryset``, paginación, permisos) no cambia.
+    """
+    listado_rapido = True
+
+    def plan_rapido(self):
+        serializer = self.get_serializer()
+        return plan_para(type(serializer), tuple(sorted(serializer.fields)))
+
+    def list(self, request, *args, **kwargs):
+        if not self.listado_rapido or not isinstance(request.accepted_renderer, JSONRenderer):
+            return super().list(request, *args, **kwargs)
+        plan = self.plan_rapido()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        columnas = list(plan.columnas)
+        if isinstance(self.paginator, CursorPagination):
+            # El cursor lee su posición de la fila (por nombre): sus columnas van aunque no se pidan
+            orden = self.paginator.get_ordering(request, None, self)
+            columnas += [c.lstrip('-') for c in orden if c.lstrip('-') not in columnas]
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*columnas, named=True)
+
+        pagina = self.paginate_queryset(queryset)
+        if pagina is None:
+            datos = plan.convertir(queryset)
+        else:
+            datos = self.get_paginated_response(plan.convertir(pagina)).data
+        return HttpResponse(a_json(datos), content_type=request.accepted_renderer.media_type)
@@ -2,7 +2,20 @@
 from rest_framework import serializers
 from productos.models import Producto
 
-class ProductoSerializer(serializers.ModelSerializer):
+class CamposDinamicosMixin:
+    """
+    Serializa solo los campos de ``context['campos']`` (``?fields=`` de la
+    vista); sin esa clave, todos.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
@@ -25,3 +38,19 @@ class ProductoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El IVA debe estar entre 0% y 30%")
 
         return data
+
+
+class ProductoCargaSerializer(ProductoSerializer):
+    """
+    Validación de cada fila de la carga masiva (``api/carga.py``): mismas
+    reglas que ``ProductoSerializer`` pero sin los ``UniqueValidator`` de
+    SKU y EAN (una consulta por fila); esos duplicados se revisan para todo
+    el lote a la vez. El stock no se carga por catálogo: lo mueven los
+    movimientos de inventario.
+    """
+    class Meta(ProductoSerializer.Meta):
+        read_only_fields = ('stock_actual',)
+        extra_kwargs = {
+            'sku': {'validators': []},
+            'ean_upc': {'validators': []},
+        }
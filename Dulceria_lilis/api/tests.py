@@ -1,3 +1,348 @@
+import re
+from datetime import date
+from decimal import Decimal
+from urllib.parse import urlsplit
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.http import QueryDict
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api import rapido
+from api.carga import cargar_productos
+from api.serializers import ProductoSerializer
+from api.views import ProductoViewSet
+from inventario.models import Bodega, Lote, MovimientoInventario, StockBodega
+from productos.models import Producto
+from proveedores.models import ProductoProveedor, Proveedor
+from sistema import busqueda, condicional
+from usuarios.models import Usuario
+
+
+URL_BULK = '/api/productos/bulk/'
+URL_MOVIMIENTOS_BULK = '/api/movimientos/bulk/'
+
+
+class CargaProductosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('staff', 'staff@a.cl', 'x', is_staff=True)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario)
+        self.existente = Producto.objects.create(
+            sku='SKU-1', nombre='Chocolate', categoria='Dulces', marca='Lilis',
+            stock_actual=Decimal('5'), stock_minimo=Decimal('2'),
+        )
+
+    def test_upsert_crea_y_actualiza_solo_los_campos_enviados(self):
+        respuesta = self.cliente.post(URL_BULK, [
+            {'sku': 'SKU-1', 'nombre': 'Chocolate Amargo', 'punto_reorden': '10'},
+            {'sku': 'SKU-2', 'nombre': 'Caramelo', 'categoria': 'Dulces'},
+        ], format='json')
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {'creados': 1, 'actualizados': 1})
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Chocolate Amargo')
+        self.assertEqual(self.existente.marca, 'Lilis')  # no venía: no cambia
+        self.assertEqual(self.existente.stock_actual, Decimal('5'))  # el stock no se carga
+        self.assertTrue(self.existente.bajo_stock)  # 5 <= nuevo punto de reorden 10
+        self.assertEqual(Producto.objects.get(sku='SKU-2').nombre, 'Caramelo')
+        self.assertEqual(list(busqueda.filtrar(Producto.objects.all(), 'amargo')), [self.existente])
+
+    def test_fila_invalida_no_escribe_nada(self):
+        respuesta = self.cliente.post(URL_BULK, [
+            {'sku': 'SKU-2', 'nombre': 'Caramelo', 'categoria': 'Dulces'},
+            {'sku': 'SKU-2', 'nombre': 'Caramelo', 'categoria': 'Dulces'},
+            {'sku': 'SKU-3', 'nombre': 'Caramelo'},
+        ], format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+        filas = {e['fila'] for e in respuesta.json()['errores']}
+        self.assertEqual(filas, {1, 2})  # SKU repetido y falta categoría
+        self.assertFalse(Producto.objects.filter(sku__in=['SKU-2', 'SKU-3']).exists())
+
+    def test_modos_y_ean_de_otro_producto(self):
+        Producto.objects.filter(pk=self.existente.pk).update(ean_upc='780')
+
+        _, errores = cargar_productos([{'sku': 'SKU-1', 'nombre': 'Otro'}], modo='crear')
+        self.assertEqual(errores[0]['errores'], ['Ya existe un producto con este SKU.'])
+        _, errores = cargar_productos([{'sku': 'SKU-9', 'nombre': 'Otro', 'categoria': 'D'}], modo='actualizar')
+        self.assertEqual(errores[0]['errores'], ['Producto inexistente.'])
+        _, errores = cargar_productos([{'sku': 'SKU-9', 'nombre': 'Otro', 'categoria': 'D', 'ean_upc': '780'}])
+        self.assertEqual(errores[0]['errores'], ['Ya existe un producto con este EAN/UPC.'])
+
+    def test_carga_sin_objetivo_de_conflicto(self):
+        # Simula MySQL (ON DUPLICATE KEY UPDATE): antes, NotSupportedError
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            resumen, errores = cargar_productos(
+                [{'sku': 'SKU-2', 'nombre': 'Caramelo', 'categoria': 'Dulces'}], usuario=self.usuario,
+            )
+        self.assertEqual((resumen, errores), ({'creados': 1, 'actualizados': 0}, []))
+        self.assertTrue(Producto.objects.filter(sku='SKU-2').exists())
+
+
+class MovimientosBulkTests(TestCase):
+
+    def setUp(self):
+        self.cliente = APIClient()
+        # DjangoModelPermissions: add_movimientoinventario
+        self.cliente.force_authenticate(Usuario.objects.create_superuser('admin', 'admin@a.cl', 'x'))
+        self.producto = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+
+    def test_filas_invalidas_son_errores_400_por_fila(self):
+        ingreso = {'tipo': 'INGRESO', 'producto': self.producto.pk, 'cantidad': '5'}
+        respuesta = self.cliente.post(URL_MOVIMIENTOS_BULK, [
+            ingreso,
+            {**ingreso, 'cantidad': 'NaN'},
+            {**ingreso, 'cantidad': '1e20'},
+            {**ingreso, 'cantidad': '1.234'},
+            {**ingreso, 'fecha_vencimiento': '2025-02-30'},
+            {**ingreso, 'fecha_vencimiento': 'mañana'},
+            {**ingreso, 'serie': 'S' * 121},
+            {**ingreso, 'documento_referencia': 'D' * 101},
+            {**ingreso, 'producto': {'id': 1}, 'tipo': ['INGRESO']},
+            {**ingreso, 'cantidad': '5.000', 'fecha_vencimiento': '2025-02-28', 'serie': 'S' * 120},
+        ], format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+        errores = {e['fila']: e['errores'] for e in respuesta.json()['errores']}
+        self.assertEqual(sorted(errores), [1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(errores[1], ['La cantidad debe ser mayor que cero.'])
+        self.assertIn('12 dígitos y 2 decimales', errores[2][0])
+        self.assertIn('12 dígitos y 2 decimales', errores[3][0])
+        self.assertEqual(errores[4], ['Fecha de vencimiento inválida (formato AAAA-MM-DD).'])
+        self.assertEqual(errores[6], ['serie: máximo 120 caracteres.'])
+        self.assertEqual(errores[7], ['documento_referencia: máximo 100 caracteres.'])
+        self.assertIn('Producto inexistente.', errores[8])
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_filas_validas_se_registran(self):
+        respuesta = self.cliente.post(URL_MOVIMIENTOS_BULK, [
+            {'tipo': 'INGRESO', 'producto': self.producto.pk, 'cantidad': '5.000',
+             'fecha_vencimiento': '2025-02-28', 'observacion': 'Compra'},
+        ], format='json')
+
+        self.assertEqual(respuesta.status_code, 201)
+        movimiento = MovimientoInventario.objects.get()
+        self.assertEqual(movimiento.cantidad, Decimal('5'))
+        self.assertEqual(str(movimiento.fecha_vencimiento), '2025-02-28')
+
+
+class ListadoRapidoTests(TestCase):
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(Usuario.objects.create_user('ana', 'ana@a.cl', 'x'))
+        self.producto = Producto.objects.create(
+            sku='SKU-1', nombre='Chocolate', categoria='Dulces', precio_venta=Decimal('990.5'),
+        )
+        rapido.plan_para.cache_clear()
+
+    def test_mismos_campos_en_otro_orden_comparten_plan(self):
+        for fields in ('nombre,sku,precio_venta', 'precio_venta,sku,nombre'):
+            respuesta = self.cliente.get('/api/productos/', {'fields': fields})
+            self.assertEqual(respuesta.status_code, 200)
+            fila = respuesta.json()['results'][0]
+            esperado = ProductoSerializer(self.producto, context={'campos': fields.split(',')}).data
+            self.assertEqual(list(fila.items()), list(esperado.items()))  # valores y orden declarado
+        self.assertEqual(rapido.plan_para.cache_info().currsize, 1)
+
+    def crear_variados(self):
+        Producto.objects.create(
+            sku='SKU-2', nombre='Alfajor \u2028 «Ñandú»', categoria='Dulces', marca=None,
+            precio_venta=None, costo_estandar=Decimal('1234.5'), factor_conversion=Decimal('2.125'),
+            stock_actual=Decimal('7.1'), fecha_vencimiento=date(2026, 3, 1),
+        )
+        Producto.objects.create(sku='SKU-3', nombre='Bombón', categoria='Dulces', stock_minimo=Decimal('0.05'))
+
+    def comparar_con_drf(self, params):
+        """Respuesta rápida vs. la de DRF (serializer por fila), byte a byte."""
+        rapida = self.cliente.get('/api/productos/', params)
+        with mock.patch.object(ProductoViewSet, 'listado_rapido', False):
+            normal = self.cliente.get('/api/productos/', params)
+        self.assertEqual(rapida.status_code, 200)
+        self.assertEqual(rapida.content, normal.content)
+        return rapida
+
+    def test_misma_salida_que_el_camino_de_drf(self):
+        self.crear_variados()
+        for motor_json in (rapido.orjson, None):
+            for params in (
+                {'page_size': 2},
+                {'page_size': 2, 'fields': 'precio_venta,sku,fecha_vencimiento,marca'},
+                {'page_size': 1, 'ordering': '-sku', 'fields': 'stock_actual'},
+            ):
+                with self.subTest(params=params, orjson=motor_json is not None), \
+                        mock.patch.object(rapido, 'orjson', motor_json):
+                    siguiente = self.comparar_con_drf(params).json()['next']
+                    self.assertIsNotNone(siguiente)
+                    # La página del cursor del link next también coincide
+                    self.comparar_con_drf(QueryDict(urlsplit(siguiente).query))
+
+    def test_igual_al_serializer_renderizado_con_json_renderer(self):
+        self.crear_variados()
+        for campos in (None, ['sku', 'precio_venta', 'fecha_vencimiento', 'factor_conversion']):
+            with self.subTest(campos=campos):
+                params = {'page_size': 2, **({'fields': ','.join(campos)} if campos else {})}
+                respuesta = self.cliente.get('/api/productos/', params)
+                filas = Producto.objects.order_by('nombre', 'id')[:2]
+                esperado = JSONRenderer().render({
+                    'next': respuesta.json()['next'],
+                    'previous': None,
+                    'results': ProductoSerializer(filas, many=True, context={'campos': campos}).data,
+                })
+                self.assertEqual(respuesta.content, esperado)
+
+    def test_cache_de_planes_acotada(self):
+        campos = sorted(f.name for f in Producto._meta.concrete_fields)
+        for i in range(len(campos)):
+            for j in range(i + 1, len(campos)):
+                rapido.plan_para(ProductoSerializer, (campos[i], campos[j]))
+        self.assertGreater(len(campos) * (len(campos) - 1) // 2, rapido.PLANES_EN_CACHE)
+        self.assertEqual(rapido.plan_para.cache_info().currsize, rapido.PLANES_EN_CACHE)
+
+
+class AsincronoTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(Usuario.objects.create_user('ana', 'ana@a.cl', 'x'))
+        self.producto = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+        self.bodega = Bodega.objects.create(codigo='BOD-1', nombre='Central')
+        self.fila = StockBodega.objects.create(producto=self.producto, bodega=self.bodega, cantidad=Decimal('4'))
+        self.url_stock = f'/api/async/stock/{self.producto.pk}/'
+
+    def revalidar(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_stock_se_invalida_al_corregir_stockbodega_y_renombrar_bodega(self):
+        etag = self.client.get(self.url_stock)['ETag']
+        self.assertEqual(self.revalidar(self.url_stock, etag).status_code, 304)
+
+        # Como reconciliar_stock --fix: update() sin señales y tocar_modelo
+        with self.captureOnCommitCallbacks(execute=True):
+            StockBodega.objects.filter(pk=self.fila.pk).update(cantidad=Decimal('9'))
+            condicional.tocar_modelo(StockBodega)
+        respuesta = self.revalidar(self.url_stock, etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['bodegas'][0]['cantidad'], 9.0)
+
+        etag = respuesta['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bodega.nombre = 'Sala de ventas'
+            self.bodega.save()
+        respuesta = self.revalidar(self.url_stock, etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['bodegas'][0]['nombre'], 'Sala de ventas')
+
+    def rutas(self):
+        proveedor = Proveedor.objects.create(
+            rut_nif='11111111-1', razon_social='Dulces del Sur', email='ventas@sur.cl', condiciones_pago='EFECTIVO',
+        )
+        ProductoProveedor.objects.create(producto=self.producto, proveedor=proveedor, costo=Decimal('100'))
+        Lote.objects.create(codigo='L-1', producto=self.producto, bodega=self.bodega,
+                            cantidad_inicial=Decimal('4'), cantidad_disponible=Decimal('4'))
+        return {
+            f'/api/async/lotes-por-producto/{self.producto.pk}/': f'/api/async/lotes-por-producto/{self.producto.pk + 99}/',
+            f'/api/async/productos-por-proveedor/{proveedor.pk}/': f'/api/async/productos-por-proveedor/{proveedor.pk + 99}/',
+            self.url_stock: f'/api/async/stock/{self.producto.pk + 99}/',
+        }
+
+    def test_404_y_304_en_cada_lectura(self):
+        for url, inexistente in self.rutas().items():
+            with self.subTest(url=url):
+                respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertTrue(respuesta.json())
+                self.assertEqual(self.revalidar(url, respuesta['ETag']).status_code, 304)
+                self.assertEqual(self.client.get(inexistente).status_code, 404)
+
+    def test_producto_sin_lotes_no_es_404(self):
+        otro = Producto.objects.create(sku='SKU-2', nombre='Caramelo', categoria='Dulces')
+        respuesta = self.client.get(f'/api/async/lotes-por-producto/{otro.pk}/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), [])
+
+    def test_autenticacion_por_sesion_o_token(self):
+        rutas = [*self.rutas(), '/api/async/dashboard/']
+        self.client.logout()
+        for url in rutas:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+                self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Token no-existe').status_code, 401)
+
+        beto = Usuario.objects.create_user('beto', 'beto@a.cl', 'x')
+        token = Token.objects.create(user=beto)
+        cabecera = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        for url in rutas[:-1]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, **cabecera).status_code, 200)
+        # El dashboard además exige permiso
+        self.assertEqual(self.client.get('/api/async/dashboard/', **cabecera).status_code, 403)
+        beto.user_permissions.add(Permission.objects.get(codename='ver_grafica', content_type__app_label='sistema'))
+        self.assertEqual(self.client.get('/api/async/dashboard/', **cabecera).status_code, 200)
+
+        Usuario.objects.filter(pk=beto.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url_stock, **cabecera).status_code, 401)
+
+
+class ProductoFiltrosTests(TestCase):
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(Usuario.objects.create_user('ana', 'ana@a.cl', 'x'))
+        self.bajo = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+        self.normal = Producto.objects.create(sku='SKU-2', nombre='Caramelo', categoria='Dulces')
+        # La marca la mantiene el motor de stock; aquí se fija directo
+        Producto.objects.filter(pk=self.bajo.pk).update(bajo_stock=True)
+        Producto.objects.filter(pk=self.normal.pk).update(bajo_stock=False)
+
+    def columnas_leidas(self, params):
+        """Columnas del SELECT que lee la página de productos."""
+        tabla = Producto._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente.get('/api/productos/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        sql = next(q['sql'] for q in consultas if f'FROM "{tabla}"' in q['sql'] and 'ORDER BY' in q['sql'])
+        seleccion = sql.split(' FROM ', 1)[0]
+        return set(re.findall(rf'"{tabla}"\."(\w+)"', seleccion))
+
+    def test_fields_limita_las_columnas_del_select(self):
+        casos = [
+            ({'fields': 'sku,stock_actual'}, {'sku', 'stock_actual', 'nombre', 'id'}),
+            # El orden del cursor se lee aunque no se pida; id lo agrega .only() en el camino de DRF
+            ({'fields': 'precio_venta', 'ordering': '-sku'}, {'precio_venta', 'sku'}),
+        ]
+        for rapido_activo in (True, False):
+            for params, esperadas in casos:
+                with self.subTest(params=params, rapido=rapido_activo), \
+                        mock.patch.object(ProductoViewSet, 'listado_rapido', rapido_activo):
+                    self.assertEqual(self.columnas_leidas(params) - {'id'}, esperadas - {'id'})
+
+        todas = self.columnas_leidas({})
+        self.assertIn('descripcion', todas)
+
+    def test_campo_u_orden_desconocido_es_400(self):
+        respuesta = self.cliente.get('/api/productos/', {'fields': 'sku,clave_secreta'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('clave_secreta', respuesta.json()['fields'])
+
+        respuesta = self.cliente.get('/api/productos/', {'ordering': 'precio_venta'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('ordering', respuesta.json())
+
+    def test_filtro_bajo_stock(self):
+        def skus(valor):
+            respuesta = self.cliente.get('/api/productos/', {'bajo_stock': valor, 'fields': 'sku'})
+            return [fila['sku'] for fila in respuesta.json()['results']]
 
-# Create your tests here.
+        for valor in ('1', 'true', 'sí'):
+            self.assertEqual(skus(valor), ['SKU-1'])
+        for valor in ('0', 'false'):
+            self.assertEqual(skus(valor), ['SKU-2'])
+        self.assertEqual(skus(''), ['SKU-2', 'SKU-1'])  # sin filtro, por nombre
@@ -1,11 +1,23 @@
 from django.urls import path, include
 from rest_framework import routers
-from .views import info, ProductoViewSet
+from .views import info, ProductoViewSet, MovimientoBulkView, ProductoBulkView, VencimientosView
+from . import asincrono
 
 router = routers.DefaultRouter()
 router.register(r'productos', ProductoViewSet)
 
 urlpatterns = [
     path('info/', info, name='info'),
+    path('movimientos/bulk/', MovimientoBulkView.as_view(), name='movimientos_bulk'),
+    # Antes del router: si no, 'bulk' se tomaría como pk de productos/<pk>/
+    path('productos/bulk/', ProductoBulkView.as_view(), name='productos_bulk'),
+    path('vencimientos/', VencimientosView.as_view(), name='vencimientos'),
+    # Lecturas asíncronas (servidas bajo ASGI, ver api/asincrono.py)
+    path('async/lotes-por-producto/<int:producto_id>/', asincrono.lotes_por_producto,
+         name='async_lotes_por_producto'),
+    path('async/productos-por-proveedor/<int:proveedor_id>/', asincrono.productos_por_proveedor,
+         name='async_productos_por_proveedor'),
+    path('async/stock/<int:producto_id>/', asincrono.stock_producto, name='async_stock_producto'),
+    path('async/dashboard/', asincrono.dashboard, name='async_dashboard'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,11 +1,24 @@
 # api/views.py
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework import status, viewsets
-from rest_framework.permissions import IsAuthenticated, IsAdminOrReadOnly
+from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions, SAFE_METHODS
+from rest_framework.views import APIView
 from django.http import Http404, JsonResponse
+from .pagination import ProductoCursorPagination
+from .rapido import ListadoRapidoMixin
+from .carga import MODOS, cargar_productos
+from .permissions import IsAdminOrReadOnly
 from .serializers import ProductoSerializer
 from productos.models import Producto
+from inventario import vencimientos
+from inventario.models import MovimientoInventario
+from inventario.stock import registrar_movimientos_en_lote
+
+# Máximo de movimientos aceptados por request en la carga masiva
+LIMITE_MOVIMIENTOS_BULK = 50000
+# Máximo de productos por request en la carga de catálogo
+LIMITE_PRODUCTOS_BULK = 20000
 
 def info(request):
     return JsonResponse({
@@ -14,10 +27,62 @@ def info(request):
         "autor": "Kevin Ayala & Yearshon Orrego"
     })
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ListadoRapidoMixin, viewsets.ModelViewSet):
+    """
+    GET /api/productos/ — paginado por cursor (``?cursor=``, ``?page_size=``,
+    ``?ordering=``; ver ``api/pagination.py``).
+
+    Filtros: ``?sku=``, ``?categoria=``, ``?marca=``, ``?bajo_stock=1|0``.
+    ``?fields=sku,nombre,stock_actual`` devuelve solo esos campos y la
+    consulta trae solo esas columnas (``.only()``).
+
+    El listado JSON se arma sin serializer por fila (``api/rapido.py``).
+    """
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    pagination_class = ProductoCursorPagination
+
+    CAMPOS = {f.name for f in Producto._meta.concrete_fields}
+
+    def campos_solicitados(self):
+        """Campos de ``?fields=`` (validados), o None para todos."""
+        if self.request.method not in SAFE_METHODS:
+            return None  # las escrituras responden el objeto completo
+        valor = self.request.query_params.get('fields')
+        if not valor:
+            return None
+        campos = [c.strip() for c in valor.split(',') if c.strip()]
+        desconocidos = [c for c in campos if c not in self.CAMPOS]
+        if desconocidos:
+            raise ValidationError({'fields': f"Campos desconocidos: {', '.join(desconocidos)}"})
+        return campos
+
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        contexto['campos'] = self.campos_solicitados()
+        return contexto
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+
+        params = self.request.query_params
+        for campo in ('sku', 'categoria', 'marca'):
+            if params.get(campo):
+                queryset = queryset.filter(**{campo: params[campo]})
+        bajo_stock = params.get('bajo_stock')
+        if bajo_stock:
+            # Marca mantenida por el motor de stock (índice producto_bajo_stock_idx)
+            queryset = queryset.filter(bajo_stock=bajo_stock.lower() in ('1', 'true', 'si', 'sí'))
+
+        campos = self.campos_solicitados()
+        if campos:
+            # El cursor lee las columnas del orden: se traen aunque no se pidan
+            orden = [c.lstrip('-') for c in self.paginator.get_ordering(self.request, queryset, self)]
+            queryset = queryset.only(*set(campos + orden))
+        return queryset
 
     def get_object(self):
         try:
@@ -33,3 +98,109 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 {"status": 500, "error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class MovimientoBulkView(APIView):
+    """
+    POST /api/movimientos/bulk/
+    Recibe una lista de movimientos (POS/ERP) y los registra en bloque.
+    Si alguna fila es inválida no se registra ninguna.
+    """
+    permission_classes = [IsAuthenticated, DjangoModelPermissions]
+    queryset = MovimientoInventario.objects.none()
+
+    def post(self, request):
+        datos = request.data
+        if isinstance(datos, dict):
+            datos = datos.get("movimientos")
+
+        if not isinstance(datos, list) or not datos:
+            return Response(
+                {"error": "Se espera una lista de movimientos."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(datos) > LIMITE_MOVIMIENTOS_BULK:
+            return Response(
+                {"error": f"Máximo {LIMITE_MOVIMIENTOS_BULK} movimientos por solicitud."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(fila, dict) for fila in datos):
+            return Response(
+                {"error": "Cada movimiento debe ser un objeto."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        creados, errores = registrar_movimientos_en_lote(datos, usuario=request.user)
+        if errores:
+            return Response({"creados": 0, "errores": errores}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"creados": len(creados)}, status=status.HTTP_201_CREATED)
+
+
+class ProductoBulkView(APIView):
+    """
+    POST /api/productos/bulk/?modo=upsert|crear|actualizar
+    Carga el catálogo de un proveedor por SKU (ver ``api/carga.py``).
+    Si alguna fila es inválida no se registra ninguna.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+
+    def post(self, request):
+        modo = request.query_params.get("modo", "upsert")
+        if modo not in MODOS:
+            return Response(
+                {"error": f"Modo inválido. Opciones: {', '.join(MODOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        datos = request.data
+        if isinstance(datos, dict):
+            datos = datos.get("productos")
+
+        if not isinstance(datos, list) or not datos:
+            return Response(
+                {"error": "Se espera una lista de productos."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(datos) > LIMITE_PRODUCTOS_BULK:
+            return Response(
+                {"error": f"Máximo {LIMITE_PRODUCTOS_BULK} productos por solicitud."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(fila, dict) for fila in datos):
+            return Response(
+                {"error": "Cada producto debe ser un objeto."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resumen, errores = cargar_productos(datos, usuario=request.user, modo=modo)
+        if errores:
+            return Response({**resumen, "errores": errores}, status=status.HTTP_400_BAD_REQUEST)
+
+        codigo = status.HTTP_201_CREATED if resumen["creados"] else status.HTTP_200_OK
+        return Response(resumen, status=codigo)
+
+
+class VencimientosView(APIView):
+    """
+    GET /api/vencimientos/
+    Última foto de ``manage.py snapshot_vencimientos``: stock vencido y por
+    vencer por bodega y tramo. Lee solo esa tabla (ver ``inventario/vencimientos.py``).
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+
+    def get(self, request):
+        resumen = vencimientos.ultimo_resumen()
+        if resumen is None:
+            raise NotFound("Aún no hay resumen de vencimientos (manage.py snapshot_vencimientos).")
+
+        def tramo(item):
+            return {**item, "cantidad": str(item["cantidad"])}
+
+        return Response({
+            "fecha": resumen["fecha"].isoformat(),
+            "bodegas": [
+                {**b, "tramos": [tramo(t) for t in b["tramos"]]} for b in resumen["bodegas"]
+            ],
+            "totales": [tramo(t) for t in resumen["totales"]],
+        })
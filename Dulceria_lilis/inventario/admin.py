@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MovimientoInventario, Bodega, Lote
+from .models import MovimientoInventario, Bodega, Lote, SecuenciaLote, StockBodega, ConciliacionStock, ResumenVencimiento, NotificacionStock
 
 
 @admin.register(Bodega)
@@ -15,6 +15,42 @@ class LoteAdmin(admin.ModelAdmin):
     list_filter = ("fecha_vencimiento", "producto")
 
 
+@admin.register(SecuenciaLote)
+class SecuenciaLoteAdmin(admin.ModelAdmin):
+    list_display = ("producto", "ultimo")
+    search_fields = ("producto__sku", "producto__nombre")
+    list_select_related = ("producto",)
+
+
+@admin.register(StockBodega)
+class StockBodegaAdmin(admin.ModelAdmin):
+    list_display = ("producto", "bodega", "cantidad")
+    search_fields = ("producto__sku", "producto__nombre", "bodega__codigo")
+    list_filter = ("bodega",)
+    list_select_related = ("producto", "bodega")
+
+
+@admin.register(ConciliacionStock)
+class ConciliacionStockAdmin(admin.ModelAdmin):
+    list_display = ("fecha_inicio", "desde", "productos_con_diferencia",
+                    "lotes_con_diferencia", "bodegas_con_diferencia", "corregido")
+
+
+@admin.register(ResumenVencimiento)
+class ResumenVencimientoAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "bodega", "tramo", "lotes", "productos", "cantidad")
+    list_filter = ("fecha", "tramo", "bodega")
+    list_select_related = ("bodega",)
+
+
+@admin.register(NotificacionStock)
+class NotificacionStockAdmin(admin.ModelAdmin):
+    list_display = ("creada", "tipo", "producto", "lote", "enviada", "intentos")
+    list_filter = ("tipo", "enviada")
+    search_fields = ("producto__sku", "producto__nombre")
+    list_select_related = ("producto", "lote")
+
+
 @admin.register(MovimientoInventario)
 class MovimientoInventarioAdmin(admin.ModelAdmin):
     list_display = ("fecha", "tipo", "producto", "cantidad", "bodega_origen", "bodega_destino", "usuario")
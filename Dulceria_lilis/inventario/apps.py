@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        import inventario.signals  # invalidación de las consultas AJAX cacheadas
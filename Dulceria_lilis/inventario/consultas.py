@@ -0,0 +1,117 @@
+# inventario/consultas.py
+"""
+Consultas AJAX del formulario de movimientos, con caché por versión.
+
+- ``productos_de_proveedor``: productos que ofrece un proveedor.
+- ``lotes_disponibles``: lotes con stock de un producto.
+
+Ambas tienen variante asíncrona (prefijo ``a``) para las vistas de
+``api/asincrono.py``; comparten claves y datos en caché con las síncronas.
+
+Se invalidan por clave (proveedor o producto) desde ``inventario/signals.py``
+(``ProductoProveedor``, ``Lote``, ``Producto``) y desde el motor de stock, que
+modifica ``Lote.cantidad_disponible`` con ``update()`` sin disparar señales.
+"""
+from sistema import condicional, versiones
+
+
+PRODUCTOS_PROVEEDOR = 'productos_proveedor'
+LOTES_PRODUCTO = 'lotes_producto'
+
+
+def _qs_productos(proveedor_id):
+    from proveedores.models import ProductoProveedor
+    return (
+        ProductoProveedor.objects.filter(proveedor_id=proveedor_id)
+        .order_by('producto__nombre')
+        .values_list('producto_id', 'producto__nombre', 'producto__sku')
+    )
+
+
+def _producto(fila):
+    pk, nombre, sku = fila
+    return {"id": pk, "nombre": nombre, "sku": sku or ""}
+
+
+def _qs_lotes(producto_id):
+    from .models import Lote
+    return (
+        Lote.objects.filter(producto_id=producto_id, cantidad_disponible__gt=0)
+        .order_by('codigo')
+        .values_list('pk', 'codigo', 'cantidad_disponible', 'producto__sku', 'producto__nombre')
+    )
+
+
+def _lote(fila):
+    pk, codigo, disponible, sku, nombre = fila
+    return {
+        "id": pk,
+        "codigo": codigo,
+        "descripcion": f"{codigo} - {sku} - {nombre}",  # igual que str(lote)
+        "disponible": float(disponible),
+    }
+
+
+def productos_de_proveedor(proveedor_id):
+    """``(version, [{'id', 'nombre', 'sku'}, ...])``"""
+    def calcular():
+        return [_producto(fila) for fila in _qs_productos(proveedor_id)]
+
+    return versiones.cacheado(PRODUCTOS_PROVEEDOR, proveedor_id, calcular)
+
+
+def lotes_disponibles(producto_id):
+    """``(version, [{'id', 'codigo', 'descripcion', 'disponible'}, ...])``"""
+    def calcular():
+        return [_lote(fila) for fila in _qs_lotes(producto_id)]
+
+    return versiones.cacheado(LOTES_PRODUCTO, producto_id, calcular)
+
+
+async def aproductos_de_proveedor(proveedor_id):
+    async def calcular():
+        return [_producto(fila) async for fila in _qs_productos(proveedor_id)]
+
+    return await versiones.acacheado(PRODUCTOS_PROVEEDOR, proveedor_id, calcular)
+
+
+async def alotes_disponibles(producto_id):
+    async def calcular():
+        return [_lote(fila) async for fila in _qs_lotes(producto_id)]
+
+    return await versiones.acacheado(LOTES_PRODUCTO, producto_id, calcular)
+
+
+# ----------------------------------------------------------
+# ETAGS (sin tocar la base: solo el sello de versión)
+# ----------------------------------------------------------
+# Fuera de HTTPS no hay ETag: la respuesta va con no-store (condicional.revalidable)
+def etag_productos(request, proveedor_id):
+    if not condicional.revalidable(request):
+        return None
+    return f"pp-{proveedor_id}-{versiones.obtener(PRODUCTOS_PROVEEDOR, proveedor_id)}"
+
+
+def etag_lotes(request, producto_id):
+    if not condicional.revalidable(request):
+        return None
+    return f"lp-{producto_id}-{versiones.obtener(LOTES_PRODUCTO, producto_id)}"
+
+
+# ----------------------------------------------------------
+# INVALIDACIÓN
+# ----------------------------------------------------------
+def tocar_proveedores(*proveedor_ids):
+    if proveedor_ids:
+        versiones.tocar(PRODUCTOS_PROVEEDOR, *proveedor_ids)
+
+
+def tocar_lotes(*producto_ids):
+    if producto_ids:
+        versiones.tocar(LOTES_PRODUCTO, *producto_ids)
+
+
+def invalidar_todo():
+    """Para cargas masivas o correcciones que no saben qué claves tocaron."""
+    versiones.tocar(PRODUCTOS_PROVEEDOR)
+    versiones.tocar(LOTES_PRODUCTO)
@@ -0,0 +1,287 @@
+# inventario/demanda.py
+"""
+Pronóstico de demanda y sugerencia de compras.
+
+La historia sale de una sola consulta agrupada: el total de SALIDA por
+producto y día local (índice cubriente ``mov_tipo_fecha_prod_idx``; el día se calcula en el
+motor, ver ``_expr_dia``). Con eso se arma una matriz
+densa productos x días (NumPy) y todo lo demás se calcula por columnas, sin
+recorrer productos en Python:
+
+- media móvil de los últimos ``ventana`` días,
+- suavizamiento exponencial simple (un producto matriz-vector con los pesos
+  ``alfa * (1 - alfa)^k``); es la demanda diaria pronosticada,
+- stock de seguridad ``z * desviación diaria * raíz(lead time)``, con ``z``
+  según el nivel de servicio,
+- política (s, S): si el stock está en el punto de pedido o bajo él, se pide
+  hasta cubrir el lead time más ``cobertura`` días, redondeado hacia arriba a
+  múltiplos de ``min_lote``.
+
+Proveedor, lead time, lote mínimo y costo son los del ``ProductoProveedor``
+preferente (el de menor costo si hay varios). Los productos sin preferente
+se sugieren igual, agrupados aparte, con el lead time por defecto.
+
+Lo usan ``manage.py sugerir_compras`` y la vista ``inventario:compras_sugeridas``.
+NumPy es una dependencia opcional: sin ella ``disponible()`` es False.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+from statistics import NormalDist
+
+from django.db import NotSupportedError, connection
+from django.db.models import Case, FloatField, Func, IntegerField, Sum, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+
+DIAS_HISTORIA = 365
+VENTANA = 28
+ALFA = 0.1
+NIVEL_SERVICIO = 0.95
+COBERTURA_DIAS = 14
+LEAD_TIME_POR_DEFECTO = 7  # el default de ProductoProveedor.lead_time_dias
+
+DOS_DECIMALES = Decimal('0.01')
+
+
+def disponible():
+    return np is not None
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _decimal(valor):
+    return Decimal(repr(float(valor))).quantize(DOS_DECIMALES, rounding=ROUND_HALF_UP)
+
+
+def _sin_ceros(valor):
+    """12.000000 -> 12 y 2.500000 -> 2.5 (``normalize()`` solo daría 1.2E+1)."""
+    valor = valor.normalize()
+    return valor.quantize(Decimal(1)) if valor == valor.to_integral_value() else valor
+
+
+# ----------------------------------------------------------
+# HISTORIA (una consulta agrupada -> matriz densa)
+# ----------------------------------------------------------
+class _DiasDesde(Func):
+    """Días completos (24 h) entre ``instante`` y la columna, calculados por el motor."""
+    output_field = IntegerField()
+
+    def __init__(self, expression, instante):
+        super().__init__(expression)
+        self.instante = instante.astimezone(dt_timezone.utc)
+
+    def as_sqlite(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f"((CAST(strftime('%%s', {sql}) AS INTEGER) - %s) / 86400)", [*params, int(self.instante.timestamp())]
+
+    def as_mysql(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f"TIMESTAMPDIFF(DAY, %s, {sql})", [self.instante.replace(tzinfo=None), *params]
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError('La historia de demanda solo está implementada para SQLite y MySQL.')
+
+
+def _expr_dia(limites):
+    """
+    Índice del día local de ``fecha`` (0 = el día que empieza en ``limites[0]``).
+
+    ``TruncDate`` convierte la zona horaria fila por fila (en SQLite con una
+    función Python: 30 s para 1,8 millones de salidas). Pero entre dos cambios
+    de horario los días locales duran exactamente 86400 s, así que basta un
+    tramo por cambio (un par al año) y dentro de cada tramo una división entera.
+    """
+    tramos = [0] + [
+        k for k in range(1, len(limites) - 1)
+        if limites[k].timestamp() - limites[k - 1].timestamp() != 86400
+    ]
+    return Case(
+        *[When(fecha__gte=limites[k], then=_DiasDesde('fecha', limites[k]) + k) for k in reversed(tramos)],
+        output_field=IntegerField(),
+    )
+
+
+def historia_salidas(hasta, dias=DIAS_HISTORIA, proveedor_id=None):
+    """
+    Salidas diarias de los ``dias`` días completos anteriores a ``hasta``.
+
+    Devuelve ``(ids, matriz)``: los ids de producto con alguna salida en el
+    periodo (ordenados) y una matriz ``len(ids) x dias`` con el total de cada
+    día (ceros donde no hubo salidas). Con ``proveedor_id`` solo cuentan los
+    productos que tienen a ese proveedor como preferente.
+    """
+    from proveedores.models import ProductoProveedor
+    from .models import MovimientoInventario
+
+    desde = hasta - timedelta(days=dias)
+    limites = [_inicio_dia(desde + timedelta(days=k)) for k in range(dias + 1)]
+    salidas = MovimientoInventario.objects.filter(
+        tipo='SALIDA', fecha__gte=limites[0], fecha__lt=limites[-1],
+    )
+    if proveedor_id is not None:
+        salidas = salidas.filter(producto_id__in=ProductoProveedor.objects.filter(
+            proveedor_id=proveedor_id, preferente=True,
+        ).values('producto_id'))
+
+    consulta = (
+        salidas.annotate(dia=_expr_dia(limites))
+        .values_list('producto_id', 'dia')
+        .annotate(total=Sum(Cast('cantidad', FloatField())))
+        .order_by()
+    )
+    # Se lee con el cursor: con millones de filas los convertidores del ORM
+    # (int/float por valor) cuestan casi tanto como la consulta
+    sql, params = consulta.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+
+    ids, posiciones = np.unique(filas[:, 0].astype(np.int64), return_inverse=True)
+    matriz = np.zeros((len(ids), dias), dtype=np.float64)
+    # Cada (producto, día) viene una sola vez: no hace falta acumular
+    matriz[posiciones, filas[:, 1].astype(np.int64)] = filas[:, 2]
+    return ids, matriz
+
+
+# ----------------------------------------------------------
+# PRONÓSTICO (vectorizado por producto)
+# ----------------------------------------------------------
+def pronosticar(matriz, ventana=VENTANA, alfa=ALFA):
+    """
+    Por fila de ``matriz``: ``(media_movil, nivel, desviacion)``, arreglos de
+    largo ``len(matriz)`` con la media de los últimos ``ventana`` días, el
+    nivel del suavizamiento exponencial al último día y la desviación
+    estándar diaria del periodo.
+    """
+    dias = matriz.shape[1]
+    ventana = min(ventana, dias)
+    media_movil = matriz[:, dias - ventana:].mean(axis=1)
+
+    # s_t = alfa * x_t + (1 - alfa) * s_(t-1), con s_0 = x_0, desarrollado:
+    # s_T = sum(alfa * (1 - alfa)^(T-t) * x_t) + (1 - alfa)^T * x_0
+    pesos = alfa * (1 - alfa) ** np.arange(dias - 1, -1, -1, dtype=np.float64)
+    pesos[0] = (1 - alfa) ** (dias - 1)
+    nivel = matriz @ pesos
+
+    return media_movil, nivel, matriz.std(axis=1)
+
+
+def _preferentes(ids):
+    """``{producto_id: (proveedor_id, lead_time, min_lote, costo_neto)}`` (el preferente más barato)."""
+    from proveedores.models import ProductoProveedor
+    from .stock import _bloques
+
+    preferentes = {}
+    for bloque in _bloques(ids):
+        filas = (
+            ProductoProveedor.objects.filter(producto_id__in=bloque, preferente=True)
+            .order_by('producto_id', 'costo', 'pk')
+            .values_list('producto_id', 'proveedor_id', 'lead_time_dias', 'min_lote', 'costo', 'descuento_pct')
+        )
+        for producto_id, proveedor_id, lead_time, min_lote, costo, descuento in filas:
+            if producto_id in preferentes:
+                continue
+            if descuento:
+                costo = costo * (100 - descuento) / 100
+            preferentes[producto_id] = (proveedor_id, lead_time, min_lote, costo)
+    return preferentes
+
+
+# ----------------------------------------------------------
+# SUGERENCIA DE COMPRA
+# ----------------------------------------------------------
+def sugerir(hoy=None, dias=DIAS_HISTORIA, ventana=VENTANA, alfa=ALFA,
+            nivel_servicio=NIVEL_SERVICIO, cobertura=COBERTURA_DIAS, proveedor_id=None):
+    """
+    Órdenes de compra sugeridas, agrupadas por proveedor preferente::
+
+        {'fecha': date, 'productos': n analizados, 'ordenes': [
+            {'proveedor_id', 'proveedor', 'total', 'lineas': [
+                {'producto_id', 'sku', 'nombre', 'stock', 'media_movil', 'demanda_diaria',
+                 'stock_seguridad', 'punto_pedido', 'lead_time', 'min_lote',
+                 'cantidad', 'costo', 'subtotal'}, ...]}, ...]}
+
+    ``proveedor_id`` None agrupa los productos sin proveedor preferente.
+    """
+    from productos.models import Producto
+    from proveedores.models import Proveedor
+    from .stock import _existentes
+
+    if np is None:
+        raise RuntimeError('La sugerencia de compras requiere NumPy (pip install numpy).')
+
+    hoy = hoy or timezone.localdate()
+    ids, matriz = historia_salidas(hoy, dias, proveedor_id)
+    resultado = {'fecha': hoy, 'productos': len(ids), 'ordenes': []}
+    if not len(ids):
+        return resultado
+
+    media_movil, demanda, desviacion = pronosticar(matriz, ventana, alfa)
+
+    lista_ids = ids.tolist()
+    preferentes = _preferentes(lista_ids)
+    existentes = _existentes(Producto.objects, lista_ids, 'stock_actual')
+    stock = np.array([float(existentes[pk]['stock_actual']) for pk in lista_ids])
+    lead = np.array([
+        preferentes[pk][1] if pk in preferentes else LEAD_TIME_POR_DEFECTO for pk in lista_ids
+    ], dtype=np.float64)
+    lotes = [preferentes[pk][2] if pk in preferentes else None for pk in lista_ids]
+    lotes = [lote if lote and lote > 0 else Decimal(1) for lote in lotes]
+    lote = np.array([float(x) for x in lotes])
+
+    z = NormalDist().inv_cdf(nivel_servicio)
+    seguridad = z * desviacion * np.sqrt(lead)
+    punto_pedido = demanda * lead + seguridad
+    faltante = demanda * (lead + cobertura) + seguridad - stock
+    pedir = (stock <= punto_pedido) & (faltante > 0)
+    # Redondeo hacia arriba a múltiplos del lote (el round evita que 3.0000001 lotes sean 4)
+    multiplos = np.ceil(np.round(faltante / lote, 6)).astype(np.int64)
+
+    elegidos = np.flatnonzero(pedir)
+    if not len(elegidos):
+        return resultado
+
+    datos = {
+        fila['pk']: fila
+        for fila in _existentes(Producto.objects, [lista_ids[i] for i in elegidos], 'sku', 'nombre').values()
+    }
+    ordenes = {}
+    for i in elegidos.tolist():
+        pk = lista_ids[i]
+        proveedor, _, _, costo = preferentes.get(pk, (None, None, None, None))
+        cantidad = lotes[i] * int(multiplos[i])
+        subtotal = (cantidad * costo).quantize(DOS_DECIMALES, rounding=ROUND_HALF_UP) if costo is not None else None
+        orden = ordenes.setdefault(proveedor, {'proveedor_id': proveedor, 'total': Decimal('0.00'), 'lineas': []})
+        orden['lineas'].append({
+            'producto_id': pk,
+            'sku': datos[pk]['sku'],
+            'nombre': datos[pk]['nombre'],
+            'stock': existentes[pk]['stock_actual'],
+            'media_movil': _decimal(media_movil[i]),
+            'demanda_diaria': _decimal(demanda[i]),
+            'stock_seguridad': _decimal(seguridad[i]),
+            'punto_pedido': _decimal(punto_pedido[i]),
+            'lead_time': int(lead[i]),
+            'min_lote': _sin_ceros(lotes[i]),
+            'cantidad': _sin_ceros(cantidad),
+            'costo': costo,
+            'subtotal': subtotal,
+        })
+        if subtotal is not None:
+            orden['total'] += subtotal
+
+    nombres = dict(Proveedor.objects.filter(pk__in=[p for p in ordenes if p]).values_list('pk', 'razon_social'))
+    for proveedor, orden in ordenes.items():
+        orden['proveedor'] = nombres.get(proveedor, 'Sin proveedor preferente')
+        orden['lineas'].sort(key=lambda linea: linea['sku'])
+    # Los productos sin proveedor preferente quedan al final
+    resultado['ordenes'] = sorted(ordenes.values(), key=lambda o: (o['proveedor_id'] is None, o['proveedor']))
+    return resultado
@@ -136,7 +136,8 @@ class MovimientoInventarioForm(forms.ModelForm):
 
         # Producto con control por lote
         if producto.control_por_lote:
-            if tipo in ('SALIDA', 'AJUSTE', 'TRANSFERENCIA') and not lote:
+            # Las salidas sin lote se reparten por FEFO (MovimientoInventario.registrar)
+            if tipo in ('AJUSTE', 'TRANSFERENCIA') and not lote:
                 self.add_error('lote', "Debe seleccionar un lote para este movimiento porque el producto se controla por lote.")
 
             if tipo in ('INGRESO', 'DEVOLUCION'):
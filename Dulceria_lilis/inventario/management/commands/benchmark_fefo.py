@@ -0,0 +1,132 @@
+# inventario/management/commands/benchmark_fefo.py
+"""
+Benchmark de las salidas FEFO (``stock.asignar_fefo``) con productos que
+tienen cientos de lotes abiertos.
+
+Compara, para una salida que consume ``--cantidad`` unidades:
+
+- por lote: leer los lotes en orden FEFO y descontar uno a uno con
+  ``descontar_lote`` (un UPDATE por lote, como si el operador registrara una
+  salida por cada lote),
+- FEFO: ``asignar_fefo`` (un SELECT ... FOR UPDATE + un solo UPDATE).
+
+Muestra el plan (EXPLAIN) de la consulta de candidatos, la mediana de cada
+camino y las consultas por salida. Los datos se generan dentro de una
+transacción que se revierte al final (la base queda como estaba).
+
+    python manage.py benchmark_fefo
+    python manage.py benchmark_fefo --productos 20 --lotes 500 --cantidad 400
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventario import stock
+from inventario.models import Bodega, Lote
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Compara la salida FEFO en lote contra el descuento lote por lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10)
+        parser.add_argument('--lotes', type=int, default=300, help='Lotes abiertos por producto')
+        parser.add_argument('--cantidad', type=int, default=250, help='Unidades por salida')
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        for opcion in ('productos', 'lotes', 'cantidad', 'repeticiones'):
+            if options[opcion] <= 0:
+                raise CommandError(f'--{opcion} debe ser mayor que 0')
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"🧪 Generando {options['productos']} productos con {options['lotes']} lotes cada uno..."
+            )
+            bodega, productos = self.generar(options['productos'], options['lotes'])
+            try:
+                self.comparar(bodega, productos, Decimal(options['cantidad']), options['repeticiones'])
+            finally:
+                transaction.set_rollback(True)
+
+    def generar(self, productos, lotes):
+        sufijo = f'{time.time_ns():x}'
+        bodega = Bodega.objects.create(codigo=f'BENCH-{sufijo}', nombre='Bodega de prueba')
+        Producto.objects.bulk_create([
+            Producto(
+                sku=f'BENCH-{sufijo}-{i}', nombre=f'Producto de prueba {i}', categoria='Dulces',
+                control_por_lote=True, perishable=True,
+            )
+            for i in range(productos)
+        ])
+        # MySQL no devuelve las PK de bulk_create: se recuperan por SKU
+        ids = list(Producto.objects.filter(sku__startswith=f'BENCH-{sufijo}-').values_list('pk', flat=True))
+        hoy = timezone.localdate()
+        Lote.objects.bulk_create([
+            Lote(
+                codigo=f'BENCH-{sufijo}-{producto_id}-{j}',
+                producto_id=producto_id,
+                bodega=bodega,
+                fecha_vencimiento=hoy + timedelta(days=random.randint(-30, 365)),
+                cantidad_inicial=Decimal(10),
+                cantidad_disponible=Decimal(random.randint(1, 10)),
+            )
+            for producto_id in ids
+            for j in range(lotes)
+        ], batch_size=2000)
+        return bodega, ids
+
+    def comparar(self, bodega, productos, cantidad, repeticiones):
+        candidatos = stock.lotes_fefo([productos[0]], bodega.pk)
+        self.stdout.write(self.style.WARNING('=== Plan de la consulta de candidatos ==='))
+        self.stdout.write(candidatos.explain())
+
+        def por_lote(producto_id):
+            restante = cantidad
+            lotes = stock.lotes_fefo([producto_id], bodega.pk).only('codigo', 'producto_id', 'cantidad_disponible')
+            for lote in lotes:
+                if restante <= 0:
+                    break
+                tomado = min(lote.cantidad_disponible, restante)
+                stock.descontar_lote(lote, tomado)
+                restante -= tomado
+
+        def fefo(producto_id):
+            stock.asignar_fefo(producto_id, cantidad, bodega.pk)
+
+        resultados = {}
+        for nombre, funcion in (('por lote', por_lote), ('FEFO', fefo)):
+            tiempos, consultas, sin_stock = [], [], 0
+            for i in range(repeticiones):
+                producto_id = productos[i % len(productos)]
+                # Cada salida se revierte: todas parten de los mismos lotes
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as capturadas:
+                        inicio = time.perf_counter()
+                        try:
+                            funcion(producto_id)
+                        except ValidationError:
+                            sin_stock += 1
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                    consultas.append(len(capturadas))
+                    transaction.set_rollback(True)
+            resultados[nombre] = statistics.median(tiempos)
+            self.stdout.write(
+                f'  {nombre:<10} {resultados[nombre]:>9.2f} ms   {statistics.median(consultas):>6.0f} consultas/salida'
+            )
+            if sin_stock:
+                self.stdout.write(self.style.WARNING(f'  ⚠️  {sin_stock} salidas sin stock suficiente'))
+
+        mejora = resultados['por lote'] / resultados['FEFO'] if resultados['FEFO'] else float('inf')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Salidas de {cantidad} unidades sobre {len(productos)} productos; FEFO x{mejora:.1f}'
+        ))
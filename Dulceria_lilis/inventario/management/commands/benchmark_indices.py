@@ -0,0 +1,154 @@
+# inventario/management/commands/benchmark_indices.py
+"""
+Benchmark de los índices del listado de movimientos y de lotes_por_producto.
+
+Mide cada consulta SIN los índices compuestos (se eliminan temporalmente) y
+CON ellos, mostrando el plan (EXPLAIN) y la latencia mediana.
+
+Solo para bases de prueba: elimina índices mientras mide y --generar inserta
+movimientos sintéticos con bulk_create directo (no toca stock, así que
+reconciliar_stock los vería como diferencias). Por eso se niega a correr salvo
+con DEBUG, en una base cuyo nombre parece de prueba o con --confirmar.
+
+    python manage.py benchmark_indices --generar 5000000 --confirmar
+    python manage.py benchmark_indices --repeticiones 20 --confirmar
+"""
+import os
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from productos.models import Producto
+from inventario.models import Bodega, Lote, MovimientoInventario
+
+
+class Command(BaseCommand):
+    help = 'Compara planes y latencia de las consultas del listado de movimientos con y sin índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generar', type=int, default=0, help='Movimientos sintéticos a insertar antes de medir')
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--por-pagina', type=int, default=10)
+        parser.add_argument('--confirmar', action='store_true',
+                            help='Correr aunque la base no parezca de prueba')
+
+    def handle(self, *args, **options):
+        if not (options['confirmar'] or settings.DEBUG or self.base_de_prueba()):
+            raise CommandError(
+                f'⚠️ La base "{connection.settings_dict["NAME"]}" no parece de prueba: este comando '
+                'elimina índices y --generar inserta movimientos sin pasar por el stock. '
+                'Use --confirmar si de verdad quiere correrlo aquí.'
+            )
+
+        if options['generar']:
+            self.generar(options['generar'])
+
+        if not MovimientoInventario.objects.exists():
+            raise CommandError('No hay movimientos; use --generar N.')
+
+        consultas = self.consultas(options['por_pagina'])
+        indices = (
+            [(MovimientoInventario, i) for i in MovimientoInventario._meta.indexes]
+            + [(Lote, i) for i in Lote._meta.indexes]
+        )
+
+        self.stdout.write(self.style.WARNING('=== ANTES (sin índices compuestos) ==='))
+        with connection.schema_editor() as editor:
+            for modelo, indice in indices:
+                editor.remove_index(modelo, indice)
+        try:
+            antes = self.medir(consultas, options['repeticiones'])
+        finally:
+            with connection.schema_editor() as editor:
+                for modelo, indice in indices:
+                    editor.add_index(modelo, indice)
+
+        self.stdout.write(self.style.WARNING('=== DESPUÉS (con índices) ==='))
+        despues = self.medir(consultas, options['repeticiones'])
+
+        self.stdout.write(self.style.SUCCESS('\n=== RESUMEN (mediana, ms) ==='))
+        for nombre, _ in consultas:
+            mejora = antes[nombre] / despues[nombre] if despues[nombre] else float('inf')
+            self.stdout.write(f'  {nombre:<28} {antes[nombre]:>10.2f} → {despues[nombre]:>10.2f}  (x{mejora:.1f})')
+
+    # ------------------------------------------------------------------
+    def base_de_prueba(self):
+        """Base de tests de Django (``test_*``, SQLite en memoria) o con "test"/"bench" en el nombre."""
+        nombre = os.path.basename(str(connection.settings_dict['NAME'] or '')).lower()
+        return any(marca in nombre for marca in ('test', 'bench', 'memory'))
+
+    def consultas(self, por_pagina):
+        """Mismas formas de consulta que MovimientoInventarioListCreateView y lotes_por_producto."""
+        producto_id = (
+            MovimientoInventario.objects.order_by('-id').values_list('producto_id', flat=True).first()
+        )
+        bodega_id = Bodega.objects.values_list('pk', flat=True).first()
+        con_lotes = Lote.objects.values_list('producto_id', flat=True).first() or producto_id
+        base = MovimientoInventario.objects.select_related(
+            'producto', 'bodega_origen', 'bodega_destino', 'usuario'
+        ).order_by('-fecha')
+
+        return [
+            ('listado sin filtros', base[:por_pagina]),
+            ('tipo=SALIDA', base.filter(tipo='SALIDA')[:por_pagina]),
+            ('producto', base.filter(producto_id=producto_id)[:por_pagina]),
+            ('bodega destino', base.filter(bodega_destino_id=bodega_id)[:por_pagina]),
+            ('bodega origen', base.filter(bodega_origen_id=bodega_id)[:por_pagina]),
+            ('lotes_por_producto', Lote.objects.filter(
+                producto_id=con_lotes, cantidad_disponible__gt=0).order_by('codigo')),
+        ]
+
+    def medir(self, consultas, repeticiones):
+        resultados = {}
+        for nombre, qs in consultas:
+            self.stdout.write(self.style.SUCCESS(f'\n-- {nombre}'))
+            self.stdout.write(qs.explain())
+            tiempos = []
+            for _ in range(max(repeticiones, 1)):
+                inicio = time.perf_counter()
+                list(qs._chain())
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = statistics.median(tiempos)
+            self.stdout.write(f'   mediana: {resultados[nombre]:.2f} ms')
+        return resultados
+
+    def generar(self, cantidad, bloque=5000):
+        productos = list(Producto.objects.values_list('pk', flat=True)[:2000])
+        bodegas = list(Bodega.objects.values_list('pk', flat=True))
+        if not productos:
+            raise CommandError('Se necesitan productos (python manage.py generar_datos_prueba).')
+        if not bodegas:
+            bodegas = [Bodega.objects.create(codigo='BOD-BENCH', nombre='Bodega benchmark').pk]
+
+        tipos = ['INGRESO', 'SALIDA', 'AJUSTE', 'DEVOLUCION', 'TRANSFERENCIA']
+        ahora = timezone.now()
+        campo_fecha = MovimientoInventario._meta.get_field('fecha')
+
+        self.stdout.write(self.style.WARNING(f'Insertando {cantidad} movimientos sintéticos...'))
+        # fecha es auto_now_add: se desactiva mientras se generan fechas repartidas en 2 años
+        campo_fecha.auto_now_add = False
+        try:
+            for inicio in range(0, cantidad, bloque):
+                filas = [
+                    MovimientoInventario(
+                        tipo=random.choice(tipos),
+                        producto_id=random.choice(productos),
+                        bodega_origen_id=random.choice(bodegas) if random.random() > 0.5 else None,
+                        bodega_destino_id=random.choice(bodegas),
+                        cantidad=Decimal(random.randint(1, 80)),
+                        fecha=ahora - timedelta(minutes=random.randint(0, 60 * 24 * 730)),
+                    )
+                    for _ in range(min(bloque, cantidad - inicio))
+                ]
+                with transaction.atomic():
+                    MovimientoInventario.objects.bulk_create(filas)
+                self.stdout.write(f'  {inicio + len(filas)}/{cantidad}')
+        finally:
+            campo_fecha.auto_now_add = True
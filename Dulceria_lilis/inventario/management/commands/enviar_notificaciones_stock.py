@@ -0,0 +1,92 @@
+# inventario/management/commands/enviar_notificaciones_stock.py
+"""
+Despacha la bandeja de salida de avisos de stock (``NotificacionStock``):
+un solo correo con todos los pendientes, y los marca como enviados.
+
+Destinatarios: ``settings.NOTIFICACIONES_STOCK_DESTINATARIOS`` si existe; si
+no, los usuarios staff activos con correo. Si el envío falla los avisos quedan
+pendientes (con el error y el número de intentos) para la próxima pasada.
+
+Pensado para cron, cada pocos minutos:
+
+    python manage.py enviar_notificaciones_stock
+    python manage.py enviar_notificaciones_stock --mostrar   # no envía ni marca
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from inventario.models import NotificacionStock
+
+
+class Command(BaseCommand):
+    help = 'Envía por correo los avisos de stock pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=500, help='Avisos por pasada')
+        parser.add_argument('--mostrar', action='store_true', help='Solo lista los pendientes')
+
+    def handle(self, *args, **options):
+        if options['limite'] <= 0:
+            raise CommandError('--limite debe ser mayor que 0')
+
+        pendientes = list(
+            NotificacionStock.objects.filter(enviada__isnull=True)
+            .select_related('producto', 'lote')
+            .order_by('creada', 'pk')[:options['limite']]
+        )
+        if not pendientes:
+            self.stdout.write(self.style.SUCCESS('✅ No hay avisos pendientes.'))
+            return
+
+        lineas = [self.linea(aviso) for aviso in pendientes]
+        if options['mostrar']:
+            for linea in lineas:
+                self.stdout.write(f'  {linea}')
+            self.stdout.write(f'📋 {len(pendientes)} avisos pendientes (no enviados).')
+            return
+
+        destinatarios = self.destinatarios()
+        if not destinatarios:
+            raise CommandError('No hay destinatarios: defina NOTIFICACIONES_STOCK_DESTINATARIOS o un staff con correo.')
+
+        ids = [aviso.pk for aviso in pendientes]
+        try:
+            send_mail(
+                f'Dulcería Lilis: {len(pendientes)} avisos de stock',
+                '\n'.join(lineas),
+                settings.DEFAULT_FROM_EMAIL,
+                destinatarios,
+            )
+        except Exception as e:
+            NotificacionStock.objects.filter(pk__in=ids).update(intentos=F('intentos') + 1, error=str(e)[:1000])
+            raise CommandError(f'❌ No se pudo enviar el correo: {e}')
+
+        NotificacionStock.objects.filter(pk__in=ids).update(
+            enviada=timezone.now(), intentos=F('intentos') + 1, error=''
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(pendientes)} avisos enviados a {len(destinatarios)} destinatarios.'
+        ))
+
+    def linea(self, aviso):
+        producto = aviso.producto
+        if aviso.mensaje:
+            return f'[{aviso.creada:%d/%m/%Y %H:%M}] {producto.sku}: {aviso.mensaje}'
+        # Aviso de reorden: se informa el stock vigente al momento de enviar
+        return (
+            f'[{aviso.creada:%d/%m/%Y %H:%M}] ⚠ {producto.sku} - {producto.nombre}: '
+            f'stock {producto.stock_actual}, punto de reorden {producto.umbral_reorden()}'
+        )
+
+    def destinatarios(self):
+        configurados = getattr(settings, 'NOTIFICACIONES_STOCK_DESTINATARIOS', None)
+        if configurados:
+            return list(configurados)
+        return list(
+            get_user_model().objects.filter(is_staff=True, is_active=True)
+            .exclude(email='').values_list('email', flat=True)
+        )
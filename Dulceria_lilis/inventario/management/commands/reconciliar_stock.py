@@ -0,0 +1,198 @@
+# inventario/management/commands/reconciliar_stock.py
+"""
+Concilia el stock materializado contra el historial de movimientos.
+
+Compara, directamente en la base de datos:
+- Producto.stock_actual
+- Lote.cantidad_disponible (solo productos controlados por lote)
+- StockBodega.cantidad
+
+y revisa la marca ``Producto.bajo_stock`` (ver ``inventario/reposicion.py``).
+
+Las diferencias se leen con ``.iterator(chunk_size=...)`` y se corrigen por
+bloques (``--fix``) sumando la diferencia con ``F()``, de modo que un
+movimiento registrado en paralelo no se pierde.
+
+``--since`` revisa los productos, lotes y bodegas de los movimientos creados
+o editados desde el checkpoint (``MovimientoInventario.actualizado``). Se
+revisan con sus valores actuales: si una edición cambió el producto, el lote
+o las bodegas de un movimiento (o se borró uno), los valores anteriores solo
+se revisan en una pasada completa.
+
+Ejemplos:
+    python manage.py reconciliar_stock
+    python manage.py reconciliar_stock --fix
+    python manage.py reconciliar_stock --since ultimo --fix
+    python manage.py reconciliar_stock --since 2025-11-01
+"""
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from productos.models import Producto
+from inventario.models import ConciliacionStock, Lote, MovimientoInventario, StockBodega
+from inventario import consultas, reposicion, stock
+from sistema import condicional
+
+
+class Command(BaseCommand):
+    help = 'Concilia stock de productos, lotes y bodegas contra el historial de movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Corrige las diferencias encontradas')
+        parser.add_argument(
+            '--since',
+            help='Solo revisa lo creado o editado desde esta fecha (AAAA-MM-DD, ISO) '
+                 'o "ultimo" para el último checkpoint',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--detalle', type=int, default=20, help='Diferencias a mostrar por tabla')
+
+    def handle(self, *args, **options):
+        self.chunk = max(options['chunk_size'], 1)
+        self.corregir = options['fix']
+        self.detalle = options['detalle']
+        desde = self._parse_since(options['since'])
+
+        registro = ConciliacionStock.objects.create(fecha_inicio=timezone.now(), desde=desde)
+        self.stdout.write(self.style.WARNING(
+            f"🔎 Conciliando stock{f' (movimientos desde {desde:%d/%m/%Y %H:%M})' if desde else ''}..."
+        ))
+
+        recientes = MovimientoInventario.objects.all()
+        if desde:
+            # fecha cubre las filas anteriores a la columna actualizado (nula)
+            recientes = recientes.filter(Q(actualizado__gte=desde) | Q(fecha__gte=desde))
+
+        # ---- Productos ----
+        productos = Producto.objects.all()
+        if desde:
+            productos = productos.filter(pk__in=recientes.values('producto_id'))
+        registro.productos_con_diferencia = self._conciliar(
+            'Productos', productos, 'stock_actual', stock.stock_esperado_producto(),
+            lambda fila: fila['sku'], ('sku',),
+        )
+
+        # ---- Marca bajo_stock ----
+        desfasados = reposicion.desfasados(productos).count()
+        if desfasados and self.corregir:
+            with transaction.atomic():
+                reposicion.recalcular(reposicion.desfasados(productos))
+                condicional.tocar_modelo(Producto)
+        estilo = self.style.WARNING if desfasados else self.style.SUCCESS
+        self.stdout.write(estilo(f'Marca bajo stock: {desfasados} desfasadas'))
+
+        # ---- Lotes ----
+        lotes = Lote.objects.filter(producto__control_por_lote=True)
+        if desde:
+            lotes = lotes.filter(pk__in=recientes.exclude(lote=None).values('lote_id'))
+        registro.lotes_con_diferencia = self._conciliar(
+            'Lotes', lotes, 'cantidad_disponible', stock.disponible_esperado_lote(),
+            lambda fila: fila['codigo'], ('codigo',),
+        )
+
+        # ---- Bodegas ----
+        self._crear_filas_bodega(recientes)
+        filas_bodega = StockBodega.objects.all()
+        if desde:
+            filas_bodega = filas_bodega.filter(producto_id__in=recientes.values('producto_id'))
+        registro.bodegas_con_diferencia = self._conciliar(
+            'Stock por bodega', filas_bodega, 'cantidad', stock.stock_esperado_bodega(),
+            lambda fila: f"{fila['producto__sku']} @ {fila['bodega__codigo']}",
+            ('producto__sku', 'bodega__codigo'),
+        )
+
+        registro.corregido = self.corregir
+        registro.fecha_fin = timezone.now()
+        registro.save()
+
+        total = (registro.productos_con_diferencia + registro.lotes_con_diferencia
+                 + registro.bodegas_con_diferencia + desfasados)
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✅ Sin diferencias.'))
+        elif self.corregir:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} diferencias corregidas.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️  {total} diferencias (use --fix para corregir).'))
+
+    # ------------------------------------------------------------------
+    def _parse_since(self, valor):
+        if not valor:
+            return None
+        if valor == 'ultimo':
+            ultimo = ConciliacionStock.objects.exclude(fecha_fin=None).first()
+            if not ultimo:
+                raise CommandError('No hay una conciliación previa para usar como checkpoint.')
+            return ultimo.fecha_inicio
+
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            dia = parse_date(valor)
+            if dia is None:
+                raise CommandError(f'Fecha inválida para --since: {valor}')
+            fecha = datetime.combine(dia, time.min)
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
+    def _conciliar(self, titulo, queryset, campo, esperado, etiqueta, campos_etiqueta):
+        """Recorre las diferencias por bloques; las informa y (opcional) corrige."""
+        diferencias = (
+            queryset
+            .annotate(esperado=esperado)
+            .exclude(**{campo: F('esperado')})
+            .order_by('pk')
+            .values('pk', campo, 'esperado', *campos_etiqueta)
+        )
+
+        total = 0
+        bloque = {}
+        for fila in diferencias.iterator(chunk_size=self.chunk):
+            total += 1
+            if total <= self.detalle:
+                self.stdout.write(
+                    f"  {titulo}: {etiqueta(fila)} actual={fila[campo]} esperado={fila['esperado']}"
+                )
+            bloque[fila['pk']] = fila['esperado'] - fila[campo]
+            if len(bloque) >= self.chunk:
+                self._corregir(queryset.model, campo, bloque)
+                bloque = {}
+        self._corregir(queryset.model, campo, bloque)
+
+        estilo = self.style.WARNING if total else self.style.SUCCESS
+        self.stdout.write(estilo(f'{titulo}: {total} con diferencia'))
+        return total
+
+    def _corregir(self, modelo, campo, deltas):
+        if not self.corregir or not deltas:
+            return
+        with transaction.atomic():
+            stock.actualizar_por_caso(modelo.objects.all(), campo, deltas)
+            if modelo is Producto:
+                reposicion.recalcular(Producto.objects.filter(pk__in=list(deltas)))
+            condicional.tocar_modelo(modelo)
+            if modelo is Lote:
+                consultas.invalidar_todo()
+
+    def _crear_filas_bodega(self, movimientos):
+        """Crea (en 0) las filas producto/bodega que el historial usa y aún no existen."""
+        if not self.corregir:
+            return
+        for columna in ('bodega_origen_id', 'bodega_destino_id'):
+            claves = (
+                movimientos.exclude(**{columna: None})
+                .order_by()
+                .values_list('producto_id', columna)
+                .distinct()
+            )
+            nuevas = []
+            for producto_id, bodega_id in claves.iterator(chunk_size=self.chunk):
+                nuevas.append(StockBodega(producto_id=producto_id, bodega_id=bodega_id))
+                if len(nuevas) >= self.chunk:
+                    StockBodega.objects.bulk_create(nuevas, ignore_conflicts=True)
+                    nuevas = []
+            StockBodega.objects.bulk_create(nuevas, ignore_conflicts=True)
@@ -0,0 +1,56 @@
+# inventario/management/commands/snapshot_vencimientos.py
+"""
+Genera la foto diaria de vencimientos (``ResumenVencimiento``): por bodega,
+cantidad vencida, que vence en 7 días o menos y de 8 a 30 días.
+
+Pensado para cron, una vez al día (de madrugada):
+
+    python manage.py snapshot_vencimientos
+    python manage.py snapshot_vencimientos --fecha 2025-01-31 --conservar 90
+
+Volver a correrlo el mismo día reemplaza la foto de ese día.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventario import vencimientos
+from inventario.models import ResumenVencimiento
+
+
+class Command(BaseCommand):
+    help = 'Precalcula el stock vencido y por vencer por bodega (foto diaria)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Día de referencia (AAAA-MM-DD); por defecto, hoy')
+        parser.add_argument('--conservar', type=int, default=365,
+                            help='Días de fotos anteriores a conservar (0 = todas)')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        if options['fecha']:
+            hoy = parse_date(options['fecha'])
+            if hoy is None:
+                raise CommandError('--fecha debe tener el formato AAAA-MM-DD')
+        if options['conservar'] < 0:
+            raise CommandError('--conservar no puede ser negativo')
+
+        self.stdout.write(f'📅 Calculando vencimientos al {hoy:%d/%m/%Y}...')
+        filas = vencimientos.guardar_resumen(hoy)
+
+        totales = {tramo: 0 for tramo, _ in vencimientos.TRAMOS}
+        for fila in filas:
+            totales[fila.tramo] += fila.cantidad
+        for tramo, etiqueta in vencimientos.TRAMOS:
+            self.stdout.write(f'  {etiqueta:<28} {totales[tramo]:>12.2f}')
+
+        if options['conservar']:
+            limite = hoy - timedelta(days=options['conservar'])
+            borradas, _ = ResumenVencimiento.objects.filter(fecha__lt=limite).delete()
+            if borradas:
+                self.stdout.write(f'🧹 {borradas} filas anteriores al {limite:%d/%m/%Y} eliminadas')
+
+        bodegas = len({fila.bodega_id for fila in filas})
+        self.stdout.write(self.style.SUCCESS(f'✅ Foto guardada: {len(filas)} filas de {bodegas} bodegas.'))
@@ -0,0 +1,78 @@
+# inventario/management/commands/sugerir_compras.py
+"""
+Sugiere órdenes de compra por proveedor preferente a partir del historial de
+salidas (ver ``inventario/demanda.py``): demanda pronosticada, stock de
+seguridad y cantidad a pedir redondeada a ``min_lote``.
+
+Requiere NumPy. Ejemplos:
+
+    python manage.py sugerir_compras
+    python manage.py sugerir_compras --dias 730 --nivel-servicio 0.98
+    python manage.py sugerir_compras --proveedor 3 --cobertura 30
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventario import demanda
+
+
+class Command(BaseCommand):
+    help = 'Sugiere compras por proveedor según el pronóstico de demanda'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=demanda.DIAS_HISTORIA, help='Días de historia')
+        parser.add_argument('--ventana', type=int, default=demanda.VENTANA, help='Días de la media móvil')
+        parser.add_argument('--alfa', type=float, default=demanda.ALFA, help='Suavizamiento exponencial (0-1)')
+        parser.add_argument('--nivel-servicio', type=float, default=demanda.NIVEL_SERVICIO,
+                            help='Probabilidad de no quebrar stock durante el lead time (0-1)')
+        parser.add_argument('--cobertura', type=int, default=demanda.COBERTURA_DIAS,
+                            help='Días de demanda a cubrir además del lead time')
+        parser.add_argument('--proveedor', type=int, help='Solo los productos de este proveedor preferente')
+        parser.add_argument('--fecha', help='Día de referencia (AAAA-MM-DD); por defecto, hoy')
+
+    def handle(self, *args, **options):
+        if not demanda.disponible():
+            raise CommandError('❌ NumPy no está instalado (pip install numpy).')
+        if options['dias'] <= 0 or options['ventana'] <= 0:
+            raise CommandError('--dias y --ventana deben ser mayores que 0')
+        if options['cobertura'] < 0:
+            raise CommandError('--cobertura no puede ser negativa')
+        if not 0 < options['alfa'] <= 1:
+            raise CommandError('--alfa debe estar entre 0 y 1')
+        if not 0 < options['nivel_servicio'] < 1:
+            raise CommandError('--nivel-servicio debe estar entre 0 y 1 (sin incluirlos)')
+        hoy = None
+        if options['fecha']:
+            hoy = parse_date(options['fecha'])
+            if hoy is None:
+                raise CommandError('--fecha debe tener el formato AAAA-MM-DD')
+
+        inicio = time.perf_counter()
+        resultado = demanda.sugerir(
+            hoy=hoy, dias=options['dias'], ventana=options['ventana'], alfa=options['alfa'],
+            nivel_servicio=options['nivel_servicio'], cobertura=options['cobertura'],
+            proveedor_id=options['proveedor'],
+        )
+        segundos = time.perf_counter() - inicio
+
+        for orden in resultado['ordenes']:
+            self.stdout.write(self.style.WARNING(
+                f"\n🚚 {orden['proveedor']} ({len(orden['lineas'])} productos, total {orden['total']:.2f})"
+            ))
+            self.stdout.write(
+                f"  {'SKU':<20} {'Stock':>10} {'Dem/día':>9} {'Seg.':>9} {'Pedido':>9} {'Lote':>8} {'Cantidad':>10}"
+            )
+            for linea in orden['lineas']:
+                self.stdout.write(
+                    f"  {linea['sku'][:20]:<20} {linea['stock']:>10.2f} {linea['demanda_diaria']:>9.2f} "
+                    f"{linea['stock_seguridad']:>9.2f} {linea['punto_pedido']:>9.2f} "
+                    f"{linea['min_lote']:>8} {linea['cantidad']:>10}"
+                )
+
+        lineas = sum(len(orden['lineas']) for orden in resultado['ordenes'])
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {resultado['productos']} productos con salidas en {options['dias']} días; "
+            f"{lineas} a pedir a {len(resultado['ordenes'])} proveedores ({segundos:.2f} s)."
+        ))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:00
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+
+def poblar_desde_historial(apps, schema_editor):
+    """Carga inicial de StockBodega sumando el historial de movimientos."""
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    StockBodega = apps.get_model('inventario', 'StockBodega')
+
+    saldos = defaultdict(Decimal)
+    reglas = [
+        # (tipos, bodega, signo)
+        (['INGRESO', 'DEVOLUCION', 'AJUSTE'], Coalesce('bodega_destino', 'bodega_origen'), 1),
+        (['SALIDA'], Coalesce('bodega_origen', 'bodega_destino'), -1),
+        (['TRANSFERENCIA'], models.F('bodega_origen'), -1),
+        (['TRANSFERENCIA'], models.F('bodega_destino'), 1),
+    ]
+    for tipos, bodega, signo in reglas:
+        filas = (
+            MovimientoInventario.objects
+            .filter(tipo__in=tipos)
+            .annotate(b=bodega)
+            .exclude(b=None)
+            .values('producto_id', 'b')
+            .annotate(total=Sum('cantidad'))
+        )
+        for fila in filas.iterator(chunk_size=2000):
+            saldos[(fila['producto_id'], fila['b'])] += signo * fila['total']
+
+    StockBodega.objects.bulk_create(
+        [
+            StockBodega(producto_id=p, bodega_id=b, cantidad=max(cantidad, Decimal('0')))
+            for (p, b), cantidad in saldos.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_alter_movimientoinventario_bodega_destino_and_more'),
+        ('productos', '0002_producto_fecha_vencimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBodega',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_productos', to='inventario.bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_bodegas', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Stock por bodega',
+                'verbose_name_plural': 'Stock por bodega',
+                'unique_together': {('producto', 'bodega')},
+            },
+        ),
+        migrations.RunPython(poblar_desde_historial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_stockbodega'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConciliacionStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_inicio', models.DateTimeField()),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('desde', models.DateTimeField(blank=True, null=True)),
+                ('productos_con_diferencia', models.PositiveIntegerField(default=0)),
+                ('lotes_con_diferencia', models.PositiveIntegerField(default=0)),
+                ('bodegas_con_diferencia', models.PositiveIntegerField(default=0)),
+                ('corregido', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Conciliación de stock',
+                'verbose_name_plural': 'Conciliaciones de stock',
+                'ordering': ['-fecha_inicio'],
+            },
+        ),
+    ]
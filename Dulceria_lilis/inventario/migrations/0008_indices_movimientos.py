@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_conciliacionstock'),
+        ('productos', '0002_producto_fecha_vencimiento'),
+        ('proveedores', '0003_alter_productoproveedor_min_lote_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['producto', 'cantidad_disponible'], name='lote_prod_disp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha'], name='mov_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['tipo', 'fecha'], name='mov_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha'], name='mov_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['bodega_destino', 'fecha'], name='mov_bdest_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['bodega_origen', 'fecha'], name='mov_borig_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_desde_lotes(apps, schema_editor):
+    """Cada secuencia parte del mayor código 'LOT-<sku>-NNNN' existente del producto."""
+    Lote = apps.get_model('inventario', 'Lote')
+    SecuenciaLote = apps.get_model('inventario', 'SecuenciaLote')
+
+    ultimos = {}
+    filas = Lote.objects.values_list('producto_id', 'producto__sku', 'codigo')
+    for producto_id, sku, codigo in filas.iterator(chunk_size=2000):
+        base = f"LOT-{sku}-"
+        sufijo = codigo[len(base):]
+        if codigo.startswith(base) and sufijo.isdigit():
+            ultimos[producto_id] = max(ultimos.get(producto_id, 0), int(sufijo))
+
+    SecuenciaLote.objects.bulk_create(
+        [SecuenciaLote(producto_id=p, ultimo=n) for p, n in ultimos.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_indices_movimientos'),
+        ('productos', '0003_producto_indices_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaLote',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='secuencia_lote', serialize=False, to='productos.producto')),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de lotes',
+                'verbose_name_plural': 'Secuencias de lotes',
+            },
+        ),
+        migrations.RunPython(poblar_desde_lotes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_secuencialote'),
+        ('productos', '0003_producto_indices_api'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['producto', 'bodega', 'fecha_vencimiento'], name='lote_prod_bod_venc_idx'),
+        ),
+    ]
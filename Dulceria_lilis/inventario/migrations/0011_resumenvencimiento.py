@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_indice_lote_fefo'),
+        ('productos', '0004_producto_venc_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVencimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tramo', models.CharField(choices=[('vencido', 'Vencido'), ('hasta_7', 'Vence en 7 días o menos'), ('hasta_30', 'Vence en 8 a 30 días')], max_length=10)),
+                ('lotes', models.PositiveIntegerField(default=0)),
+                ('productos', models.PositiveIntegerField(default=0)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen de vencimientos',
+                'verbose_name_plural': 'Resúmenes de vencimientos',
+                'ordering': ['-fecha', 'bodega', 'tramo'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['fecha_vencimiento'], name='lote_venc_idx'),
+        ),
+        migrations.AddField(
+            model_name='resumenvencimiento',
+            name='bodega',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_vencimiento', to='inventario.bodega'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenvencimiento',
+            index=models.Index(fields=['fecha'], name='resvenc_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_resumenvencimiento'),
+        ('productos', '0005_producto_bajo_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('REORDEN', 'Producto bajo punto de reorden'), ('LOTE', 'Lote bajo stock mínimo')], max_length=10)),
+                ('mensaje', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('enviada', models.DateTimeField(blank=True, null=True)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.lote')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_stock', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Notificación de stock',
+                'verbose_name_plural': 'Notificaciones de stock',
+                'ordering': ['creada'],
+                'indexes': [models.Index(fields=['enviada', 'creada'], name='notif_pendientes_idx')],
+            },
+        ),
+    ]
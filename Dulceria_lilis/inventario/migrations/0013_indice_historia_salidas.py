@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_notificacionstock'),
+        ('productos', '0005_producto_bajo_stock'),
+        ('proveedores', '0003_alter_productoproveedor_min_lote_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['tipo', 'fecha', 'producto', 'cantidad'], name='mov_tipo_fecha_prod_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='movimientoinventario',
+            name='mov_tipo_fecha_idx',
+        ),
+    ]
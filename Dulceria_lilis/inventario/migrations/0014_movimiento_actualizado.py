@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0013_indice_historia_salidas'),
+        ('productos', '0005_producto_bajo_stock'),
+        ('proveedores', '0003_alter_productoproveedor_min_lote_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['actualizado'], name='mov_actualizado_idx'),
+        ),
+    ]
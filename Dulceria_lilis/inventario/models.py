@@ -1,7 +1,9 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, models, transaction
 from productos.models import Producto
 from proveedores.models import Proveedor
 from usuarios.models import Usuario
+from . import reposicion, stock, vencimientos
 
 TIPO_MOVIMIENTO = [
     ('INGRESO', 'Ingreso'),
@@ -43,6 +45,18 @@ class Lote(models.Model):
 
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # lotes_por_producto: producto = X AND cantidad_disponible > 0
+            models.Index(fields=['producto', 'cantidad_disponible'], name='lote_prod_disp_idx'),
+            # Salidas FEFO: producto = X [AND bodega = Y] ORDER BY fecha_vencimiento
+            models.Index(fields=['producto', 'bodega', 'fecha_vencimiento'], name='lote_prod_bod_venc_idx'),
+            # Radar de vencimientos (inventario/vencimientos.py): rango sobre la fecha
+            models.Index(fields=['fecha_vencimiento'], name='lote_venc_idx'),
+        ]
+
+    @staticmethod
+    def prefijo(producto):
+        return f"LOT-{producto.sku}-"
 
     @staticmethod
     def generar_codigo(producto):
@@ -52,27 +66,196 @@ class Lote(models.Model):
             LOT-SKU001-0001
             LOT-SKU001-0002
         """
-        base = f"LOT-{producto.sku}-"
-        ultimo = (
-            Lote.objects
-            .filter(codigo__startswith=base)
-            .order_by('-id')
-            .first()
-        )
+        return Lote.generar_codigos(producto, 1)[0]
 
-        if not ultimo:
-            num = 1
-        else:
-            try:
-                num = int(ultimo.codigo.replace(base, '')) + 1
-            except:
-                num = 1
+    @staticmethod
+    def generar_codigos(producto, cantidad):
+        """Reserva ``cantidad`` códigos consecutivos para el SKU (ingesta masiva)."""
+        base = Lote.prefijo(producto)
+        primero = SecuenciaLote.reservar(producto, cantidad)
+        return [f"{base}{n:04d}" for n in range(primero, primero + cantidad)]
+
+
+class SecuenciaLote(models.Model):
+    """
+    Último número de lote emitido por producto.
+
+    ``reservar`` lo incrementa con una sola sentencia sobre la PK
+    (``UPDATE ... RETURNING`` en SQLite/PostgreSQL, ``LAST_INSERT_ID(expr)`` en
+    MySQL): no recorre los lotes existentes y dos ingresos simultáneos del
+    mismo SKU nunca obtienen el mismo número (el segundo espera el bloqueo
+    de la fila). Un bloque de N códigos cuesta lo mismo que uno.
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True, related_name='secuencia_lote'
+    )
+    ultimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Secuencia de lotes'
+        verbose_name_plural = 'Secuencias de lotes'
 
-        return f"{base}{num:04d}"
+    def __str__(self):
+        return f"{self.producto_id}: {self.ultimo}"
+
+    @classmethod
+    def reservar(cls, producto, cantidad=1):
+        """Reserva ``cantidad`` números consecutivos para ``producto``; devuelve el primero."""
+        ultimo = cls._incrementar(producto.pk, cantidad)
+        if ultimo is None:
+            ultimo = cls._crear(producto, cantidad)
+        return ultimo - cantidad + 1
+
+    @classmethod
+    def _incrementar(cls, producto_id, cantidad):
+        """Nuevo ``ultimo`` tras sumar ``cantidad``, o None si el producto aún no tiene secuencia."""
+        tabla = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # LAST_INSERT_ID(expr) deja el valor en la conexión: sin SELECT de la tabla
+                cursor.execute(
+                    f"UPDATE {tabla} SET ultimo = LAST_INSERT_ID(ultimo + %s) WHERE producto_id = %s",
+                    [cantidad, producto_id],
+                )
+                if not cursor.rowcount:
+                    return None
+                cursor.execute("SELECT LAST_INSERT_ID()")
+                return cursor.fetchone()[0]
+
+            if connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_rows_from_bulk_insert:
+                cursor.execute(
+                    f"UPDATE {tabla} SET ultimo = ultimo + %s WHERE producto_id = %s RETURNING ultimo",
+                    [cantidad, producto_id],
+                )
+                fila = cursor.fetchone()
+                return fila[0] if fila else None
+
+        # Otros motores: bloqueo explícito de la fila
+        with transaction.atomic():
+            if not cls.objects.select_for_update().filter(pk=producto_id).exists():
+                return None
+            cls.objects.filter(pk=producto_id).update(ultimo=models.F('ultimo') + cantidad)
+            return cls.objects.filter(pk=producto_id).values_list('ultimo', flat=True).get()
+
+    @classmethod
+    def _crear(cls, producto, cantidad):
+        """Primera reserva del producto: parte del mayor código existente con su prefijo."""
+        base = Lote.prefijo(producto)
+        existentes = Lote.objects.filter(codigo__startswith=base).values_list('codigo', flat=True)
+        # Los códigos con sufijo no numérico no pueden chocar con los generados
+        mayor = max((int(c[len(base):]) for c in existentes if c[len(base):].isdigit()), default=0)
+        try:
+            with transaction.atomic():
+                cls.objects.create(producto_id=producto.pk, ultimo=mayor + cantidad)
+            return mayor + cantidad
+        except IntegrityError:
+            # Otro proceso la creó al mismo tiempo: se reserva sobre la suya
+            return cls._incrementar(producto.pk, cantidad)
+
+
+class StockBodega(models.Model):
+    """Stock materializado por producto y bodega; lo mantiene cada movimiento."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='stock_bodegas')
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, related_name='stock_productos')
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('producto', 'bodega')
+        verbose_name = 'Stock por bodega'
+        verbose_name_plural = 'Stock por bodega'
+
+    def __str__(self):
+        return f"{self.producto} @ {self.bodega.codigo}: {self.cantidad}"
+
+
+class ConciliacionStock(models.Model):
+    """Bitácora de ``manage.py reconciliar_stock``; sirve de checkpoint incremental."""
+    fecha_inicio = models.DateTimeField()
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    desde = models.DateTimeField(blank=True, null=True)
+    productos_con_diferencia = models.PositiveIntegerField(default=0)
+    lotes_con_diferencia = models.PositiveIntegerField(default=0)
+    bodegas_con_diferencia = models.PositiveIntegerField(default=0)
+    corregido = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-fecha_inicio']
+        verbose_name = 'Conciliación de stock'
+        verbose_name_plural = 'Conciliaciones de stock'
+
+    def __str__(self):
+        return f"Conciliación {self.fecha_inicio:%d/%m/%Y %H:%M}"
+
+
+class ResumenVencimiento(models.Model):
+    """
+    Foto diaria del stock por vencer, por bodega y tramo (ver
+    ``inventario/vencimientos.py``). La escribe ``manage.py snapshot_vencimientos``;
+    el dashboard y la API la leen sin recorrer lotes ni productos.
+    """
+    fecha = models.DateField()
+    bodega = models.ForeignKey(
+        Bodega, on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='resumenes_vencimiento'
+    )
+    tramo = models.CharField(max_length=10, choices=vencimientos.TRAMOS)
+    lotes = models.PositiveIntegerField(default=0)
+    productos = models.PositiveIntegerField(default=0)
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-fecha', 'bodega', 'tramo']
+        indexes = [
+            models.Index(fields=['fecha'], name='resvenc_fecha_idx'),
+        ]
+        verbose_name = 'Resumen de vencimientos'
+        verbose_name_plural = 'Resúmenes de vencimientos'
+
+    def __str__(self):
+        return f"{self.fecha:%d/%m/%Y} {self.bodega or 'Sin bodega'} {self.get_tramo_display()}: {self.cantidad}"
+
+
+class NotificacionStock(models.Model):
+    """
+    Bandeja de salida de avisos de stock (ver ``inventario/reposicion.py``).
+    Se escribe en la misma transacción que el movimiento que la origina y la
+    despacha ``manage.py enviar_notificaciones_stock``.
+    """
+    REORDEN = 'REORDEN'
+    LOTE = 'LOTE'
+    TIPOS = [
+        (REORDEN, 'Producto bajo punto de reorden'),
+        (LOTE, 'Lote bajo stock mínimo'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='notificaciones_stock')
+    lote = models.ForeignKey(Lote, on_delete=models.SET_NULL, null=True, blank=True)
+    mensaje = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    enviada = models.DateTimeField(blank=True, null=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['creada']
+        indexes = [
+            # Pendientes: enviada IS NULL, en orden de llegada
+            models.Index(fields=['enviada', 'creada'], name='notif_pendientes_idx'),
+        ]
+        verbose_name = 'Notificación de stock'
+        verbose_name_plural = 'Notificaciones de stock'
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.producto_id} ({self.creada:%d/%m/%Y %H:%M})"
 
 
 class MovimientoInventario(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
+    # Última escritura (alta o edición): checkpoint de reconciliar_stock --since.
+    # Nulo en las filas anteriores a la columna (no se reescribe la tabla)
+    actualizado = models.DateTimeField(auto_now=True, null=True, editable=False)
     tipo = models.CharField(max_length=20, choices=TIPO_MOVIMIENTO)
 
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -101,6 +284,16 @@ class MovimientoInventario(models.Model):
 
     class Meta:
         ordering = ['-fecha']
+        indexes = [
+            # Filtros del listado de movimientos, siempre ordenado por -fecha
+            models.Index(fields=['fecha'], name='mov_fecha_idx'),
+            # Cubre también la historia de salidas (producto y cantidad) de inventario/demanda.py
+            models.Index(fields=['tipo', 'fecha', 'producto', 'cantidad'], name='mov_tipo_fecha_prod_idx'),
+            models.Index(fields=['producto', 'fecha'], name='mov_prod_fecha_idx'),
+            models.Index(fields=['bodega_destino', 'fecha'], name='mov_bdest_fecha_idx'),
+            models.Index(fields=['bodega_origen', 'fecha'], name='mov_borig_fecha_idx'),
+            models.Index(fields=['actualizado'], name='mov_actualizado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.producto} - {self.cantidad}"
@@ -109,21 +302,12 @@ class MovimientoInventario(models.Model):
     #             L Ó G I C A
     # ------------------------------------
     def _ajustar_stock_producto(self):
-        prod = self.producto
-
-        if self.tipo in ['INGRESO', 'DEVOLUCION']:
-            prod.stock_actual += self.cantidad
-
-        elif self.tipo in ['SALIDA']:
-            prod.stock_actual -= self.cantidad
-            if prod.stock_actual < 0:
-                prod.stock_actual = 0
-
-        elif self.tipo == 'AJUSTE':
-            # Ajuste directo (+ o -)
-            prod.stock_actual += self.cantidad
-
-        prod.save()
+        # UPDATE atómico sobre la fila del producto (sin leer-modificar-escribir)
+        stock.aplicar_stock_producto(self.producto_id, self.tipo, self.cantidad)
+        stock.aplicar_stock_bodegas(
+            self.producto_id, self.tipo, self.cantidad,
+            self.bodega_origen_id, self.bodega_destino_id,
+        )
 
     def _ajustar_lote(self):
         prod = self.producto
@@ -140,54 +324,87 @@ class MovimientoInventario(models.Model):
         if self.tipo in ['INGRESO', 'DEVOLUCION']:
             if self.lote:
                 lote = self.lote
+                stock.sumar_lote(lote, self.cantidad)
+                # El objeto en memoria puede estar desactualizado (otro ingreso
+                # o salida concurrente): la alerta usa el valor ya guardado
+                lote.refresh_from_db(fields=['cantidad_disponible', 'cantidad_inicial'])
             else:
-                # Crear lote automáticamente
+                # Crear lote automáticamente ya con la cantidad ingresada
                 codigo = Lote.generar_codigo(prod)
                 lote = Lote.objects.create(
                     codigo=codigo,
                     producto=prod,
                     bodega=bodega,
-                    cantidad_inicial=0,
-                    cantidad_disponible=0,
+                    cantidad_inicial=self.cantidad,
+                    cantidad_disponible=self.cantidad,
                     fecha_vencimiento=self.fecha_vencimiento
                 )
                 self.lote = lote
 
-            lote.cantidad_inicial += self.cantidad
-            lote.cantidad_disponible += self.cantidad
-            lote.save()
-            # ⚠ ALERTA POR STOCK BAJO
-            if lote.cantidad_disponible <= lote.producto.stock_minimo:
-                from django.contrib import messages
-                messages.warning(
-                    None,
+            # ⚠ ALERTA POR STOCK BAJO (a la bandeja de salida: aquí no hay request)
+            if lote.cantidad_disponible <= prod.stock_minimo:
+                reposicion.encolar_lote(
+                    lote,
                     f"⚠ Alerta: el stock del lote {lote.codigo} "
-                    f"queda en {lote.cantidad_disponible}, por debajo del mínimo ({lote.producto.stock_minimo})"
+                    f"queda en {lote.cantidad_disponible}, por debajo del mínimo ({prod.stock_minimo})"
                 )
 
-        # SALIDAS / AJUSTES / TRANSFERENCIAS
+        # SALIDAS / AJUSTES / TRANSFERENCIAS (la SALIDA sin lote va por registrar())
         else:
             if not self.lote:
-                from django.core.exceptions import ValidationError
                 raise ValidationError("Debe seleccionar lote para este movimiento.")
 
-            lote = self.lote
+            # Decremento protegido: falla si el lote no alcanza
+            stock.descontar_lote(self.lote, self.cantidad)
 
-            if lote.cantidad_disponible < self.cantidad:
-                from django.core.exceptions import ValidationError
-                raise ValidationError(
-                    f"No hay stock suficiente en lote {lote.codigo} "
-                    f"(Disponible: {lote.cantidad_disponible}, requerido: {self.cantidad})"
-                )
+    def _copiar(self, **cambios):
+        campos = {
+            f.attname: getattr(self, f.attname)
+            for f in self._meta.concrete_fields if not f.primary_key
+        }
+        return MovimientoInventario(**(campos | cambios))
 
-            lote.cantidad_disponible -= self.cantidad
-            lote.save()
+    def _reparte_fefo(self):
+        return (
+            self.pk is None and self.tipo in stock.TIPOS_SALIDA
+            and not self.lote_id and self.producto.control_por_lote
+        )
+
+    def registrar(self):
+        """
+        Guarda el movimiento y devuelve la lista de movimientos registrados.
+
+        Una SALIDA sin lote de un producto controlado por lote se reparte en
+        orden FEFO (``stock.asignar_fefo``) y se guarda como un movimiento por
+        lote usado, copias de ``self``. En ese caso ``self`` es solo la
+        solicitud: no se guarda ni se modifica (su cantidad sigue siendo la
+        pedida) y el reparto es lo que se devuelve.
+        """
+        if not self._reparte_fefo():
+            self.save()
+            return [self]
+
+        with transaction.atomic():
+            self._ajustar_stock_producto()
+            asignado = stock.asignar_fefo(
+                self.producto_id, self.cantidad, self.bodega_origen_id or self.bodega_destino_id
+            )
+            movimientos = [self._copiar(lote_id=pk, cantidad=cantidad) for pk, _, cantidad in asignado]
+            for movimiento in movimientos:
+                # El stock ya se descontó: solo el INSERT (y sus señales)
+                super(MovimientoInventario, movimiento).save()
+        return movimientos
 
     def save(self, *args, **kwargs):
         es_nuevo = self.pk is None
 
-        if es_nuevo:
+        if not es_nuevo:
+            super().save(*args, **kwargs)
+            return
+
+        # El INSERT del movimiento y los UPDATE de stock van juntos:
+        # si algo falla (p. ej. lote sin stock) no queda nada a medias.
+        with transaction.atomic():
             self._ajustar_stock_producto()
             self._ajustar_lote()
-
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
@@ -0,0 +1,70 @@
+# inventario/reposicion.py
+"""
+Stock bajo el punto de reorden, por conjuntos.
+
+``Producto.bajo_stock`` guarda ``stock_actual <= COALESCE(punto_reorden,
+stock_minimo)`` y lo mantiene quien cambia el stock, en el mismo UPDATE
+(``stock.aplicar_stock_producto``) o justo después para los lotes de filas
+(ingesta masiva, carga de catálogo, conciliación). Así "todos los productos
+bajo stock" es un rango del índice ``producto_bajo_stock_idx`` y no una
+evaluación de ``alerta_bajo_stock()`` por fila.
+
+Cuando una salida deja un producto bajo el umbral (estaba sobre él) se encola
+una ``NotificacionStock`` en la misma transacción; las entrega
+``manage.py enviar_notificaciones_stock``.
+"""
+from django.db.models import BooleanField, Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThanOrEqual
+
+
+UMBRAL = Coalesce('punto_reorden', 'stock_minimo')
+BAJO_UMBRAL = Q(stock_actual__lte=UMBRAL)
+
+
+def expr_bajo_stock(stock=None):
+    """Valor de ``bajo_stock`` para el stock ``stock`` (expresión; por defecto la columna)."""
+    return Case(
+        When(LessThanOrEqual(F('stock_actual') if stock is None else stock, UMBRAL), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def productos_bajo_stock(queryset=None):
+    """Productos bajo su punto de reorden (o mínimo), según la marca indexada."""
+    from productos.models import Producto
+
+    return (Producto.objects.all() if queryset is None else queryset).filter(bajo_stock=True)
+
+
+def recalcular(queryset):
+    """Recalcula ``bajo_stock`` de ``queryset`` (productos) en un UPDATE."""
+    return queryset.update(bajo_stock=expr_bajo_stock())
+
+
+def desfasados(queryset):
+    """Productos cuya marca no coincide con su stock (ver ``reconciliar_stock``)."""
+    return queryset.filter(
+        (Q(bajo_stock=True) & ~BAJO_UMBRAL) | (Q(bajo_stock=False) & BAJO_UMBRAL)
+    )
+
+
+# ----------------------------------------------------------
+# NOTIFICACIONES (outbox)
+# ----------------------------------------------------------
+def encolar_reorden(*producto_ids):
+    """Encola el aviso "producto bajo punto de reorden" (dentro de la transacción del movimiento)."""
+    from .models import NotificacionStock
+
+    NotificacionStock.objects.bulk_create([
+        NotificacionStock(tipo=NotificacionStock.REORDEN, producto_id=pk) for pk in producto_ids
+    ])
+
+
+def encolar_lote(lote, mensaje):
+    from .models import NotificacionStock
+
+    NotificacionStock.objects.create(
+        tipo=NotificacionStock.LOTE, producto_id=lote.producto_id, lote=lote, mensaje=mensaje
+    )
@@ -0,0 +1,29 @@
+# inventario/signals.py
+"""Invalidación de las consultas AJAX cacheadas (ver ``inventario/consultas.py``)."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from inventario import consultas
+
+
+@receiver([post_save, post_delete], sender='proveedores.ProductoProveedor')
+def invalidar_productos_proveedor(sender, instance, **kwargs):
+    consultas.tocar_proveedores(instance.proveedor_id)
+
+
+@receiver([post_save, post_delete], sender='inventario.Lote')
+def invalidar_lotes(sender, instance, **kwargs):
+    consultas.tocar_lotes(instance.producto_id)
+
+
+@receiver(post_save, sender='productos.Producto')
+def invalidar_por_producto(sender, instance, created, **kwargs):
+    # Nombre y SKU aparecen en ambas respuestas
+    if created:
+        return
+    from proveedores.models import ProductoProveedor
+
+    consultas.tocar_lotes(instance.pk)
+    consultas.tocar_proveedores(*ProductoProveedor.objects.filter(
+        producto_id=instance.pk
+    ).values_list('proveedor_id', flat=True))
@@ -0,0 +1,721 @@
+# inventario/stock.py
+"""
+Motor de mutación de stock.
+
+Todas las variaciones de ``Producto.stock_actual`` y ``Lote.cantidad_disponible``
+se aplican como UPDATE condicionales con expresiones ``F()``: la base de datos
+suma/resta sobre el valor vigente de la fila, sin leerlo antes en Python.
+Así dos terminales que registran movimientos a la vez no se pisan.
+"""
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+from productos.models import Producto
+from sistema import auditoria, busqueda, condicional, contadores
+from . import consultas, reposicion
+
+
+TIPOS_ENTRADA = ('INGRESO', 'DEVOLUCION')
+TIPOS_SALIDA = ('SALIDA',)
+
+CERO = Value(Decimal('0'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def delta_producto(tipo, cantidad):
+    """Variación que un movimiento produce sobre el stock global del producto."""
+    if tipo in TIPOS_ENTRADA or tipo == 'AJUSTE':
+        return cantidad
+    if tipo in TIPOS_SALIDA:
+        return -cantidad
+    # TRANSFERENCIA: el stock global no cambia
+    return Decimal('0')
+
+
+def aplicar_stock_producto(producto_id, tipo, cantidad):
+    """
+    Aplica el movimiento sobre ``stock_actual`` en un solo UPDATE, que también
+    deja al día ``bajo_stock``. Las salidas no dejan el stock bajo cero (mismo
+    criterio que antes); la conciliación reproduce ese tope movimiento a
+    movimiento (ver ``stock_esperado_producto``).
+
+    Si una salida cruza el punto de reorden (el producto no estaba marcado y
+    ahora queda bajo el umbral) se encola el aviso en la misma transacción:
+    las salidas prueban primero ese UPDATE condicional y, si no cruzan, hacen
+    el normal (dos UPDATE por PK como máximo).
+    """
+    delta = delta_producto(tipo, cantidad)
+    if not delta:
+        return 0
+
+    if tipo in TIPOS_SALIDA:
+        nuevo = Greatest(F('stock_actual') + delta, CERO)
+    else:
+        nuevo = F('stock_actual') + delta
+
+    filas = Producto.objects.filter(pk=producto_id)
+    # bajo_stock va primero en el SET: MySQL evalúa las asignaciones en orden
+    # y las siguientes ya verían el stock_actual nuevo
+    if tipo in TIPOS_SALIDA:
+        cruza = filas.filter(LessThanOrEqual(nuevo, reposicion.UMBRAL), bajo_stock=False)
+        if cruza.update(bajo_stock=True, stock_actual=nuevo):
+            reposicion.encolar_reorden(producto_id)
+            return 1
+    return filas.update(bajo_stock=reposicion.expr_bajo_stock(nuevo), stock_actual=nuevo)
+
+
+def deltas_bodega(tipo, cantidad, origen_id, destino_id):
+    """
+    Variaciones por bodega de un movimiento: ``[(bodega_id, delta), ...]``.
+
+    - INGRESO / DEVOLUCION / AJUSTE suman en destino (u origen si no hay destino).
+    - SALIDA resta en origen (o destino si no hay origen).
+    - TRANSFERENCIA resta en origen y suma en destino.
+    Sin bodega informada no hay nada que mover.
+    """
+    if tipo == 'TRANSFERENCIA':
+        return [(b, d) for b, d in ((origen_id, -cantidad), (destino_id, cantidad)) if b]
+    if tipo in TIPOS_SALIDA:
+        bodega = origen_id or destino_id
+        return [(bodega, -cantidad)] if bodega else []
+    bodega = destino_id or origen_id
+    return [(bodega, cantidad)] if bodega else []
+
+
+def aplicar_stock_bodegas(producto_id, tipo, cantidad, origen_id, destino_id):
+    """
+    Aplica el movimiento sobre ``StockBodega``: un UPDATE por bodega afectada
+    y, solo la primera vez que el producto entra a esa bodega, un INSERT.
+    Los descuentos no dejan la bodega bajo cero: el stock cargado antes de
+    existir ``StockBodega`` (o escrito directo en ``stock_actual``) no tiene
+    fila por bodega y sus salidas no deben rechazarse por eso.
+    """
+    from .models import StockBodega
+
+    for bodega_id, delta in deltas_bodega(tipo, cantidad, origen_id, destino_id):
+        filas = StockBodega.objects.filter(producto_id=producto_id, bodega_id=bodega_id)
+        nuevo = Greatest(F('cantidad') + delta, CERO) if delta < 0 else F('cantidad') + delta
+        if filas.update(cantidad=nuevo):
+            continue
+        try:
+            # Savepoint: si otra terminal creó la fila justo ahora, reintentamos el UPDATE
+            with transaction.atomic():
+                StockBodega.objects.create(
+                    producto_id=producto_id, bodega_id=bodega_id, cantidad=max(delta, Decimal('0'))
+                )
+        except IntegrityError:
+            filas.update(cantidad=nuevo)
+
+
+def sumar_lote(lote, cantidad, inicial=True):
+    """Ingreso sobre un lote existente: suma disponible (e inicial)."""
+    from .models import Lote
+
+    cambios = {'cantidad_disponible': F('cantidad_disponible') + cantidad}
+    if inicial:
+        cambios['cantidad_inicial'] = F('cantidad_inicial') + cantidad
+    filas = Lote.objects.filter(pk=lote.pk).update(**cambios)
+    # update() no dispara señales: invalidamos a mano los lotes del producto
+    consultas.tocar_lotes(lote.producto_id)
+    return filas
+
+
+def descontar_lote(lote, cantidad):
+    """
+    Decremento protegido: ``UPDATE ... WHERE cantidad_disponible >= cantidad``.
+    Si ninguna fila cumple la condición el lote no tenía stock suficiente.
+    """
+    from .models import Lote
+
+    filas = (
+        Lote.objects
+        .filter(pk=lote.pk, cantidad_disponible__gte=cantidad)
+        .update(cantidad_disponible=F('cantidad_disponible') - cantidad)
+    )
+    if not filas:
+        # Solo en el camino de error leemos el valor vigente para informarlo
+        disponible = (
+            Lote.objects.filter(pk=lote.pk)
+            .values_list('cantidad_disponible', flat=True)
+            .first()
+        )
+        raise ValidationError(
+            f"No hay stock suficiente en lote {lote.codigo} "
+            f"(Disponible: {disponible}, requerido: {cantidad})"
+        )
+    consultas.tocar_lotes(lote.producto_id)
+    return filas
+
+
+# ------------------------------------------------------------------
+#     F E F O   (primero en vencer, primero en salir)
+# ------------------------------------------------------------------
+def lotes_fefo(producto_ids, bodega_id=None):
+    """
+    Lotes candidatos para una salida sin lote elegido, bloqueados
+    (``SELECT ... FOR UPDATE``) y en orden FEFO: vencimiento más próximo
+    primero, los lotes sin vencimiento al final; a igual fecha, el más antiguo.
+
+    Los lotes ya vencidos no se asignan solos (se pueden sacar eligiéndolos a
+    mano). Con ``bodega_id`` solo cuentan los lotes de esa bodega.
+    Debe llamarse dentro de una transacción.
+    """
+    from .models import Lote
+
+    qs = (
+        Lote.objects.select_for_update()
+        .filter(producto_id__in=producto_ids, cantidad_disponible__gt=0)
+        .filter(Q(fecha_vencimiento__isnull=True) | Q(fecha_vencimiento__gte=timezone.localdate()))
+        .order_by(F('fecha_vencimiento').asc(nulls_last=True), 'fecha_creacion', 'pk')
+    )
+    if bodega_id:
+        qs = qs.filter(bodega_id=bodega_id)
+    return qs
+
+
+def repartir_fefo(candidatos, disponible, cantidad):
+    """
+    Reparte ``cantidad`` sobre ``candidatos`` (PK de lotes en orden FEFO)
+    según ``disponible`` ({pk: cantidad}), que se descuenta en memoria.
+
+    Devuelve ``[(lote_pk, cantidad), ...]`` o None si no alcanza (en ese caso
+    ``disponible`` no cambia).
+    """
+    asignado, restante = [], cantidad
+    for pk in candidatos:
+        if restante <= 0:
+            break
+        tomado = min(disponible[pk], restante)
+        if tomado > 0:
+            asignado.append((pk, tomado))
+            restante -= tomado
+    if restante > 0:
+        return None
+    for pk, tomado in asignado:
+        disponible[pk] -= tomado
+    return asignado
+
+
+def asignar_fefo(producto_id, cantidad, bodega_id=None):
+    """
+    Salida FEFO de ``cantidad`` de un producto: una consulta bloquea los
+    lotes candidatos, el reparto se hace en memoria y todos los descuentos
+    van en un solo UPDATE.
+
+    Devuelve ``[(lote_pk, codigo, cantidad), ...]`` en orden FEFO.
+    """
+    from .models import Lote
+
+    filas = list(lotes_fefo([producto_id], bodega_id).values_list('pk', 'codigo', 'cantidad_disponible'))
+    disponible = {pk: d for pk, _, d in filas}
+    asignado = repartir_fefo([pk for pk, _, _ in filas], disponible, cantidad)
+    if asignado is None:
+        raise ValidationError(
+            f"No hay stock suficiente en lotes vigentes "
+            f"(Disponible: {sum(d for _, _, d in filas)}, requerido: {cantidad})"
+        )
+    # Las filas están bloqueadas y solo el último lote queda con saldo (los
+    # anteriores se agotan): un UPDATE con un único CASE, sea cual sea el reparto
+    ultimo = asignado[-1][0]
+    Lote.objects.filter(pk__in=[pk for pk, _ in asignado]).update(
+        cantidad_disponible=Case(When(pk=ultimo, then=Value(disponible[ultimo])), default=CERO)
+    )
+    consultas.tocar_lotes(producto_id)
+    codigos = {pk: codigo for pk, codigo, _ in filas}
+    return [(pk, codigos[pk], tomado) for pk, tomado in asignado]
+
+
+# ------------------------------------------------------------------
+#        I N G E S T A   M A S I V A   D E   M O V I M I E N T O S
+# ------------------------------------------------------------------
+TAMANO_BLOQUE = 500
+
+CAMPOS_MOVIMIENTO = (
+    'tipo', 'producto', 'proveedor', 'bodega_origen', 'bodega_destino',
+    'cantidad', 'lote', 'serie', 'fecha_vencimiento', 'observacion',
+    'documento_referencia',
+)
+CAMPOS_FK = ('producto', 'proveedor', 'bodega_origen', 'bodega_destino', 'lote')
+CAMPOS_TEXTO = ('serie', 'documento_referencia', 'observacion')
+# observacion es TEXT sin max_length: en MySQL la columna admite 64 KB
+BYTES_TEXTO = 65535
+
+
+def _bloques(valores, tamano=TAMANO_BLOQUE):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def _existentes(queryset, ids, *campos):
+    """Busca ``ids`` por bloques (evita límites de parámetros en SQLite)."""
+    encontrados = {}
+    for bloque in _bloques(ids):
+        for fila in queryset.filter(pk__in=bloque).values('pk', *campos):
+            encontrados[fila['pk']] = fila
+    return encontrados
+
+
+def _normalizar(item):
+    """
+    Acepta un dict (API) o un MovimientoInventario sin guardar.
+
+    Lo que no calza con las columnas (cantidad con más dígitos o decimales de
+    los que admite, fechas imposibles, textos largos) queda en
+    ``fila['_problemas']`` para informarlo como error de la fila en vez de
+    fallar al escribir.
+    """
+    from .models import MovimientoInventario
+
+    columna = MovimientoInventario._meta.get_field
+    if isinstance(item, dict):
+        fila = {campo: item.get(campo) for campo in CAMPOS_MOVIMIENTO}
+    else:
+        fila = {campo: getattr(item, campo, None) for campo in CAMPOS_MOVIMIENTO}
+        for campo in CAMPOS_FK:
+            fila[campo] = getattr(item, f'{campo}_id', None)
+        fila['_usuario'] = item.usuario_id
+
+    for campo in CAMPOS_FK:
+        valor = fila[campo]
+        if hasattr(valor, 'pk'):
+            valor = valor.pk
+        if valor in ('', None):
+            fila[campo] = None
+        else:
+            try:
+                fila[campo] = int(valor)
+            except (TypeError, ValueError):
+                fila[campo] = str(valor)  # se informa como inexistente
+    if fila['tipo'] is not None and not isinstance(fila['tipo'], str):
+        fila['tipo'] = str(fila['tipo'])  # se informa como inválido
+
+    problemas = []
+    try:
+        fila['cantidad'] = Decimal(str(fila['cantidad']))
+    except (InvalidOperation, TypeError, ValueError):
+        fila['cantidad'] = None
+    if fila['cantidad'] is not None:
+        if not fila['cantidad'].is_finite():
+            fila['cantidad'] = None
+        else:
+            try:
+                # normalize(): "5.00" o "1E+2" no exceden lo que admite la columna
+                columna('cantidad').run_validators(fila['cantidad'].normalize())
+            except ValidationError:
+                problemas.append(
+                    f"La cantidad admite como máximo {columna('cantidad').max_digits} dígitos "
+                    f"y {columna('cantidad').decimal_places} decimales."
+                )
+
+    try:
+        fila['fecha_vencimiento'] = columna('fecha_vencimiento').to_python(fila['fecha_vencimiento'] or None)
+    except (ValidationError, TypeError, ValueError):
+        fila['fecha_vencimiento'] = None
+        problemas.append("Fecha de vencimiento inválida (formato AAAA-MM-DD).")
+
+    for nombre in CAMPOS_TEXTO:
+        if fila[nombre] is None:
+            continue
+        fila[nombre] = str(fila[nombre])
+        maximo = columna(nombre).max_length
+        if maximo is not None and len(fila[nombre]) > maximo:
+            problemas.append(f"{nombre}: máximo {maximo} caracteres.")
+        elif len(fila[nombre].encode()) > BYTES_TEXTO:
+            problemas.append(f"{nombre}: máximo {BYTES_TEXTO} bytes.")
+    fila['_problemas'] = problemas
+    return fila
+
+
+def actualizar_por_caso(queryset, campo, deltas):
+    """
+    Suma a ``campo`` un delta distinto por fila con un UPDATE por bloque:
+    ``SET campo = campo + CASE id WHEN .. THEN .. END``.
+    """
+    filas = 0
+    salida = DecimalField(max_digits=12, decimal_places=2)
+    for bloque in _bloques(deltas.items()):
+        caso = Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in bloque],
+            default=Value(Decimal('0')),
+            output_field=salida,
+        )
+        filas += queryset.filter(pk__in=[pk for pk, _ in bloque]).update(**{campo: F(campo) + caso})
+    return filas
+
+
+def _aplicar_deltas_bodega(StockBodega, deltas):
+    """Crea las filas (producto, bodega) que falten y aplica los deltas por PK."""
+    deltas = {clave: d for clave, d in deltas.items() if d}
+    if not deltas:
+        return
+    StockBodega.objects.bulk_create(
+        [StockBodega(producto_id=p, bodega_id=b) for p, b in deltas],
+        batch_size=TAMANO_BLOQUE,
+        ignore_conflicts=True,
+    )
+    pks = {}
+    bodegas = {b for _, b in deltas}
+    for bloque in _bloques({p for p, _ in deltas}):
+        filas = StockBodega.objects.filter(producto_id__in=bloque, bodega_id__in=bodegas)
+        for pk, p, b in filas.values_list('pk', 'producto_id', 'bodega_id'):
+            pks[(p, b)] = pk
+
+    actualizar_por_caso(StockBodega.objects.all(), 'cantidad', {pks[c]: d for c, d in deltas.items()})
+
+
+def registrar_movimientos_en_lote(movimientos, usuario=None):
+    """
+    Registra muchos movimientos de una vez con el mismo efecto sobre el
+    stock que ``MovimientoInventario.save`` fila a fila:
+
+    - valida todo el lote con unas pocas consultas por conjunto,
+    - agrupa los deltas por producto y por lote y los aplica con UPDATE
+      agregados (``CASE``),
+    - inserta los movimientos con un solo ``bulk_create``.
+
+    Devuelve ``(creados, errores)``. Si hay errores no se escribe nada;
+    cada error es ``{"fila": indice, "errores": [...]}``.
+
+    Una SALIDA sin lote de un producto controlado por lote se reparte en
+    orden FEFO (``repartir_fefo``) y se inserta como un movimiento por lote
+    usado, igual que en ``MovimientoInventario.registrar``; ``creados``
+    incluye esas filas.
+
+    Como en ``save()``, una salida o transferencia no deja el producto ni la
+    bodega bajo cero: el tope se aplica fila a fila (en orden, contando los
+    ingresos anteriores del mismo lote de movimientos) sobre las filas de
+    producto y bodega bloqueadas, no sobre el neto del lote.
+    """
+    from .models import Bodega, Lote, MovimientoInventario, StockBodega, TIPO_MOVIMIENTO
+    from proveedores.models import Proveedor
+
+    filas = [_normalizar(item) for item in movimientos]
+    if not filas:
+        return [], []
+
+    tipos_validos = {valor for valor, _ in TIPO_MOVIMIENTO}
+
+    def ids_de(*campos):
+        return {f[c] for f in filas for c in campos if isinstance(f[c], int)}
+
+    with transaction.atomic():
+        productos = _existentes(
+            Producto.objects.select_for_update(), ids_de('producto'),
+            'sku', 'control_por_lote', 'stock_actual',
+        )
+        proveedores = _existentes(Proveedor.objects.all(), ids_de('proveedor'))
+        bodegas = _existentes(Bodega.objects.all(), ids_de('bodega_origen', 'bodega_destino'))
+        # Los lotes involucrados se bloquean una vez para todo el lote de movimientos
+        lotes = _existentes(
+            Lote.objects.select_for_update(), ids_de('lote'),
+            'codigo', 'producto_id', 'cantidad_disponible',
+        )
+
+        errores = []
+        disponible = {pk: lote['cantidad_disponible'] for pk, lote in lotes.items()}
+
+        # Saldos vigentes: las salidas/transferencias se acotan a cero fila a
+        # fila sobre ellos, igual que save() movimiento a movimiento
+        saldo = {pk: producto['stock_actual'] for pk, producto in productos.items()}
+        saldo_bodega = defaultdict(Decimal)  # (producto_id, bodega_id) → cantidad
+        descuentan = {f['producto'] for f in filas if f['tipo'] in TIPOS_SALIDA + ('TRANSFERENCIA',)}
+        for bloque in _bloques(descuentan & productos.keys()):
+            existentes = (
+                StockBodega.objects.select_for_update()
+                .filter(producto_id__in=bloque, bodega_id__in=bodegas.keys())
+                .values_list('producto_id', 'bodega_id', 'cantidad')
+            )
+            for p, b, cantidad in existentes:
+                saldo_bodega[(p, b)] = cantidad
+
+        # Candidatos FEFO de las salidas sin lote: (producto, bodega) → [pk, ...]
+        # y (producto, None) → todos los del producto, en orden FEFO
+        fefo = defaultdict(list)
+        sin_lote = {
+            f['producto'] for f in filas
+            if f['tipo'] in TIPOS_SALIDA and f['lote'] is None
+            and productos.get(f['producto'], {}).get('control_por_lote')
+        }
+        for bloque in _bloques(sin_lote):
+            candidatos = lotes_fefo(bloque).values('pk', 'codigo', 'producto_id', 'bodega_id', 'cantidad_disponible')
+            for lote in candidatos:
+                lotes.setdefault(lote['pk'], lote)
+                disponible.setdefault(lote['pk'], lote['cantidad_disponible'])
+                fefo[(lote['producto_id'], None)].append(lote['pk'])
+                if lote['bodega_id']:
+                    fefo[(lote['producto_id'], lote['bodega_id'])].append(lote['pk'])
+        delta_stock = defaultdict(Decimal)
+        con_salidas = set()
+        delta_bodega = defaultdict(Decimal)  # (producto_id, bodega_id) → delta
+        delta_lote = defaultdict(Decimal)
+        ingreso_lote = defaultdict(Decimal)
+        lotes_nuevos = defaultdict(list)  # producto_id → [índices de fila]
+
+        for i, f in enumerate(filas):
+            problemas = f.pop('_problemas')
+            tipo, cantidad = f['tipo'], f['cantidad']
+            producto = productos.get(f['producto'])
+
+            if tipo not in tipos_validos:
+                problemas.append(f"Tipo de movimiento inválido: {tipo!r}.")
+            if cantidad is None or cantidad <= 0:
+                problemas.append("La cantidad debe ser mayor que cero.")
+            if producto is None:
+                problemas.append("Producto inexistente.")
+            if f['proveedor'] is not None and f['proveedor'] not in proveedores:
+                problemas.append("Proveedor inexistente.")
+            for campo in ('bodega_origen', 'bodega_destino'):
+                if f[campo] is not None and f[campo] not in bodegas:
+                    problemas.append(f"{campo} inexistente.")
+            if tipo == 'TRANSFERENCIA':
+                if not f['bodega_origen'] or not f['bodega_destino']:
+                    problemas.append("La transferencia requiere bodega de origen y destino.")
+                elif f['bodega_origen'] == f['bodega_destino']:
+                    problemas.append("La bodega destino no puede ser igual a la de origen.")
+
+            lote = None
+            if f['lote'] is not None:
+                lote = lotes.get(f['lote'])
+                if lote is None:
+                    problemas.append("Lote inexistente.")
+                elif producto and lote['producto_id'] != f['producto']:
+                    problemas.append("El lote no corresponde al producto.")
+
+            if problemas:
+                errores.append({'fila': i, 'errores': problemas})
+                continue
+
+            # ---- Efecto sobre el stock (mismo orden y mismo tope que save()) ----
+            delta = max(delta_producto(tipo, cantidad), -saldo[f['producto']])
+            saldo[f['producto']] += delta
+            delta_stock[f['producto']] += delta
+            if tipo in TIPOS_SALIDA:
+                con_salidas.add(f['producto'])
+            for bodega_id, d in deltas_bodega(tipo, cantidad, f['bodega_origen'], f['bodega_destino']):
+                clave = (f['producto'], bodega_id)
+                d = max(d, -saldo_bodega[clave])
+                saldo_bodega[clave] += d
+                delta_bodega[clave] += d
+
+            if not producto['control_por_lote']:
+                continue
+
+            if tipo in TIPOS_ENTRADA:
+                if lote:
+                    disponible[lote['pk']] += cantidad
+                    delta_lote[lote['pk']] += cantidad
+                    ingreso_lote[lote['pk']] += cantidad
+                else:
+                    lotes_nuevos[f['producto']].append(i)
+            elif not lote and tipo not in TIPOS_SALIDA:
+                errores.append({'fila': i, 'errores': ["Debe seleccionar lote para este movimiento."]})
+            elif not lote:
+                candidatos = fefo[(f['producto'], f['bodega_origen'] or f['bodega_destino'])]
+                asignado = repartir_fefo(candidatos, disponible, cantidad)
+                if asignado is None:
+                    errores.append({'fila': i, 'errores': [
+                        f"No hay stock suficiente en lotes vigentes "
+                        f"(Disponible: {sum(disponible[pk] for pk in candidatos)}, requerido: {cantidad})"
+                    ]})
+                else:
+                    f['_fefo'] = asignado
+                    for pk, tomado in asignado:
+                        delta_lote[pk] -= tomado
+            elif disponible[lote['pk']] < cantidad:
+                errores.append({'fila': i, 'errores': [
+                    f"No hay stock suficiente en lote {lote['codigo']} "
+                    f"(Disponible: {disponible[lote['pk']]}, requerido: {cantidad})"
+                ]})
+            else:
+                disponible[lote['pk']] -= cantidad
+                delta_lote[lote['pk']] -= cantidad
+
+        if errores:
+            transaction.set_rollback(True)
+            return [], errores
+
+        # ---- Lotes creados automáticamente para ingresos sin lote ----
+        nuevos = []
+        for producto_id, indices in lotes_nuevos.items():
+            producto = Producto(pk=producto_id, sku=productos[producto_id]['sku'])
+            codigos = Lote.generar_codigos(producto, len(indices))
+            for i, codigo in zip(indices, codigos):
+                f = filas[i]
+                f['_codigo_lote'] = codigo
+                nuevos.append(Lote(
+                    codigo=codigo,
+                    producto_id=producto_id,
+                    bodega_id=f['bodega_destino'] or f['bodega_origen'],
+                    cantidad_inicial=f['cantidad'],
+                    cantidad_disponible=f['cantidad'],
+                    fecha_vencimiento=f['fecha_vencimiento'],
+                ))
+        if nuevos:
+            Lote.objects.bulk_create(nuevos, batch_size=TAMANO_BLOQUE)
+            # MySQL no devuelve las PK de bulk_create: se recuperan por código
+            por_codigo = {}
+            for bloque in _bloques([l.codigo for l in nuevos]):
+                por_codigo.update(Lote.objects.filter(codigo__in=bloque).values_list('codigo', 'pk'))
+            for f in filas:
+                if '_codigo_lote' in f:
+                    f['lote'] = por_codigo[f.pop('_codigo_lote')]
+
+        # ---- UPDATE agregados ----
+        # Productos con salidas que ya estaban bajo el umbral (filas bloqueadas arriba)
+        ya_bajos = set()
+        for bloque in _bloques(con_salidas):
+            ya_bajos.update(
+                Producto.objects.filter(pk__in=bloque, bajo_stock=True).values_list('pk', flat=True)
+            )
+        actualizar_por_caso(Producto.objects.all(), 'stock_actual', {pk: d for pk, d in delta_stock.items() if d})
+        cruzan = set()
+        for bloque in _bloques({pk for pk, d in delta_stock.items() if d}):
+            reposicion.recalcular(Producto.objects.filter(pk__in=bloque))
+        for bloque in _bloques(con_salidas):
+            cruzan.update(reposicion.productos_bajo_stock().filter(pk__in=bloque).values_list('pk', flat=True))
+        reposicion.encolar_reorden(*(cruzan - ya_bajos))
+        actualizar_por_caso(Lote.objects.all(), 'cantidad_disponible', {pk: d for pk, d in delta_lote.items() if d})
+        actualizar_por_caso(Lote.objects.all(), 'cantidad_inicial', ingreso_lote)
+        consultas.tocar_lotes(*{lotes[pk]['producto_id'] for pk in delta_lote}, *lotes_nuevos)
+        _aplicar_deltas_bodega(StockBodega, delta_bodega)
+
+        # ---- INSERT de los movimientos (las salidas FEFO, una fila por lote) ----
+        filas = [
+            {**f, 'lote': lote_pk, 'cantidad': tomado}
+            for f in filas
+            for lote_pk, tomado in (f.pop('_fefo', None) or [(f['lote'], f['cantidad'])])
+        ]
+        # bulk_create no dispara post_save: el índice de búsqueda se alimenta
+        # con los ids nuevos. MySQL no los devuelve: ahí se toman por rango (en
+        # el peor caso se reindexan también filas ajenas confirmadas entretanto)
+        ultimo = MovimientoInventario.objects.aggregate(m=Max('pk'))['m'] or 0
+        creados = MovimientoInventario.objects.bulk_create(
+            [
+                MovimientoInventario(
+                    usuario_id=f.get('_usuario') or getattr(usuario, 'pk', None),
+                    **{(f'{c}_id' if c in CAMPOS_FK else c): f[c] for c in CAMPOS_MOVIMIENTO},
+                )
+                for f in filas
+            ],
+            batch_size=TAMANO_BLOQUE,
+        )
+        if all(m.pk for m in creados):
+            for bloque in _bloques([m.pk for m in creados]):
+                busqueda.indexar(MovimientoInventario.objects.filter(pk__in=bloque))
+        else:
+            busqueda.indexar(MovimientoInventario.objects.filter(pk__gt=ultimo))
+        contadores.sumar('inventario', len(creados))
+        condicional.tocar_modelo(MovimientoInventario)
+        # Un solo registro de actividad por lote, no uno por fila
+        if usuario is not None and usuario.is_authenticated:
+            auditoria.registrar(
+                usuario.pk,
+                f"MovimientoInventario creado: {len(creados)} movimientos registrados en lote",
+                'MovimientoInventario',
+            )
+
+    return creados, []
+
+
+# ------------------------------------------------------------------
+#     S A L D O S   E S P E R A D O S   S E G Ú N   E L   H I S T O R I A L
+# ------------------------------------------------------------------
+# Mismas reglas que save()/registrar_movimientos_en_lote, expresadas en SQL
+# para que la conciliación se calcule completa en la base de datos.
+SALIDA_DECIMAL = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _suma(movimientos, expresion):
+    """Subquery escalar: SUM(expresion) de ``movimientos`` (0 si no hay filas)."""
+    total = (
+        movimientos.order_by()
+        .annotate(_g=Value(1))
+        .values('_g')
+        .annotate(total=Sum(expresion, output_field=SALIDA_DECIMAL))
+        .values('total')
+    )
+    return Coalesce(Subquery(total, output_field=SALIDA_DECIMAL), CERO, output_field=SALIDA_DECIMAL)
+
+
+def _suma_con_tope(movimientos, expresion):
+    """
+    Saldo de ``movimientos`` aplicados en orden de PK con el tope en cero de
+    cada salida, como lo hace el motor: ``max(saldo + delta, 0)`` paso a paso.
+
+    No hace falta recorrerlos en Python: con S_k la suma acumulada (S_0 = 0),
+    el saldo acotado final es ``S_n - min(S_0..S_n)``. La suma acumulada es
+    una función de ventana y su mínimo un ``ORDER BY ... LIMIT 1``.
+    """
+    acumulado = Window(Sum(expresion, output_field=SALIDA_DECIMAL), order_by=F('pk').asc())
+    minimo = (
+        movimientos.order_by()
+        .annotate(_acumulado=acumulado)
+        .order_by('_acumulado')
+        .values('_acumulado')[:1]
+    )
+    minimo = Coalesce(Subquery(minimo, output_field=SALIDA_DECIMAL), CERO, output_field=SALIDA_DECIMAL)
+    return ExpressionWrapper(
+        _suma(movimientos, expresion) - Least(minimo, CERO), output_field=SALIDA_DECIMAL
+    )
+
+
+def expr_delta_producto():
+    return Case(
+        When(tipo__in=TIPOS_ENTRADA + ('AJUSTE',), then=F('cantidad')),
+        When(tipo__in=TIPOS_SALIDA, then=-F('cantidad')),
+        default=CERO,
+        output_field=SALIDA_DECIMAL,
+    )
+
+
+def stock_esperado_producto():
+    """Anotación para ``Producto``: stock según el historial (acotado a cero en cada salida)."""
+    from .models import MovimientoInventario
+
+    movimientos = MovimientoInventario.objects.filter(producto=OuterRef('pk'))
+    return _suma_con_tope(movimientos, expr_delta_producto())
+
+
+def disponible_esperado_lote():
+    """Anotación para ``Lote``: ingresos menos salidas/ajustes/transferencias."""
+    from .models import MovimientoInventario
+
+    movimientos = MovimientoInventario.objects.filter(lote=OuterRef('pk'))
+    delta = Case(
+        When(tipo__in=TIPOS_ENTRADA, then=F('cantidad')),
+        default=-F('cantidad'),
+        output_field=SALIDA_DECIMAL,
+    )
+    return _suma(movimientos, delta)
+
+
+def stock_esperado_bodega():
+    """Anotación para ``StockBodega`` siguiendo ``deltas_bodega`` (con el mismo tope en cero)."""
+    from .models import MovimientoInventario
+
+    bodega = OuterRef('bodega')
+    entradas = TIPOS_ENTRADA + ('AJUSTE',)
+    movimientos = MovimientoInventario.objects.filter(
+        Q(bodega_origen=bodega) | Q(bodega_destino=bodega),
+        producto=OuterRef('producto'),
+    )
+    delta = Case(
+        When(tipo='TRANSFERENCIA', bodega_origen=bodega, then=-F('cantidad')),
+        When(tipo='TRANSFERENCIA', bodega_destino=bodega, then=F('cantidad')),
+        When(tipo__in=entradas, bodega_destino=bodega, then=F('cantidad')),
+        When(tipo__in=entradas, bodega_destino__isnull=True, then=F('cantidad')),
+        When(tipo__in=TIPOS_SALIDA, bodega_origen=bodega, then=-F('cantidad')),
+        When(tipo__in=TIPOS_SALIDA, bodega_origen__isnull=True, then=-F('cantidad')),
+        default=CERO,
+        output_field=SALIDA_DECIMAL,
+    )
+    return _suma_con_tope(movimientos, delta)
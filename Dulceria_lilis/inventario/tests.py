@@ -1,3 +1,552 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from inventario.models import (
+    Bodega, ConciliacionStock, Lote, MovimientoInventario, NotificacionStock, SecuenciaLote, StockBodega,
+)
+from inventario import demanda, reposicion, vencimientos
+from inventario.management.commands.benchmark_indices import Command as BenchmarkIndices
+from inventario.stock import registrar_movimientos_en_lote
+from productos.models import Producto
+from proveedores.models import ProductoProveedor, Proveedor
+from usuarios.models import Usuario
+from utils.paginacion import paginar_keyset
+
+
+class StockTestMixin:
+
+    def setUp(self):
+        self.producto = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+        self.central = Bodega.objects.create(codigo='BOD-1', nombre='Central')
+        self.sala = Bodega.objects.create(codigo='BOD-2', nombre='Sala')
+
+    def mover(self, tipo, cantidad, origen=None, destino=None, **extra):
+        return MovimientoInventario.objects.create(
+            tipo=tipo, producto=self.producto, cantidad=Decimal(cantidad),
+            bodega_origen=origen, bodega_destino=destino, **extra,
+        )
+
+    def stock(self):
+        self.producto.refresh_from_db()
+        return self.producto.stock_actual
+
+    def en_bodega(self, bodega):
+        fila = StockBodega.objects.filter(producto=self.producto, bodega=bodega).first()
+        return fila.cantidad if fila else Decimal('0')
+
+    def conciliar(self, *opciones):
+        call_command('reconciliar_stock', *opciones, stdout=StringIO())
+        return ConciliacionStock.objects.first()
+
+
+class AplicarStockTests(StockTestMixin, TestCase):
+
+    def test_ingreso_salida_y_transferencia(self):
+        self.mover('INGRESO', '10', destino=self.central)
+        self.mover('SALIDA', '4', origen=self.central)
+        self.mover('TRANSFERENCIA', '5', origen=self.central, destino=self.sala)
+
+        self.assertEqual(self.stock(), Decimal('6'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('1'))
+        self.assertEqual(self.en_bodega(self.sala), Decimal('5'))
+
+    def test_salida_sin_stock_se_acota_a_cero(self):
+        self.mover('INGRESO', '3', destino=self.central)
+        self.mover('SALIDA', '5', origen=self.central)
+
+        self.assertEqual(self.stock(), Decimal('0'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('0'))
+        self.assertEqual(MovimientoInventario.objects.count(), 2)
+
+    def test_salida_de_stock_anterior_a_stockbodega(self):
+        # Stock cargado sin movimientos (fixture, API o antes de la migración): sin fila por bodega
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=Decimal('20'))
+
+        self.mover('SALIDA', '5', origen=self.central)
+        self.mover('TRANSFERENCIA', '2', origen=self.central, destino=self.sala)
+
+        self.assertEqual(self.stock(), Decimal('15'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('0'))
+        self.assertEqual(self.en_bodega(self.sala), Decimal('2'))
+
+    def test_lote_de_movimientos_acota_fila_a_fila(self):
+        fila = {'producto': self.producto.pk}
+        creados, errores = registrar_movimientos_en_lote([
+            {**fila, 'tipo': 'INGRESO', 'cantidad': '5', 'bodega_destino': self.central.pk},
+            {**fila, 'tipo': 'SALIDA', 'cantidad': '5', 'bodega_origen': self.central.pk},
+            {**fila, 'tipo': 'SALIDA', 'cantidad': '1', 'bodega_origen': self.central.pk},
+            {**fila, 'tipo': 'INGRESO', 'cantidad': '10', 'bodega_destino': self.central.pk},
+        ])
+        # La tercera fila se acota en su turno, no contra el neto del lote (que daría 9)
+        self.assertEqual((len(creados), errores), (4, []))
+        self.assertEqual(self.stock(), Decimal('10'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('10'))
+
+        creados, errores = registrar_movimientos_en_lote([
+            {**fila, 'tipo': 'TRANSFERENCIA', 'cantidad': '15',
+             'bodega_origen': self.central.pk, 'bodega_destino': self.sala.pk},
+            {**fila, 'tipo': 'SALIDA', 'cantidad': '2', 'bodega_origen': self.sala.pk},
+        ])
+        self.assertEqual((len(creados), errores), (2, []))
+        self.assertEqual(self.stock(), Decimal('8'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('0'))
+        self.assertEqual(self.en_bodega(self.sala), Decimal('13'))
+
+        registro = self.conciliar()
+        self.assertEqual((registro.productos_con_diferencia, registro.bodegas_con_diferencia), (0, 0))
+
+
+class ReconciliarStockTests(StockTestMixin, TestCase):
+
+    def test_salida_acotada_y_luego_ingreso_concilia(self):
+        # La salida se acota a 0 (stock real 10): el historial sumado sin tope
+        # esperaría 10 - 5 = 5 y --fix dejaría el stock en 5
+        self.mover('SALIDA', '5', origen=self.central)
+        self.mover('INGRESO', '10', destino=self.central)
+
+        registro = self.conciliar('--fix')
+        self.assertEqual(
+            (registro.productos_con_diferencia, registro.bodegas_con_diferencia), (0, 0)
+        )
+        self.assertEqual(self.stock(), Decimal('10'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('10'))
+
+    def test_sigue_el_tope_movimiento_a_movimiento(self):
+        pasos = [
+            ('INGRESO', '3', None, self.central),
+            ('SALIDA', '5', self.central, None),  # 0
+            ('INGRESO', '4', None, self.central),  # 4
+            ('TRANSFERENCIA', '6', self.central, self.sala),  # central 0, sala 6
+            ('SALIDA', '1', self.central, None),  # stock 3, central sigue en 0
+            ('SALIDA', '9', self.sala, None),  # stock 0, sala 0
+            ('AJUSTE', '2', None, self.sala),
+        ]
+        for tipo, cantidad, origen, destino in pasos:
+            self.mover(tipo, cantidad, origen=origen, destino=destino)
+        self.assertEqual(
+            (self.stock(), self.en_bodega(self.central), self.en_bodega(self.sala)),
+            (Decimal('2'), Decimal('0'), Decimal('2')),
+        )
+
+        registro = self.conciliar()
+        self.assertEqual((registro.productos_con_diferencia, registro.bodegas_con_diferencia), (0, 0))
+
+    def test_sin_fix_informa_y_con_fix_corrige(self):
+        self.mover('INGRESO', '10', destino=self.central)
+        self.mover('SALIDA', '3', origen=self.central)
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=Decimal('50'))
+        StockBodega.objects.filter(bodega=self.central).update(cantidad=Decimal('1'))
+
+        registro = self.conciliar()
+        self.assertEqual((registro.productos_con_diferencia, registro.bodegas_con_diferencia), (1, 1))
+        self.assertFalse(registro.corregido)
+        self.assertEqual(self.stock(), Decimal('50'))
+
+        registro = self.conciliar('--fix')
+        self.assertTrue(registro.corregido)
+        self.assertEqual(self.stock(), Decimal('7'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('7'))
+
+        registro = self.conciliar()
+        self.assertEqual((registro.productos_con_diferencia, registro.bodegas_con_diferencia), (0, 0))
+
+    def test_since_revisa_movimientos_editados(self):
+        movimiento = self.mover('INGRESO', '10', destino=self.central)
+        MovimientoInventario.objects.filter(pk=movimiento.pk).update(fecha=timezone.now() - timedelta(days=30))
+        self.assertEqual(self.conciliar().productos_con_diferencia, 0)
+
+        # Edición como la de MovimientoInventarioUpdateView: no vuelve a aplicar el delta
+        movimiento.refresh_from_db()
+        movimiento.cantidad = Decimal('12')
+        movimiento.save()
+
+        registro = self.conciliar('--since', 'ultimo', '--fix')
+        self.assertEqual((registro.productos_con_diferencia, registro.bodegas_con_diferencia), (1, 1))
+        self.assertEqual(self.stock(), Decimal('12'))
+        self.assertEqual(self.conciliar('--since', 'ultimo').productos_con_diferencia, 0)
+
+
+class SalidaFefoTests(StockTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Producto.objects.filter(pk=self.producto.pk).update(control_por_lote=True)
+        self.producto.refresh_from_db()
+        hoy = timezone.localdate()
+        # Ingresos sin lote: cada uno crea su lote con la fecha indicada
+        self.tardio = self.ingreso('4', hoy + timedelta(days=300))
+        self.proximo = self.ingreso('10', hoy + timedelta(days=30))
+        self.vencido = self.ingreso('3', hoy - timedelta(days=1))
+        self.sin_fecha = self.ingreso('6', None)
+
+    def ingreso(self, cantidad, vence):
+        return self.mover('INGRESO', cantidad, destino=self.central, fecha_vencimiento=vence).lote
+
+    def disponibles(self):
+        return {
+            lote.pk: lote.cantidad_disponible
+            for lote in Lote.objects.filter(producto=self.producto)
+        }
+
+    def test_alerta_de_ingreso_usa_el_disponible_guardado(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock_minimo=Decimal('5'))
+        self.producto.refresh_from_db()
+        desactualizado = Lote.objects.get(pk=self.proximo.pk)  # 10 en memoria
+        self.mover('SALIDA', '8', origen=self.central, lote=self.proximo)
+
+        self.mover('INGRESO', '1', destino=self.central, lote=desactualizado)
+
+        self.assertEqual(desactualizado.cantidad_disponible, Decimal('3'))
+        alerta = NotificacionStock.objects.get(tipo=NotificacionStock.LOTE, lote=self.proximo)
+        self.assertIn('queda en 3', alerta.mensaje)
+
+    def test_reparte_en_orden_fefo_sin_modificar_la_solicitud(self):
+        solicitud = MovimientoInventario(
+            tipo='SALIDA', producto=self.producto, cantidad=Decimal('16'), bodega_origen=self.central,
+        )
+        registrados = solicitud.registrar()
+
+        # Próximo a vencer primero, luego el más tardío, luego sin fecha; el vencido no se toca
+        self.assertEqual(
+            [(m.lote_id, m.cantidad) for m in registrados],
+            [(self.proximo.pk, Decimal('10')), (self.tardio.pk, Decimal('4')), (self.sin_fecha.pk, Decimal('2'))],
+        )
+        self.assertTrue(all(m.pk for m in registrados))
+        self.assertEqual((solicitud.pk, solicitud.lote_id, solicitud.cantidad), (None, None, Decimal('16')))
+        self.assertEqual(self.disponibles(), {
+            self.tardio.pk: Decimal('0'), self.proximo.pk: Decimal('0'),
+            self.vencido.pk: Decimal('3'), self.sin_fecha.pk: Decimal('4'),
+        })
+        self.assertEqual(self.stock(), Decimal('7'))
+        self.assertEqual(self.en_bodega(self.central), Decimal('7'))
+
+        registro = self.conciliar()
+        self.assertEqual(
+            (registro.productos_con_diferencia, registro.lotes_con_diferencia, registro.bodegas_con_diferencia),
+            (0, 0, 0),
+        )
+
+    def test_sin_stock_en_lotes_vigentes_no_cambia_nada(self):
+        solicitud = MovimientoInventario(
+            tipo='SALIDA', producto=self.producto, cantidad=Decimal('21'), bodega_origen=self.central,
+        )
+        with self.assertRaisesMessage(ValidationError, 'No hay stock suficiente en lotes vigentes'):
+            solicitud.registrar()
+        self.assertEqual(self.stock(), Decimal('23'))
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='SALIDA').count(), 0)
+        self.assertEqual(self.disponibles()[self.proximo.pk], Decimal('10'))
+
+    def test_save_exige_lote(self):
+        with self.assertRaisesMessage(ValidationError, 'Debe seleccionar lote'):
+            self.mover('SALIDA', '1', origen=self.central)
+        self.assertEqual(self.stock(), Decimal('23'))
+
+    def test_lote_de_movimientos_reparte_igual(self):
+        creados, errores = registrar_movimientos_en_lote([
+            {'tipo': 'SALIDA', 'producto': self.producto.pk, 'cantidad': '12', 'bodega_origen': self.central.pk},
+        ])
+        self.assertEqual(errores, [])
+        self.assertEqual(
+            [(m.lote_id, m.cantidad) for m in creados],
+            [(self.proximo.pk, Decimal('10')), (self.tardio.pk, Decimal('2'))],
+        )
+        self.assertEqual(self.stock(), Decimal('11'))
+
+
+class SecuenciaLoteTests(TestCase):
+
+    def setUp(self):
+        self.producto = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+
+    def lote(self, codigo, producto=None):
+        return Lote.objects.create(codigo=codigo, producto=producto or self.producto)
+
+    def test_primera_reserva_parte_del_mayor_codigo_existente(self):
+        self.lote('LOT-SKU-1-0007')
+        self.lote('LOT-SKU-1-0003')
+        self.lote('LOT-SKU-1-ESPECIAL')  # sufijo no numérico: no cuenta
+        otro = Producto.objects.create(sku='SKU-1-A', nombre='Menta', categoria='Dulces')
+        self.lote('LOT-SKU-1-A-0050', otro)  # mismo prefijo, otro SKU
+
+        self.assertEqual(Lote.generar_codigo(self.producto), 'LOT-SKU-1-0008')
+        self.assertEqual(
+            Lote.generar_codigos(self.producto, 3),
+            ['LOT-SKU-1-0009', 'LOT-SKU-1-0010', 'LOT-SKU-1-0011'],
+        )
+        self.assertEqual(SecuenciaLote.objects.get(producto=self.producto).ultimo, 11)
+        self.assertEqual(Lote.generar_codigo(otro), 'LOT-SKU-1-A-0051')
+
+    def test_sin_lotes_empieza_en_uno(self):
+        self.assertEqual(SecuenciaLote.reservar(self.producto, 5), 1)
+        self.assertEqual(SecuenciaLote.reservar(self.producto), 6)
+
+    def test_secuencia_creada_por_otro_proceso_al_mismo_tiempo(self):
+        self.lote('LOT-SKU-1-0004')
+        original = SecuenciaLote._incrementar
+
+        def incrementar_con_carrera(producto_id, cantidad):
+            nuevo = original(producto_id, cantidad)
+            if nuevo is None and not SecuenciaLote.objects.exists():
+                # Entre este UPDATE y el INSERT de _crear, otro proceso ya reservó hasta 20
+                SecuenciaLote.objects.create(producto_id=producto_id, ultimo=20)
+            return nuevo
+
+        with mock.patch.object(SecuenciaLote, '_incrementar', side_effect=incrementar_con_carrera):
+            self.assertEqual(SecuenciaLote.reservar(self.producto, 2), 21)
+        self.assertEqual(SecuenciaLote.objects.get(producto=self.producto).ultimo, 22)
+
+    def test_motor_sin_returning_usa_bloqueo_de_fila(self):
+        SecuenciaLote.reservar(self.producto, 2)
+        sin_returning = mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert',
+            new_callable=mock.PropertyMock, return_value=False,
+        )
+        with sin_returning:
+            self.assertEqual(SecuenciaLote.reservar(self.producto, 3), 3)
+        self.assertEqual(SecuenciaLote.objects.get(producto=self.producto).ultimo, 5)
+
+
+class BajoStockTests(StockTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.producto.punto_reorden = Decimal('5')
+        self.producto.save()
+
+    def avisos(self):
+        return NotificacionStock.objects.filter(producto=self.producto, tipo=NotificacionStock.REORDEN).count()
+
+    def bajo_stock(self):
+        self.producto.refresh_from_db()
+        return self.producto.bajo_stock
+
+    def test_salida_que_cruza_el_umbral_encola_un_solo_aviso(self):
+        self.mover('INGRESO', '10', destino=self.central)
+        self.assertFalse(self.bajo_stock())
+
+        self.mover('SALIDA', '4', origen=self.central)  # 6: sobre el umbral
+        self.assertEqual((self.bajo_stock(), self.avisos()), (False, 0))
+        self.mover('SALIDA', '1', origen=self.central)  # 5: cruza
+        self.assertEqual((self.bajo_stock(), self.avisos()), (True, 1))
+        self.mover('SALIDA', '1', origen=self.central)  # ya estaba bajo: sin aviso nuevo
+        self.assertEqual((self.bajo_stock(), self.avisos()), (True, 1))
+
+        self.mover('INGRESO', '10', destino=self.central)
+        self.assertFalse(self.bajo_stock())
+        self.assertEqual(reposicion.productos_bajo_stock().count(), 0)
+
+    def test_lote_de_movimientos_encola_por_producto_que_cruza(self):
+        self.mover('INGRESO', '10', destino=self.central)
+        fila = {'producto': self.producto.pk, 'bodega_origen': self.central.pk}
+        _, errores = registrar_movimientos_en_lote([
+            {**fila, 'tipo': 'SALIDA', 'cantidad': '3'},
+            {**fila, 'tipo': 'SALIDA', 'cantidad': '3'},
+        ])
+        self.assertEqual(errores, [])
+        self.assertEqual((self.stock(), self.bajo_stock(), self.avisos()), (Decimal('4'), True, 1))
+        self.assertEqual(list(reposicion.productos_bajo_stock()), [self.producto])
+
+
+class BenchmarkIndicesTests(TestCase):
+
+    def test_se_niega_en_una_base_que_no_parece_de_prueba(self):
+        producto = Producto.objects.create(sku='SKU-1', nombre='Chocolate', categoria='Dulces')
+        with mock.patch.dict(connection.settings_dict, {'NAME': 'dulceria'}), \
+                self.settings(DEBUG=False), self.assertRaises(CommandError):
+            call_command('benchmark_indices', '--generar', '5', stdout=StringIO())
+        self.assertFalse(MovimientoInventario.objects.filter(producto=producto).exists())
+
+    def test_reconoce_la_base_de_tests(self):
+        self.assertTrue(BenchmarkIndices().base_de_prueba())
+        with mock.patch.dict(connection.settings_dict, {'NAME': '/srv/dulceria/db.sqlite3'}):
+            self.assertFalse(BenchmarkIndices().base_de_prueba())
+
+
+class VencimientosTests(StockTestMixin, TestCase):
+    """Tramos del radar: vencido (< hoy), hasta 7 días (0..7) y de 8 a 30 días."""
+
+    hoy = date(2026, 6, 1)
+
+    def setUp(self):
+        super().setUp()
+        Producto.objects.filter(pk=self.producto.pk).update(control_por_lote=True, perishable=True)
+        for n, (dias, cantidad) in enumerate([(-1, 1), (0, 2), (7, 4), (8, 8), (30, 16), (31, 32), (0, 0)]):
+            Lote.objects.create(
+                codigo=f'L-{n}', producto=self.producto, bodega=self.central,
+                cantidad_inicial=cantidad, cantidad_disponible=cantidad,
+                fecha_vencimiento=self.hoy + timedelta(days=dias),
+            )
+        # Perecible sin control por lote: cuenta por su fecha y su stock en cada bodega
+        suelto = Producto.objects.create(
+            sku='SKU-2', nombre='Merengue', categoria='Dulces', perishable=True,
+            fecha_vencimiento=self.hoy + timedelta(days=8),
+        )
+        StockBodega.objects.create(producto=suelto, bodega=self.central, cantidad=Decimal('5'))
+        StockBodega.objects.create(producto=suelto, bodega=self.sala, cantidad=Decimal('3'))
+
+    def test_limites_de_los_tramos(self):
+        resumen = vencimientos.calcular_resumen(self.hoy)
+
+        self.assertEqual(resumen[(self.central.pk, vencimientos.VENCIDO)],
+                         {'lotes': 1, 'productos': 1, 'cantidad': Decimal('1')})
+        # Día 0 y día 7 son "hasta 7"; el lote sin disponible no cuenta
+        self.assertEqual(resumen[(self.central.pk, vencimientos.HASTA_7)],
+                         {'lotes': 2, 'productos': 1, 'cantidad': Decimal('6')})
+        # Día 8 y día 30 son "8 a 30" (el día 31 queda fuera), más el perecible sin lote
+        self.assertEqual(resumen[(self.central.pk, vencimientos.HASTA_30)],
+                         {'lotes': 2, 'productos': 2, 'cantidad': Decimal('29')})
+        self.assertEqual(resumen[(self.sala.pk, vencimientos.HASTA_30)],
+                         {'lotes': 0, 'productos': 1, 'cantidad': Decimal('3')})
+        self.assertEqual(len(resumen), 4)
+
+    def test_snapshot_y_api(self):
+        cliente = APIClient()
+        cliente.force_authenticate(Usuario.objects.create_user('ana', 'ana@a.cl', 'x'))
+        self.assertEqual(cliente.get('/api/vencimientos/').status_code, 404)
+
+        call_command('snapshot_vencimientos', '--fecha', self.hoy.isoformat(), stdout=StringIO())
+        respuesta = cliente.get('/api/vencimientos/')
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+
+        self.assertEqual(datos['fecha'], '2026-06-01')
+        por_bodega = {b['bodega_id']: {t['tramo']: t for t in b['tramos']} for b in datos['bodegas']}
+        self.assertEqual(por_bodega[self.central.pk]['hasta_30']['cantidad'], '29.00')
+        self.assertEqual(por_bodega[self.sala.pk]['vencido']['cantidad'], '0.00')
+        self.assertEqual(por_bodega[self.sala.pk]['hasta_30']['productos'], 1)
+        self.assertEqual(
+            [(t['tramo'], t['lotes'], t['cantidad']) for t in datos['totales']],
+            [('vencido', 1, '1.00'), ('hasta_7', 2, '6.00'), ('hasta_30', 2, '32.00')],
+        )
+
+
+class PaginacionKeysetTests(StockTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(7):
+            self.mover('INGRESO', '1', destino=self.central)
+        # Fechas repetidas: el desempate por id no debe saltar ni repetir filas
+        ahora = timezone.now()
+        pks = list(MovimientoInventario.objects.order_by('pk').values_list('pk', flat=True))
+        for pk, minutos in zip(pks, (0, 0, 0, 1, 1, 2, 3)):
+            MovimientoInventario.objects.filter(pk=pk).update(fecha=ahora + timedelta(minutes=minutos))
+        self.orden = list(MovimientoInventario.objects.order_by('-fecha', '-pk').values_list('pk', flat=True))
+
+    def pagina(self, token=None):
+        return paginar_keyset(MovimientoInventario.objects.all(), token, 3)
+
+    def test_avanza_y_retrocede_sin_saltos(self):
+        paginas = [self.pagina()]
+        while paginas[-1].has_next:
+            paginas.append(self.pagina(paginas[-1].siguiente))
+        self.assertEqual([[m.pk for m in p] for p in paginas], [self.orden[0:3], self.orden[3:6], self.orden[6:]])
+        self.assertFalse(paginas[0].has_previous)
+
+        anterior = self.pagina(paginas[-1].anterior)
+        self.assertEqual([m.pk for m in anterior], self.orden[3:6])
+        primera = self.pagina(anterior.anterior)
+        self.assertEqual([m.pk for m in primera], self.orden[0:3])
+        self.assertFalse(primera.has_previous)
+
+    def test_cursor_alterado_vuelve_a_la_primera_pagina(self):
+        token = self.pagina().siguiente
+        self.assertEqual([m.pk for m in self.pagina(token[:-2] + 'xx')], self.orden[0:3])
+
+
+class DemandaTests(TestCase):
+
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(
+            rut_nif='11111111-1', razon_social='Dulces del Sur', email='ventas@sur.cl', condiciones_pago='EFECTIVO',
+        )
+
+    def producto(self, sku, min_lote=None, lead_time=2):
+        producto = Producto.objects.create(sku=sku, nombre=sku, categoria='Dulces')
+        ProductoProveedor.objects.create(
+            producto=producto, proveedor=self.proveedor, costo=Decimal('100'),
+            lead_time_dias=lead_time, min_lote=min_lote, preferente=True,
+        )
+        return producto
+
+    def salida(self, producto, cantidad, dia, hora=time.min):
+        movimiento = MovimientoInventario.objects.create(tipo='SALIDA', producto=producto, cantidad=Decimal(cantidad))
+        # fecha es auto_now_add: se fija después
+        MovimientoInventario.objects.filter(pk=movimiento.pk).update(
+            fecha=timezone.make_aware(datetime.combine(dia, hora)),
+        )
+
+    def test_historia_corta_en_la_medianoche_local(self):
+        producto = self.producto('SKU-1')
+        hoy = date(2026, 6, 10)
+        self.salida(producto, '1', date(2026, 6, 7), time(23, 59, 59))  # antes del periodo
+        self.salida(producto, '2', date(2026, 6, 8))                     # 00:00 del primer día
+        self.salida(producto, '4', date(2026, 6, 8), time(23, 59, 59))
+        self.salida(producto, '8', date(2026, 6, 9))
+        self.salida(producto, '16', hoy)                                 # el día de referencia no cuenta
+
+        ids, matriz = demanda.historia_salidas(hoy, dias=2)
+        self.assertEqual(ids.tolist(), [producto.pk])
+        self.assertEqual(matriz.tolist(), [[6.0, 8.0]])
+
+    def test_historia_con_cambio_de_horario(self):
+        # Chile atrasa el reloj la noche del 4 al 5 de abril de 2026: ese día local dura 25 h
+        producto = self.producto('SKU-1')
+        self.salida(producto, '1', date(2026, 4, 4), time(23, 30))
+        self.salida(producto, '2', date(2026, 4, 5), time(0, 30))
+        self.salida(producto, '4', date(2026, 4, 5), time(23, 59))
+        self.salida(producto, '8', date(2026, 4, 6), time(0, 0))
+
+        _, matriz = demanda.historia_salidas(date(2026, 4, 7), dias=4)
+        self.assertEqual(matriz.tolist(), [[0.0, 1.0, 6.0, 8.0]])
+
+    def test_cantidad_se_redondea_hacia_arriba_al_min_lote(self):
+        hoy = date(2026, 6, 10)
+        # Demanda constante de 5 al día: faltan 5 * (2 lead + 3 cobertura) = 25
+        casos = {'SKU-1': ('12', '36'), 'SKU-2': ('12.5', '25'), 'SKU-3': (None, '25'), 'SKU-4': ('0', '25')}
+        for sku, (min_lote, _) in casos.items():
+            producto = self.producto(sku, Decimal(min_lote) if min_lote else None)
+            for k in range(1, 8):
+                self.salida(producto, '5', hoy - timedelta(days=k), time(12))
+
+        resultado = demanda.sugerir(hoy, dias=7, ventana=7, alfa=0.3, cobertura=3)
+
+        lineas = {linea['sku']: linea for linea in resultado['ordenes'][0]['lineas']}
+        self.assertEqual(
+            {sku: str(linea['cantidad']) for sku, linea in lineas.items()},
+            {sku: cantidad for sku, (_, cantidad) in casos.items()},
+        )
+        self.assertEqual(lineas['SKU-1']['demanda_diaria'], Decimal('5.00'))
+        self.assertEqual(lineas['SKU-1']['stock_seguridad'], Decimal('0.00'))
+        self.assertEqual(str(lineas['SKU-3']['min_lote']), '1')
+        self.assertEqual(lineas['SKU-1']['subtotal'], Decimal('3600.00'))
+
+
+class ComprasSugeridasTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(Usuario.objects.create_superuser('admin', 'admin@a.cl', 'x'))
+        self.url = reverse('inventario:compras_sugeridas')
+
+    def test_etag_cambia_con_el_dia_de_referencia(self):
+        # El ETag de las páginas solo se emite en HTTPS (condicional.revalidable)
+        self.client.get(self.url, secure=True)  # deja la cookie CSRF, que es parte del ETag
+        etag = self.client.get(self.url, secure=True)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, secure=True).status_code, 304)
 
-# Create your tests here.
+        manana = timezone.localdate() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=manana):
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, secure=True)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
@@ -11,4 +11,5 @@ urlpatterns = [
     path('movimiento/<int:pk>/editar/', views.MovimientoInventarioUpdateView.as_view(), name='editar_movimiento'),
     path('movimiento/<int:pk>/', views.MovimientoInventarioDetailView.as_view(), name='detalle_movimiento'),
     path('bodegas/', views.BodegaListView.as_view(), name='lista_bodegas'),
+    path('compras-sugeridas/', views.compras_sugeridas, name='compras_sugeridas'),
 ]
@@ -0,0 +1,206 @@
+# inventario/vencimientos.py
+"""
+Radar de vencimientos.
+
+En vez de recorrer objetos y preguntar ``alerta_por_vencer()`` uno a uno,
+todo sale de consultas por rango sobre ``Lote.fecha_vencimiento`` y
+``Producto.fecha_vencimiento`` (ambos indexados):
+
+- ``lotes_por_vencer`` / ``productos_por_vencer``: el detalle, como queryset.
+- ``calcular_resumen``: cantidades por bodega y tramo (vencido, hasta 7 días,
+  de 8 a 30 días) con dos consultas agregadas.
+- ``guardar_resumen``: escribe esa foto en ``ResumenVencimiento``; la genera
+  una vez al día ``manage.py snapshot_vencimientos``.
+- ``ultimo_resumen``: lo que leen el dashboard y ``GET /api/vencimientos/``,
+  sin tocar lotes ni productos.
+
+Los lotes cuentan por su propia fecha y bodega; los productos perecibles sin
+control por lote, por ``Producto.fecha_vencimiento`` y su stock en cada bodega
+(``StockBodega``).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Sum, Value, When
+from django.utils import timezone
+
+
+DIAS_POR_VENCER = 7
+DIAS_HORIZONTE = 30
+
+VENCIDO = 'vencido'
+HASTA_7 = 'hasta_7'
+HASTA_30 = 'hasta_30'
+TRAMOS = [
+    (VENCIDO, 'Vencido'),
+    (HASTA_7, f'Vence en {DIAS_POR_VENCER} días o menos'),
+    (HASTA_30, f'Vence en {DIAS_POR_VENCER + 1} a {DIAS_HORIZONTE} días'),
+]
+
+
+def _hoy(hoy):
+    return hoy or timezone.localdate()
+
+
+# ----------------------------------------------------------
+# DETALLE (consultas por rango)
+# ----------------------------------------------------------
+def lotes_por_vencer(dias=DIAS_POR_VENCER, hoy=None, vencidos=False):
+    """Lotes con stock que vencen entre hoy y hoy + ``dias`` (o antes, con ``vencidos``)."""
+    from .models import Lote
+
+    hoy = _hoy(hoy)
+    rango = Q(fecha_vencimiento__lte=hoy + timedelta(days=dias))
+    if not vencidos:
+        rango &= Q(fecha_vencimiento__gte=hoy)
+    return Lote.objects.filter(rango, cantidad_disponible__gt=0).order_by('fecha_vencimiento', 'pk')
+
+
+def lotes_vencidos(hoy=None):
+    """Lotes con stock cuya fecha de vencimiento ya pasó."""
+    from .models import Lote
+
+    return (
+        Lote.objects.filter(fecha_vencimiento__lt=_hoy(hoy), cantidad_disponible__gt=0)
+        .order_by('fecha_vencimiento', 'pk')
+    )
+
+
+def productos_por_vencer(dias=DIAS_POR_VENCER, hoy=None, vencidos=False):
+    """Productos perecibles con stock que vencen hasta hoy + ``dias``."""
+    from productos.models import Producto
+
+    hoy = _hoy(hoy)
+    rango = Q(fecha_vencimiento__lte=hoy + timedelta(days=dias))
+    if not vencidos:
+        rango &= Q(fecha_vencimiento__gte=hoy)
+    return (
+        Producto.objects.filter(rango, perishable=True, stock_actual__gt=0)
+        .order_by('fecha_vencimiento', 'pk')
+    )
+
+
+# ----------------------------------------------------------
+# RESUMEN POR BODEGA Y TRAMO
+# ----------------------------------------------------------
+def _tramo(campo, hoy):
+    return Case(
+        When(**{f'{campo}__lt': hoy}, then=Value(VENCIDO)),
+        When(**{f'{campo}__lte': hoy + timedelta(days=DIAS_POR_VENCER)}, then=Value(HASTA_7)),
+        default=Value(HASTA_30),
+        output_field=CharField(),
+    )
+
+
+def calcular_resumen(hoy=None):
+    """
+    ``{(bodega_id, tramo): {'lotes', 'productos', 'cantidad'}}`` para todo lo
+    que vence hasta hoy + ``DIAS_HORIZONTE`` (incluido lo ya vencido).
+    ``bodega_id`` es None para los lotes sin bodega.
+    """
+    from .models import Lote, StockBodega
+
+    hoy = _hoy(hoy)
+    limite = hoy + timedelta(days=DIAS_HORIZONTE)
+    resumen = defaultdict(lambda: {'lotes': 0, 'productos': 0, 'cantidad': Decimal('0')})
+
+    lotes = (
+        Lote.objects.filter(fecha_vencimiento__lte=limite, cantidad_disponible__gt=0)
+        .annotate(tramo=_tramo('fecha_vencimiento', hoy))
+        .values('bodega_id', 'tramo')
+        .annotate(lotes=Count('pk'), productos=Count('producto', distinct=True),
+                  cantidad=Sum('cantidad_disponible'))
+        .order_by()
+    )
+    for fila in lotes:
+        item = resumen[(fila['bodega_id'], fila['tramo'])]
+        item['lotes'] += fila['lotes']
+        item['productos'] += fila['productos']
+        item['cantidad'] += fila['cantidad']
+
+    # Perecibles sin control por lote: la fecha es la del producto
+    productos = (
+        StockBodega.objects.filter(
+            producto__fecha_vencimiento__lte=limite,
+            producto__perishable=True,
+            producto__control_por_lote=False,
+            cantidad__gt=0,
+        )
+        .annotate(tramo=_tramo('producto__fecha_vencimiento', hoy))
+        .values('bodega_id', 'tramo')
+        .annotate(productos=Count('producto', distinct=True), cantidad=Sum('cantidad'))
+        .order_by()
+    )
+    for fila in productos:
+        item = resumen[(fila['bodega_id'], fila['tramo'])]
+        item['productos'] += fila['productos']
+        item['cantidad'] += fila['cantidad']
+
+    return dict(resumen)
+
+
+def guardar_resumen(hoy=None):
+    """Reemplaza la foto del día en ``ResumenVencimiento``; devuelve las filas escritas."""
+    from .models import ResumenVencimiento
+
+    hoy = _hoy(hoy)
+    filas = [
+        ResumenVencimiento(fecha=hoy, bodega_id=bodega_id, tramo=tramo, **valores)
+        for (bodega_id, tramo), valores in calcular_resumen(hoy).items()
+    ]
+    with transaction.atomic():
+        ResumenVencimiento.objects.filter(fecha=hoy).delete()
+        ResumenVencimiento.objects.bulk_create(filas)
+    return filas
+
+
+def ultimo_resumen():
+    """
+    Última foto guardada, lista para mostrar::
+
+        {'fecha': date, 'bodegas': [{'bodega_id', 'bodega', 'tramos': [...]}],
+         'totales': [{'tramo', 'etiqueta', 'lotes', 'cantidad'}, ...]}
+
+    Cada lista ``tramos`` trae los tres tramos en orden (en cero si no hay
+    nada). Los totales no suman ``productos``: un producto puede estar en
+    varias bodegas.
+    None si todavía no se generó ninguna.
+    """
+    from .models import ResumenVencimiento
+
+    fecha = ResumenVencimiento.objects.order_by('-fecha').values_list('fecha', flat=True).first()
+    if fecha is None:
+        return None
+
+    def vacios():
+        return {
+            tramo: {'tramo': tramo, 'etiqueta': etiqueta, 'lotes': 0, 'productos': 0, 'cantidad': Decimal('0.00')}
+            for tramo, etiqueta in TRAMOS
+        }
+
+    bodegas, totales = {}, vacios()
+    filas = (
+        ResumenVencimiento.objects.filter(fecha=fecha)
+        .order_by('bodega__codigo')
+        .values_list('bodega_id', 'bodega__codigo', 'bodega__nombre', 'tramo', 'lotes', 'productos', 'cantidad')
+    )
+    for bodega_id, codigo, nombre, tramo, lotes, productos, cantidad in filas:
+        if bodega_id not in bodegas:
+            bodegas[bodega_id] = {
+                'bodega_id': bodega_id,
+                'bodega': f"{codigo} - {nombre}" if bodega_id else "Sin bodega",
+                'tramos': vacios(),
+            }
+        item = bodegas[bodega_id]['tramos'][tramo]
+        item['productos'] += productos
+        for destino in (item, totales[tramo]):
+            destino['lotes'] += lotes
+            destino['cantidad'] += cantidad
+
+    return {
+        'fecha': fecha,
+        'bodegas': [{**b, 'tramos': list(b['tramos'].values())} for b in bodegas.values()],
+        'totales': [{k: v for k, v in t.items() if k != 'productos'} for t in totales.values()],
+    }
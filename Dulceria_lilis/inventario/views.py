@@ -5,14 +5,96 @@ from django.utils.decorators import method_decorator
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.db.models import Q
-from django.core.paginator import Paginator
 from django.views import View
-from django.http import HttpResponse, JsonResponse
-from proveedores.models import ProductoProveedor
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+from django.utils import timezone
 from sistema.decorators import permiso_requerido
-from .models import MovimientoInventario, Bodega, Lote
+from sistema import busqueda, exportaciones, versiones
+from sistema.condicional import condicional
+from . import consultas, demanda
+from .models import MovimientoInventario, Bodega
 from .forms import MovimientoInventarioForm
-from utils.export_excel import queryset_to_excel
+from proveedores.models import Proveedor
+from utils.export_excel import FORMATOS, exportar_response
+from utils.paginacion import paginar_keyset, estimar_total
+
+
+# Tamaños de página permitidos en el listado de movimientos
+POR_PAGINA_MOVIMIENTOS = (5, 10, 20, 50, 100)
+
+
+# ----------------------------------------------------------
+# FILTROS Y COLUMNAS DE EXPORTACIÓN
+# (compartidos con las exportaciones en segundo plano)
+# ----------------------------------------------------------
+def filtrar_movimientos(qs, tipo="", buscar="", bodega=""):
+    if tipo:
+        qs = qs.filter(tipo=tipo)
+
+    # 🔎 BUSCADOR: por SKU/nombre de producto o proveedor (índice de texto completo)
+    if buscar:
+        qs = busqueda.filtrar(qs, buscar)
+
+    if bodega:
+        # Las bodegas son pocas: se resuelven primero a ids y el filtro
+        # sobre movimientos usa los índices por bodega origen/destino
+        tokens = [t.strip() for t in bodega.replace(';', ',').split(',') if t.strip()]
+        q_bodega = Q()
+        for t in tokens:
+            q_bodega |= Q(codigo__icontains=t) | Q(nombre__icontains=t)
+        ids = list(Bodega.objects.filter(q_bodega).values_list('pk', flat=True))
+        qs = qs.filter(Q(bodega_origen_id__in=ids) | Q(bodega_destino_id__in=ids))
+    return qs
+
+
+COLUMNAS_MOVIMIENTOS = [
+    ("Fecha",           lambda m: m.fecha),
+    ("Tipo",            lambda m: m.tipo),
+    ("Producto",        lambda m: m.producto.nombre if m.producto else ""),
+    ("Cantidad",        lambda m: m.cantidad),
+    ("Bodega Origen",   lambda m: str(m.bodega_origen) if m.bodega_origen else ""),
+    ("Bodega Destino",  lambda m: str(m.bodega_destino) if m.bodega_destino else ""),
+    ("Documento Ref.",  lambda m: m.documento_referencia or ""),
+    ("Serie",           lambda m: m.serie or ""),
+    ("Lote",            lambda m: str(m.lote) if m.lote else ""),
+    ("Observación",     lambda m: m.observacion or ""),
+    ("Usuario",         lambda m: m.usuario.username if m.usuario_id else ""),
+]
+
+
+def filtros_movimientos(request):
+    """Filtros efectivos del listado: los del GET se guardan en sesión."""
+    session = request.session
+
+    # ---- 1) Limpiar filtros si viene clear=1 ----
+    if request.GET.get("clear") == "1":
+        for k in ("f_tipo", "f_buscar", "f_bodega", "f_pp"):
+            session.pop(k, None)
+        return {'tipo': "", 'buscar': "", 'bodega': "", 'per_page': 10}
+
+    # ---- 2) Si vienen filtros por GET, guardarlos en sesión ----
+    for param in ('tipo', 'buscar', 'bodega', 'pp'):
+        valor = request.GET.get(param)
+        if valor is not None:
+            session[f"f_{param}"] = valor
+
+    # ---- 3) Leer valores finales desde sesión (o default) ----
+    return {
+        'tipo': session.get("f_tipo", ""),
+        'buscar': session.get("f_buscar", ""),
+        'bodega': session.get("f_bodega", ""),
+        'per_page': session.get("f_pp", "10"),
+    }
+
+
+def exportacion_movimientos(filtros):
+    """Columnas y queryset a exportar para un conjunto de filtros del listado."""
+    movimientos = MovimientoInventario.objects.select_related(
+        'producto', 'bodega_origen', 'bodega_destino', 'usuario', 'lote'
+    ).order_by('-fecha')
+    return COLUMNAS_MOVIMIENTOS, filtrar_movimientos(movimientos, **filtros)
 
 
 # ----------------------------------------------------------
@@ -20,116 +102,57 @@ from utils.export_excel import queryset_to_excel
 # ----------------------------------------------------------
 @method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
 @method_decorator(permiso_requerido('inventario.agregar_movimientos'), name='post')
+@method_decorator(condicional(
+    'inventario', 'productos', 'proveedores', 'bodegas', 'lotes', 'usuarios',
+    filtros=filtros_movimientos,
+), name='get')
 class MovimientoInventarioListCreateView(View):
     template_name = 'inventario/movimiento_list.html'
 
     def _apply_filters(self, request, qs):
-        session = request.session
-
-        # ---- 1) Tomar valores desde GET (si vienen) ----
-        tipo_get    = request.GET.get('tipo')
-        buscar_get  = request.GET.get('buscar')
-        bodega_get  = request.GET.get('bodega')
-        pp_get      = request.GET.get('pp')
-
-        # ---- 2) Limpiar filtros si viene clear=1 ----
-        if request.GET.get("clear") == "1":
-            for k in ("f_tipo", "f_buscar", "f_bodega", "f_pp"):
-                session.pop(k, None)
-            return qs, "", "", "", 10  # ← CAMBIAR de 5 a 10 (default más razonable)
-
-        # ---- 3) Si vienen filtros por GET, guardarlos en sesión ----
-        if tipo_get is not None:
-            session["f_tipo"] = tipo_get
-        if buscar_get is not None:
-            session["f_buscar"] = buscar_get
-        if bodega_get is not None:
-            session["f_bodega"] = bodega_get
-        if pp_get is not None:
-            session["f_pp"] = pp_get
-
-        # ---- 4) Leer valores finales desde sesión (o default) ----
-        tipo    = session.get("f_tipo", "")
-        buscar  = session.get("f_buscar", "")
-        bodega  = session.get("f_bodega", "")
-        per_page = session.get("f_pp", "10")  # ← CAMBIAR default de "5" a "10"
-
-        # ---- 5) Aplicar filtros sobre el queryset ----
-        if tipo:
-            qs = qs.filter(tipo=tipo)
-
-        # 🔎 BUSCADOR: por SKU de producto o proveedor
-        if buscar:
-            qs = qs.filter(
-                Q(producto__sku__icontains=buscar) |
-                Q(proveedor__razon_social__icontains=buscar) |
-                Q(proveedor__nombre_fantasia__icontains=buscar)
-            )
-
-        if bodega:
-            tokens = [t.strip() for t in bodega.replace(';', ',').split(',') if t.strip()]
-            q_obj = Q()
-            for t in tokens:
-                q_obj |= Q(bodega_origen__codigo__icontains=t)
-                q_obj |= Q(bodega_origen__nombre__icontains=t)
-                q_obj |= Q(bodega_destino__codigo__icontains=t)
-                q_obj |= Q(bodega_destino__nombre__icontains=t)
-            qs = qs.filter(q_obj)
-
-        return qs, tipo, buscar, bodega, per_page
+        f = filtros_movimientos(request)
 
+        # ---- Aplicar filtros sobre el queryset ----
+        qs = filtrar_movimientos(qs, f['tipo'], f['buscar'], f['bodega'])
 
+        return qs, f['tipo'], f['buscar'], f['bodega'], f['per_page']
 
     def get(self, request):
         movimientos = MovimientoInventario.objects.select_related(
-            'producto', 'bodega_origen', 'bodega_destino', 'usuario'
+            'producto', 'bodega_origen', 'bodega_destino', 'usuario', 'lote'
         ).order_by('-fecha')
 
-        # ===== EXPORTAR EXCEL =====
-        if request.GET.get("export") == "xlsx":
-            # Aplicar filtros antes de exportar
-            movimientos, _, _, _, _ = self._apply_filters(request, movimientos)
-            
-            columns = [
-                ("Fecha",           lambda m: m.fecha.replace(tzinfo=None) if m.fecha else ""),
-                ("Tipo",            lambda m: m.tipo),
-                ("Producto",        lambda m: m.producto.nombre if m.producto else ""),
-                ("Cantidad",        lambda m: m.cantidad),
-                ("Bodega Origen",   lambda m: str(m.bodega_origen) if m.bodega_origen else ""),
-                ("Bodega Destino",  lambda m: str(m.bodega_destino) if m.bodega_destino else ""),
-                ("Documento Ref.",  lambda m: m.documento_referencia or ""),
-                ("Serie",           lambda m: m.serie or ""),
-                ("Lote",            lambda m: str(m.lote) if m.lote else ""),
-                ("Observación",     lambda m: m.observacion or ""),
-                ("Usuario",         lambda m: m.usuario.username if m.usuario_id else ""),
-            ]
-            raw, fname = queryset_to_excel("movimientos_inventario", columns, movimientos)
-            resp = HttpResponse(
-                raw,
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
-            return resp
+        # ===== EXPORTAR EXCEL / CSV =====
+        if request.GET.get("export") in FORMATOS:
+            # Se exporta con los mismos filtros del listado
+            _, tipo, buscar, bodega, _ = self._apply_filters(request, movimientos)
+            filtros = {'tipo': tipo, 'buscar': buscar, 'bodega': bodega}
+            if request.GET.get("segundo_plano"):
+                return exportaciones.responder(request, 'movimientos_inventario', request.GET["export"], filtros)
+            columns, movimientos = exportacion_movimientos(filtros)
+            return exportar_response("movimientos_inventario", columns, movimientos, request.GET["export"])
+
+        return render(request, self.template_name, self._contexto(request, movimientos, MovimientoInventarioForm()))
 
+    def _contexto(self, request, movimientos, form):
         # ===== FILTROS =====
         movimientos, tipo, buscar, bodega, per_page = self._apply_filters(request, movimientos)
 
-        # ===== PAGINADOR =====
+        # ===== PAGINADOR (por cursor: sin COUNT ni OFFSET) =====
         try:
             per_page_int = int(per_page)
         except (TypeError, ValueError):
-            per_page_int = 10  # ← CAMBIAR default de 5 a 10
-        
-        # 🔥 PERMITIR 2000 REGISTROS PARA PRUEBAS DE ESTRÉS
-        if per_page_int not in (5, 10, 20, 50, 100, 2000):  # ← AGREGAR 50, 100, 2000
             per_page_int = 10
+        if per_page_int not in POR_PAGINA_MOVIMIENTOS:
+            per_page_int = 10
+
+        page_obj = paginar_keyset(movimientos, request.GET.get('cursor'), per_page_int)
 
-        paginator = Paginator(movimientos, per_page_int)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        # Total aproximado (estadísticas del motor) solo sin filtros activos
+        if not (tipo or buscar or bodega):
+            page_obj.total_aproximado = estimar_total(MovimientoInventario)
 
-        form = MovimientoInventarioForm()
-        context = {
+        return {
             'form': form,
             'page_obj': page_obj,
             'movimientos': page_obj,
@@ -138,8 +161,8 @@ class MovimientoInventarioListCreateView(View):
             'f_buscar': buscar,
             'f_bodega': bodega,
             'per_page': per_page_int,
+            'opciones_por_pagina': POR_PAGINA_MOVIMIENTOS,
         }
-        return render(request, self.template_name, context)
 
     def post(self, request):
         form = MovimientoInventarioForm(request.POST)
@@ -148,8 +171,13 @@ class MovimientoInventarioListCreateView(View):
             if request.user.is_authenticated:
                 movimiento.usuario = request.user
             try:
-                movimiento.save()
-                messages.success(request, "✅ Movimiento registrado correctamente.")
+                registrados = movimiento.registrar()
+                if len(registrados) > 1:
+                    messages.success(
+                        request, f"✅ Salida registrada por FEFO en {len(registrados)} lotes."
+                    )
+                else:
+                    messages.success(request, "✅ Movimiento registrado correctamente.")
                 return redirect('inventario:inicio')
 
             except ValidationError as e:
@@ -160,73 +188,30 @@ class MovimientoInventarioListCreateView(View):
             messages.error(request, "⚠️ Por favor complete todos los campos obligatorios correctamente.")
 
         movimientos = MovimientoInventario.objects.select_related(
-            'producto', 'bodega_origen', 'bodega_destino', 'usuario'
+            'producto', 'bodega_origen', 'bodega_destino', 'usuario', 'lote'
         ).order_by('-fecha')
-        
-        movimientos, tipo, buscar, bodega, per_page = self._apply_filters(request, movimientos)
-        
-        try:
-            per_page_int = int(per_page)
-        except (TypeError, ValueError):
-            per_page_int = 10
-        
-        # 🔥 PERMITIR 2000 REGISTROS
-        if per_page_int not in (5, 10, 20, 50, 100, 2000):
-            per_page_int = 10
-            
-        paginator = Paginator(movimientos, per_page_int)
-        page_obj = paginator.get_page(request.GET.get('page'))
-
-        context = {
-            'form': form,
-            'page_obj': page_obj,
-            'movimientos': page_obj,
-            'bodegas': Bodega.objects.all(),
-            'f_tipo': tipo,
-            'f_buscar': buscar,
-            'f_bodega': bodega,
-            'per_page': per_page_int,
-        }
-        return render(request, self.template_name, context)
+        return render(request, self.template_name, self._contexto(request, movimientos, form))
 
+# Respuestas cacheadas por versión (inventario/consultas.py). El navegador
+# revalida con If-None-Match y recibe 304 si nada cambió.
+@cache_control(private=True, no_cache=True)
+@etag(consultas.etag_productos)
 def productos_por_proveedor(request, proveedor_id):
-    productos = ProductoProveedor.objects.filter(
-        proveedor_id=proveedor_id
-    ).select_related("producto")
-
-    data = [
-        {"id": pp.producto.id,
-         "nombre": pp.producto.nombre,
-         "sku": pp.producto.sku if hasattr(pp.producto, "sku") else "",
-         }
-         for pp in productos
-    ]
-
+    _, data = consultas.productos_de_proveedor(proveedor_id)
     return JsonResponse({"productos": data})
+
+
+@cache_control(private=True, no_cache=True)
+@etag(consultas.etag_lotes)
 def lotes_por_producto(request, producto_id):
     """
     Devuelve los lotes disponibles para un producto (solo stock > 0)
     Se usa por AJAX cuando el usuario selecciona un producto.
     """
-    lotes = Lote.objects.filter(
-        producto_id=producto_id,
-        cantidad_disponible__gt=0
-    ).order_by('codigo')
-
-    data = [
-        {
-            "id": lote.id,
-            "codigo": lote.codigo,
-            "descripcion": str(lote),
-            "disponible": float(lote.cantidad_disponible),
-        }
-        for lote in lotes
-    ]
-
+    _, data = consultas.lotes_disponibles(producto_id)
     return JsonResponse({"lotes": data})
 
 
-
 # ----------------------------------------------------------
 # DETALLE DE MOVIMIENTO
 # ----------------------------------------------------------
@@ -265,3 +250,49 @@ class BodegaListView(ListView):
     template_name = 'inventario/bodega_list.html'
     context_object_name = 'bodegas'
     ordering = ['codigo']
+
+
+# ----------------------------------------------------------
+# COMPRAS SUGERIDAS (pronóstico de demanda, inventario/demanda.py)
+# ----------------------------------------------------------
+OPCIONES_DIAS_HISTORIA = (90, 180, 365, 730)
+OPCIONES_NIVEL_SERVICIO = ('0.90', '0.95', '0.98', '0.99')
+
+
+def _opcion(valor, opciones, defecto):
+    return valor if valor in opciones else defecto
+
+
+def filtros_compras(request):
+    """El pronóstico parte de hoy: otro día es otra página aunque nada se haya escrito."""
+    return {'hoy': timezone.localdate().isoformat()}
+
+
+@permiso_requerido('proveedores.view_productoproveedor')
+@condicional('inventario', 'productos', 'proveedores', filtros=filtros_compras)
+def compras_sugeridas(request):
+    contexto = {
+        'disponible': demanda.disponible(),
+        'opciones_dias': OPCIONES_DIAS_HISTORIA,
+        'opciones_nivel': OPCIONES_NIVEL_SERVICIO,
+        'proveedores': Proveedor.objects.filter(productoproveedor__preferente=True).distinct().order_by('razon_social'),
+    }
+    try:
+        dias = _opcion(int(request.GET.get('dias', '')), OPCIONES_DIAS_HISTORIA, demanda.DIAS_HISTORIA)
+    except ValueError:
+        dias = demanda.DIAS_HISTORIA
+    nivel = _opcion(request.GET.get('nivel', ''), OPCIONES_NIVEL_SERVICIO, f'{demanda.NIVEL_SERVICIO:.2f}')
+    proveedor = request.GET.get('proveedor', '')
+    proveedor_id = int(proveedor) if proveedor.isdigit() else None
+    contexto.update({'f_dias': dias, 'f_nivel': nivel, 'f_proveedor': proveedor_id})
+
+    if contexto['disponible']:
+        # El resultado se guarda mientras no cambien movimientos, productos ni
+        # proveedores (mismos sellos que el ETag de la página)
+        hoy = timezone.localdate()
+        sellos = '.'.join(versiones.obtener(f'pagina:{f}') for f in ('inventario', 'productos', 'proveedores'))
+        _, contexto['sugerencia'] = versiones.cacheado(
+            'compras_sugeridas', f'{hoy}:{dias}:{nivel}:{proveedor_id}:{sellos}',
+            lambda: demanda.sugerir(hoy, dias=dias, nivel_servicio=float(nivel), proveedor_id=proveedor_id),
+        )
+    return render(request, 'inventario/compras_sugeridas.html', contexto)
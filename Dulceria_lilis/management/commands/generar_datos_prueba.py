@@ -13,8 +13,11 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from productos.models import Producto
 from proveedores.models import Proveedor, ProductoProveedor
-from inventario.models import MovimientoInventario, Bodega, Lote
+from inventario.models import MovimientoInventario, Bodega
+from inventario import consultas, reposicion
+from inventario.stock import registrar_movimientos_en_lote
 from usuarios.models import Usuario
+from sistema import busqueda, condicional, contadores
 from faker import Faker
 import random
 from decimal import Decimal
@@ -51,6 +54,16 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'Generando {options["movimientos"]} movimientos...'))
             self.crear_movimientos(options['movimientos'])
 
+        # bulk_create no dispara señales: se indexa la búsqueda, se recuentan
+        # los contadores del dashboard y se invalidan las consultas AJAX y los
+        # ETag de los listados al final
+        busqueda.indexar(Producto.objects.all())
+        busqueda.indexar(Proveedor.objects.all())
+        reposicion.recalcular(Producto.objects.all())
+        contadores.recontar()
+        consultas.invalidar_todo()
+        condicional.tocar_todo()
+
         self.stdout.write(self.style.SUCCESS('¡TODO GENERADO CON ÉXITO!'))
         self.stdout.write(self.style.SUCCESS('10.000 productos ✓ | 5.000 proveedores ✓ | 15.000 movimientos ✓'))
         self.stdout.write(self.style.SUCCESS('AHORA SACÁ LAS CAPTURAS Y ENTREGÁ EL 7.0'))
@@ -87,7 +100,9 @@ class Command(BaseCommand):
                 perishable=random.choice([True, False]),
                 control_por_lote=random.choice([True, False]),
                 control_por_serie=random.choice([True, False]),
-                stock_actual=Decimal(random.randint(0, 500)),
+                # El stock lo forman los movimientos generados después (si no,
+                # reconciliar_stock lo vería como diferencia contra el historial)
+                stock_actual=Decimal('0'),
             ))
 
             if len(productos) >= batch_size:
@@ -158,47 +173,75 @@ class Command(BaseCommand):
 
         usuarios = list(Usuario.objects.filter(is_active=True)) or [Usuario.objects.first()]
 
-        tipos = ['INGRESO', 'SALIDA', 'AJUSTE', 'DEVOLUCION', 'TRANSFERENCIA']
+        tipos = ['INGRESO', 'SALIDA', 'AJUSTE', 'DEVOLUCION']
+        if len(bodegas) > 1:
+            tipos.append('TRANSFERENCIA')  # requiere origen ≠ destino
         movimientos = []
-        lote_counter = 100000  # para evitar duplicados
+        creados = rechazados = 0
 
         for i in range(1, cantidad + 1):
             tipo = random.choice(tipos)
             producto = random.choice(productos)
 
-            lote = None
+            # Los productos con lote no parten con lotes inventados: el ingreso
+            # sin lote crea el suyo (con el mismo movimiento que lo respalda) y la
+            # salida sin lote se reparte por FEFO. AJUSTE y TRANSFERENCIA exigen
+            # elegir un lote, así que aquí se generan como ingreso o salida
+            vence = None
             if producto.control_por_lote:
-                codigo_lote = f"LOTE-{lote_counter}"
-                lote_counter += 1
-                lote, _ = Lote.objects.get_or_create(
-                    producto=producto,
-                    codigo=codigo_lote,
-                    defaults={
-                        'fecha_vencimiento': fake.date_between('+1y', '+3y'),
-                        'cantidad_disponible': Decimal('999'),
-                        'bodega': random.choice(bodegas)
-                    }
-                )
+                if tipo in ['AJUSTE', 'TRANSFERENCIA']:
+                    tipo = random.choice(['INGRESO', 'SALIDA'])
+                if tipo in ['INGRESO', 'DEVOLUCION']:
+                    vence = fake.date_between('+1y', '+3y')
+
+            origen, destino = random.sample(bodegas, 2) if tipo == 'TRANSFERENCIA' else (random.choice(bodegas), random.choice(bodegas))
 
             movimientos.append(MovimientoInventario(
                 tipo=tipo,
                 producto=producto,
                 proveedor=random.choice(proveedores) if random.random() > 0.4 else None,
-                lote=lote,
-                bodega_origen=random.choice(bodegas) if tipo in ['SALIDA', 'TRANSFERENCIA'] else None,
-                bodega_destino=random.choice(bodegas),
+                bodega_origen=origen if tipo in ['SALIDA', 'TRANSFERENCIA'] else None,
+                bodega_destino=destino,
                 cantidad=Decimal(random.randint(1, 80)),
+                fecha_vencimiento=vence,
                 fecha=fake.date_between('-2y', 'today'),
                 usuario=random.choice(usuarios),
                 observacion=fake.sentence() if random.random() > 0.6 else None,
             ))
 
             if i % 1000 == 0:
-                MovimientoInventario.objects.bulk_create(movimientos, ignore_conflicts=True)
+                ok, malos = self.registrar(movimientos)
+                creados += ok
+                rechazados += malos
                 movimientos.clear()
-                self.stdout.write(f'  {i}/{cantidad} movimientos creados...')
+                self.stdout.write(f'  {i}/{cantidad} movimientos procesados...')
 
         if movimientos:
-            MovimientoInventario.objects.bulk_create(movimientos, ignore_conflicts=True)
-
-        self.stdout.write(self.style.SUCCESS(f'{cantidad} movimientos creados con éxito'))
\ No newline at end of file
+            ok, malos = self.registrar(movimientos)
+            creados += ok
+            rechazados += malos
+
+        self.stdout.write(self.style.SUCCESS(f'{creados} movimientos creados con éxito'))
+        if rechazados:
+            self.stdout.write(self.style.WARNING(f'{rechazados} movimientos rechazados (ver errores arriba)'))
+
+    def registrar(self, movimientos):
+        """
+        Registra un bloque con el servicio masivo (bulk_create directo no
+        actualiza stock ni lotes). Si alguna fila tiene error el servicio no
+        escribe nada: se quitan esas filas y se reintenta con el resto.
+        Devuelve ``(registrados, rechazados)``.
+        """
+        rechazados = 0
+        while movimientos:
+            _, errores = registrar_movimientos_en_lote(movimientos)
+            if not errores:
+                return len(movimientos), rechazados
+            for error in errores[:5]:
+                self.stdout.write(self.style.ERROR(f"  Fila {error['fila']}: {'; '.join(error['errores'])}"))
+            if len(errores) > 5:
+                self.stdout.write(self.style.ERROR(f"  ... y {len(errores) - 5} filas más con error"))
+            malas = {error['fila'] for error in errores}
+            rechazados += len(malas)
+            movimientos = [m for i, m in enumerate(movimientos) if i not in malas]
+        return 0, rechazados
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_indices_api'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_vencimiento'], name='producto_venc_idx'),
+        ),
+    ]
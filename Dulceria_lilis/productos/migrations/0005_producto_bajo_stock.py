@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:50
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def marcar_bajo_stock(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.filter(
+        stock_actual__lte=Coalesce('punto_reorden', 'stock_minimo')
+    ).update(bajo_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_venc_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='bajo_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['bajo_stock', 'nombre', 'id'], name='producto_bajo_stock_idx'),
+        ),
+        migrations.RunPython(marcar_bajo_stock, migrations.RunPython.noop),
+    ]
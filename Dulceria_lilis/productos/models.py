@@ -30,10 +30,28 @@ class Producto(models.Model):
     ficha_tecnica_url = models.URLField(blank=True, null=True)
 
     stock_actual = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # stock_actual <= COALESCE(punto_reorden, stock_minimo); lo mantiene el motor de stock
+    bajo_stock = models.BooleanField(default=False, editable=False)
     fecha_vencimiento = models.DateField(blank=True, null=True)
+
+    class Meta:
+        # Orden y filtros de la API (api/views.py): el cursor avanza por índice
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx'),
+            models.Index(fields=['categoria', 'nombre'], name='producto_categoria_idx'),
+            models.Index(fields=['marca', 'nombre'], name='producto_marca_idx'),
+            # ?bajo_stock=1 y reposición (inventario/reposicion.py)
+            models.Index(fields=['bajo_stock', 'nombre', 'id'], name='producto_bajo_stock_idx'),
+            # Radar de vencimientos (inventario/vencimientos.py)
+            models.Index(fields=['fecha_vencimiento'], name='producto_venc_idx'),
+        ]
+
+    def umbral_reorden(self):
+        return self.punto_reorden if self.punto_reorden is not None else self.stock_minimo
+
     def alerta_bajo_stock(self):
         """Devuelve True si el stock actual está por debajo del punto de reorden o mínimo."""
-        return self.stock_actual <= (self.punto_reorden or self.stock_minimo)
+        return self.stock_actual <= self.umbral_reorden()
     
     def alerta_por_vencer(self):
         """Devuelve True si el producto perecible vence en los próximos 7 días."""
@@ -45,6 +63,7 @@ class Producto(models.Model):
         """Asegura que punto_reorden tenga valor por defecto igual al stock_minimo."""
         if self.punto_reorden is None:
             self.punto_reorden = self.stock_minimo
+        self.bajo_stock = self.alerta_bajo_stock()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -4,67 +4,88 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse
-from django.db.models import Q
 from sistema.decorators import permiso_requerido
+from sistema import busqueda, exportaciones
+from sistema.condicional import condicional
 from .models import Producto
 from .forms import ProductoForm
-from utils.export_excel import queryset_to_excel
+from utils.export_excel import FORMATOS, exportar_response
+
+# ------------------------------
+# FILTROS Y COLUMNAS DE EXPORTACIÓN
+# (compartidos con las exportaciones en segundo plano)
+# ------------------------------
+COLUMNAS_PRODUCTOS = [
+    ("SKU", lambda p: p.sku),
+    ("Nombre", lambda p: p.nombre),
+    ("Categoría", lambda p: p.categoria),
+    ("Marca", lambda p: p.marca or ""),
+    ("Modelo", lambda p: p.modelo or ""),
+    ("UOM Compra", lambda p: p.uom_compra),
+    ("UOM Venta", lambda p: p.uom_venta),
+    ("Factor conversión", lambda p: p.factor_conversion),
+    ("Costo estándar", lambda p: float(p.costo_estandar) if p.costo_estandar else ""),
+    ("Precio venta", lambda p: float(p.precio_venta) if p.precio_venta else ""),
+    ("IVA %", lambda p: float(p.impuesto_iva) if p.impuesto_iva else ""),
+    ("Stock actual", lambda p: p.stock_actual),
+    ("Stock mínimo", lambda p: p.stock_minimo),
+    ("Stock máximo", lambda p: p.stock_maximo or ""),
+    ("Punto de reorden", lambda p: p.punto_reorden or ""),
+    ("Perecible", lambda p: "Sí" if p.perishable else "No"),
+    ("Control por lote", lambda p: "Sí" if p.control_por_lote else "No"),
+    ("Control por serie", lambda p: "Sí" if p.control_por_serie else "No"),
+    ("Imagen URL", lambda p: p.imagen_url or ""),
+    ("Ficha técnica URL", lambda p: p.ficha_tecnica_url or ""),
+]
+
+
+def filtrar_productos(buscar=""):
+    qs = Producto.objects.all().order_by('nombre')
+    if buscar:
+        qs = busqueda.filtrar(qs, buscar)
+    return qs
+
+
+def filtros_productos(request):
+    """Búsqueda del listado: la del GET (y se guarda en sesión) o la de la sesión."""
+    buscar = request.GET.get("buscar")
+    if buscar is None:
+        buscar = request.session.get('f_buscar', '')
+    else:
+        request.session["f_buscar"] = buscar
+    return {'buscar': buscar}
+
+
+def exportacion_productos(filtros):
+    """Columnas y queryset a exportar para la búsqueda del listado."""
+    return COLUMNAS_PRODUCTOS, filtrar_productos(**filtros)
+
 
 # ------------------------------
 # LISTAR PRODUCTOS (con buscar y exportar)
 # ------------------------------
 @method_decorator(permiso_requerido('productos.view_producto'), name='dispatch')
+@method_decorator(condicional('productos', filtros=filtros_productos), name='get')
 class ProductoListView(ListView):
     model = Producto
     template_name = 'productos/lista.html'
     context_object_name = 'productos'
     ordering = ['nombre']
 
+    def _filtros(self):
+        return filtros_productos(self.request)
+
     def get_queryset(self):
-        buscar = self.request.GET.get("buscar")
-        if buscar is None:
-            buscar = self.request.session.get('f_buscar', '')
-        else:
-            self.request.session["f_buscar"] = buscar
-        qs = Producto.objects.all().order_by('nombre')
-        if buscar:
-            qs = qs.filter(Q(sku__icontains=buscar) | Q(nombre__icontains=buscar))
-        return qs
+        return filtrar_productos(**self._filtros())
     
 
     def get(self, request, *args, **kwargs):
-        if request.GET.get("export") == "xlsx":
-            qs = self.get_queryset()
-            columns = [
-                ("SKU", lambda p: p.sku),
-                ("Nombre", lambda p: p.nombre),
-                ("Categoría", lambda p: p.categoria),
-                ("Marca", lambda p: p.marca or ""),
-                ("Modelo", lambda p: p.modelo or ""),
-                ("UOM Compra", lambda p: p.uom_compra),
-                ("UOM Venta", lambda p: p.uom_venta),
-                ("Factor conversión", lambda p: p.factor_conversion),
-                ("Costo estándar", lambda p: float(p.costo_estandar) if p.costo_estandar else ""),
-                ("Precio venta", lambda p: float(p.precio_venta) if p.precio_venta else ""),
-                ("IVA %", lambda p: float(p.impuesto_iva) if p.impuesto_iva else ""),
-                ("Stock actual", lambda p: p.stock_actual),
-                ("Stock mínimo", lambda p: p.stock_minimo),
-                ("Stock máximo", lambda p: p.stock_maximo or ""),
-                ("Punto de reorden", lambda p: p.punto_reorden or ""),
-                ("Perecible", lambda p: "Sí" if p.perishable else "No"),
-                ("Control por lote", lambda p: "Sí" if p.control_por_lote else "No"),
-                ("Control por serie", lambda p: "Sí" if p.control_por_serie else "No"),
-                ("Imagen URL", lambda p: p.imagen_url or ""),
-                ("Ficha técnica URL", lambda p: p.ficha_tecnica_url or ""),
-            ]
-            raw, fname = queryset_to_excel("productos", columns, qs)
-            resp = HttpResponse(
-                raw,
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
-            return resp
+        if request.GET.get("export") in FORMATOS:
+            filtros = self._filtros()
+            if request.GET.get("segundo_plano"):
+                return exportaciones.responder(request, 'productos', request.GET["export"], filtros)
+            columns, qs = exportacion_productos(filtros)
+            return exportar_response("productos", columns, qs, request.GET["export"])
 
         return super().get(request, *args, **kwargs)
 
@@ -187,4 +208,9 @@ class ProductoDetailView(DetailView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx['alerta_bajo_stock'] = self.object.alerta_bajo_stock()
+        ctx['stock_bodegas'] = (
+            self.object.stock_bodegas
+            .select_related('bodega')
+            .order_by('bodega__codigo')
+        )
         return ctx
@@ -4,58 +4,80 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse
-from django.db.models import Q
 from .models import Proveedor, ProductoProveedor, Producto
 from .forms import ProveedorForm, ProductoProveedorFormSet, ProductoRelacionForm
 from sistema.decorators import permiso_requerido
-from utils.export_excel import queryset_to_excel
+from sistema import busqueda, exportaciones
+from sistema.condicional import condicional
+from utils.export_excel import FORMATOS, exportar_response
+
+
+# ----------------------------------------------------------
+# FILTROS Y COLUMNAS DE EXPORTACIÓN
+# (compartidos con las exportaciones en segundo plano)
+# ----------------------------------------------------------
+COLUMNAS_PROVEEDORES = [
+    ("RUT/NIF", lambda pr: pr.rut_nif),
+    ("Razón social", lambda pr: pr.razon_social),
+    ("Nombre fantasía", lambda pr: pr.nombre_fantasia or ""),
+    ("Email", lambda pr: pr.email),
+    ("Teléfono", lambda pr: pr.telefono or ""),
+    ("Ciudad", lambda pr: pr.ciudad or ""),
+    ("País", lambda pr: pr.pais),
+    ("Condiciones de pago", lambda pr: pr.condiciones_pago),
+    ("Moneda", lambda pr: pr.moneda),
+    ("Contacto principal", lambda pr: pr.contacto_principal_nombre or ""),
+    ("Estado", lambda pr: pr.estado),
+]
+
+
+def filtrar_proveedores(buscar=""):
+    qs = Proveedor.objects.all().order_by('rut_nif', 'razon_social')
+    if buscar:
+        qs = busqueda.filtrar(qs, buscar)
+    return qs
+
+
+def filtros_proveedores(request):
+    """Búsqueda del listado: la del GET (y se guarda en sesión) o la de la sesión."""
+    buscar_Rut_Nif = request.GET.get("buscar_Rut_Nif")
+    if buscar_Rut_Nif is None:
+        buscar_Rut_Nif = request.session.get('f_buscar_Rut_Nif', '')
+    else:
+        request.session["f_buscar_Rut_Nif"] = buscar_Rut_Nif
+    return {'buscar': buscar_Rut_Nif}
+
+
+def exportacion_proveedores(filtros):
+    """Columnas y queryset a exportar para la búsqueda del listado."""
+    return COLUMNAS_PROVEEDORES, filtrar_proveedores(**filtros)
 
 
 # ----------------------------------------------------------
 # LISTAR PROVEEDORES + CREAR EN LA MISMA PÁGINA
 # ----------------------------------------------------------
+# La página también lista los productos (select del formulario)
+@method_decorator(condicional('proveedores', 'productos', filtros=filtros_proveedores), name='get')
 class ProveedorListView(ListView):
     model = Proveedor
     template_name = 'proveedores/lista_proveedor.html'
     context_object_name = 'proveedores'
     ordering = ['razon_social']
 
+    def _filtros(self):
+        return filtros_proveedores(self.request)
+
     def get_queryset(self):
-        buscar_Rut_Nif = self.request.GET.get("buscar_Rut_Nif")
-        if buscar_Rut_Nif is None:
-            buscar_Rut_Nif = self.request.session.get('f_buscar_Rut_Nif', '')
-        else:
-            self.request.session["f_buscar_Rut_Nif"] = buscar_Rut_Nif
-        qs = Proveedor.objects.all().order_by('rut_nif', 'razon_social')
-        if buscar_Rut_Nif:
-            qs = qs.filter(Q(rut_nif__icontains=buscar_Rut_Nif) | Q(razon_social__icontains=buscar_Rut_Nif))
-        return qs
+        return filtrar_proveedores(**self._filtros())
 
     def get(self, request, *args, **kwargs):
-        # Exportar a Excel si se solicita
-        if request.GET.get("export") == "xlsx":
-            qs = self.get_queryset()
-            columns = [
-                ("RUT/NIF", lambda pr: pr.rut_nif),
-                ("Razón social", lambda pr: pr.razon_social),
-                ("Nombre fantasía", lambda pr: pr.nombre_fantasia or ""),
-                ("Email", lambda pr: pr.email),
-                ("Teléfono", lambda pr: pr.telefono or ""),
-                ("Ciudad", lambda pr: pr.ciudad or ""),
-                ("País", lambda pr: pr.pais),
-                ("Condiciones de pago", lambda pr: pr.condiciones_pago),
-                ("Moneda", lambda pr: pr.moneda),
-                ("Contacto principal", lambda pr: pr.contacto_principal_nombre or ""),
-                ("Estado", lambda pr: pr.estado),
-            ]
-            raw, fname = queryset_to_excel("proveedores", columns, qs)
-            resp = HttpResponse(
-                raw,
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
-            return resp
+        # Exportar a Excel/CSV si se solicita
+        if request.GET.get("export") in FORMATOS:
+            filtros = self._filtros()
+            if request.GET.get("segundo_plano"):
+                return exportaciones.responder(request, 'proveedores', request.GET["export"], filtros)
+            columns, qs = exportacion_proveedores(filtros)
+            return exportar_response("proveedores", columns, qs, request.GET["export"])
 
         return super().get(request, *args, **kwargs)
 
@@ -6,4 +6,7 @@ class SistemaConfig(AppConfig):
     name = 'sistema'
 
     def ready(self):
-        import sistema.signals  # ← ESTO ACTIVA LA AUDITORÍA GLOBAL
\ No newline at end of file
+        import sistema.signals  # ← ESTO ACTIVA LA AUDITORÍA GLOBAL
+        import sistema.busqueda  # índice de búsqueda de texto completo
+        import sistema.condicional  # sellos de versión de los listados (ETag)
+        import sistema.permisos  # invalidación de las instantáneas de permisos
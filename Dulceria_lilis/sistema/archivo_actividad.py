@@ -0,0 +1,220 @@
+# sistema/archivo_actividad.py
+"""
+Retención y archivo del registro de actividad.
+
+``RegistroActividad`` recibe un registro por cada alta/cambio/baja auditada y
+nunca se limpiaba. Los registros más antiguos que la retención se mueven por
+bloques a archivos JSONL comprimidos con gzip, uno por mes, en
+``ACTIVIDAD_ARCHIVO_DIR``:
+
+    actividad-2025-08.jsonl.gz
+
+Cada bloque se agrega al archivo de su mes como un nuevo miembro gzip (el
+formato lo permite y ``gzip.open`` los lee como un solo flujo) y recién
+después se borra de la tabla. Si el proceso se corta entre ambos pasos, el
+bloque queda repetido en el archivo; la lectura descarta ids duplicados.
+
+``leer()`` consulta los archivos bajo demanda (solo los meses del rango) y
+``consultar()`` combina la tabla y el archivo para el endpoint de actividad.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from sistema.models import RegistroActividad
+
+
+DIRECTORIO = getattr(settings, 'ACTIVIDAD_ARCHIVO_DIR', os.path.join(settings.BASE_DIR, 'archivo', 'actividad'))
+RETENCION_DIAS = getattr(settings, 'ACTIVIDAD_RETENCION_DIAS', 90)
+TAMANO_BLOQUE = 5000
+
+PATRON_ARCHIVO = re.compile(r'^actividad-(\d{4})-(\d{2})\.jsonl\.gz$')
+UNIDADES = {'d': 'days', 'h': 'hours', 'w': 'weeks'}
+
+
+def parse_antiguedad(texto):
+    """'90d', '12h', '4w' (o un número de días) -> timedelta."""
+    m = re.fullmatch(r'\s*(\d+)\s*([dhw]?)\s*', str(texto).lower())
+    if not m:
+        raise ValueError(f"Antigüedad inválida: {texto!r} (ej. 90d, 12h, 4w)")
+    return timedelta(**{UNIDADES[m.group(2) or 'd']: int(m.group(1))})
+
+
+def _ruta(directorio, anio, mes):
+    return os.path.join(directorio, f"actividad-{anio:04d}-{mes:02d}.jsonl.gz")
+
+
+def _a_dict(registro):
+    return {
+        'id': registro['id'],
+        'fecha': timezone.localtime(registro['fecha']).isoformat(),
+        'usuario_id': registro['usuario_id'],
+        # Se guarda el nombre: el usuario puede no existir cuando se lea el archivo
+        'usuario': registro['usuario__username'],
+        'descripcion': registro['descripcion'],
+        'modelo': registro['modelo'],
+        'objeto_id': registro['objeto_id'],
+    }
+
+
+# ----------------------------------------------------------
+# ARCHIVAR
+# ----------------------------------------------------------
+def archivar(antes_de, directorio=None, tamano=TAMANO_BLOQUE, simular=False, al_avanzar=None):
+    """
+    Mueve a archivo los registros con ``fecha < antes_de``.
+    Devuelve ``{'archivo.jsonl.gz': n, ...}`` con lo escrito en cada mes.
+    """
+    directorio = directorio or DIRECTORIO
+    os.makedirs(directorio, exist_ok=True)
+
+    antiguos = RegistroActividad.objects.filter(fecha__lt=antes_de).order_by('pk')
+    campos = ('id', 'fecha', 'usuario_id', 'usuario__username', 'descripcion', 'modelo', 'objeto_id')
+
+    escritos = {}
+    ultimo = 0
+    while True:
+        bloque = list(antiguos.filter(pk__gt=ultimo).values(*campos)[:tamano])
+        if not bloque:
+            break
+
+        por_mes = {}
+        for registro in bloque:
+            fila = _a_dict(registro)
+            por_mes.setdefault(fila['fecha'][:7], []).append(fila)
+
+        if not simular:
+            for mes, filas in por_mes.items():
+                ruta = _ruta(directorio, int(mes[:4]), int(mes[5:]))
+                with open(ruta, 'ab') as crudo:
+                    with gzip.GzipFile(fileobj=crudo, mode='ab') as destino:
+                        destino.write(''.join(
+                            json.dumps(f, ensure_ascii=False) + '\n' for f in filas
+                        ).encode('utf-8'))
+                    crudo.flush()
+                    os.fsync(crudo.fileno())
+
+            # Solo se borra lo que ya quedó en disco (mismo rango de ids del bloque)
+            with transaction.atomic():
+                antiguos.filter(pk__gt=ultimo, pk__lte=bloque[-1]['id']).delete()
+
+        for mes, filas in por_mes.items():
+            nombre = os.path.basename(_ruta(directorio, int(mes[:4]), int(mes[5:])))
+            escritos[nombre] = escritos.get(nombre, 0) + len(filas)
+
+        ultimo = bloque[-1]['id']
+        if al_avanzar:
+            al_avanzar(sum(escritos.values()))
+
+    return escritos
+
+
+# ----------------------------------------------------------
+# LEER
+# ----------------------------------------------------------
+def meses_archivados(directorio=None):
+    """[(anio, mes), ...] de los archivos disponibles, del más reciente al más antiguo."""
+    directorio = directorio or DIRECTORIO
+    if not os.path.isdir(directorio):
+        return []
+    meses = []
+    for nombre in os.listdir(directorio):
+        m = PATRON_ARCHIVO.match(nombre)
+        if m:
+            meses.append((int(m.group(1)), int(m.group(2))))
+    return sorted(meses, reverse=True)
+
+
+def _coincide(fila, fecha, desde, hasta, usuario, modelo, texto):
+    if desde and fecha < desde:
+        return False
+    if hasta and fecha >= hasta:
+        return False
+    if usuario and fila.get('usuario') != usuario:
+        return False
+    if modelo and fila.get('modelo') != modelo:
+        return False
+    if texto and texto not in (fila.get('descripcion') or '').lower():
+        return False
+    return True
+
+
+def leer(desde=None, hasta=None, usuario=None, modelo=None, texto=None, limite=None, directorio=None):
+    """
+    Registros archivados que cumplen los filtros, del más reciente al más antiguo.
+    ``desde``/``hasta`` son datetimes aware (``hasta`` excluyente); solo se
+    abren los archivos de los meses que tocan el rango.
+    """
+    directorio = directorio or DIRECTORIO
+    texto = (texto or '').lower()
+    mes_desde = timezone.localtime(desde).strftime('%Y-%m') if desde else None
+    mes_hasta = timezone.localtime(hasta).strftime('%Y-%m') if hasta else None
+
+    entregados = 0
+    for anio, mes in meses_archivados(directorio):
+        clave = f"{anio:04d}-{mes:02d}"
+        if (mes_desde and clave < mes_desde) or (mes_hasta and clave > mes_hasta):
+            continue
+
+        vistos = set()
+        filas = []
+        with gzip.open(_ruta(directorio, anio, mes), 'rt', encoding='utf-8') as origen:
+            for linea in origen:
+                fila = json.loads(linea)
+                if fila['id'] in vistos:
+                    continue  # bloque repetido por un archivado interrumpido
+                vistos.add(fila['id'])
+                fecha = datetime.fromisoformat(fila['fecha'])
+                if _coincide(fila, fecha, desde, hasta, usuario, modelo, texto):
+                    filas.append((fecha, fila))
+
+        # Dentro del mes las filas están en orden de id (ascendente)
+        filas.sort(key=lambda x: (x[0], x[1]['id']), reverse=True)
+        for _, fila in filas:
+            yield fila
+            entregados += 1
+            if limite and entregados >= limite:
+                return
+
+
+def consultar(desde=None, hasta=None, usuario=None, modelo=None, texto=None, limite=100, incluir_archivo=False):
+    """
+    Registros de la tabla y, si se pide (o el rango empieza antes que lo que
+    queda en la tabla), también del archivo. Mismo formato en ambos casos.
+    """
+    qs = RegistroActividad.objects.order_by('-fecha', '-pk')
+    if desde:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__lt=hasta)
+    if usuario:
+        qs = qs.filter(usuario__username=usuario)
+    if modelo:
+        qs = qs.filter(modelo=modelo)
+    if texto:
+        qs = qs.filter(descripcion__icontains=texto)
+
+    campos = ('id', 'fecha', 'usuario_id', 'usuario__username', 'descripcion', 'modelo', 'objeto_id')
+    resultados = [_a_dict(r) for r in qs.values(*campos)[:limite]]
+    for fila in resultados:
+        fila['archivado'] = False
+
+    if len(resultados) < limite and (incluir_archivo or _antes_de_la_tabla(desde)):
+        # Lo archivado siempre es más antiguo que lo que queda en la tabla
+        for fila in leer(desde, hasta, usuario, modelo, texto, limite - len(resultados)):
+            fila['archivado'] = True
+            resultados.append(fila)
+    return resultados
+
+
+def _antes_de_la_tabla(desde):
+    if not desde:
+        return False
+    primero = RegistroActividad.objects.order_by('fecha').values_list('fecha', flat=True).first()
+    return primero is None or desde < primero
@@ -3,6 +3,11 @@ ASGI config for sistema project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las lecturas asíncronas de ``api/asincrono.py`` (``/api/async/...``) solo
+aprovechan la concurrencia servidas desde aquí, ej.:
+
+    uvicorn sistema.asgi:application --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,100 @@
+# sistema/auditoria.py
+"""
+Escritura del registro de actividad por lotes.
+
+Las señales de ``sistema/signals.py`` no insertan en ``RegistroActividad``
+dentro del request: arman el evento y lo encolan en un buffer del proceso
+cuando la transacción se confirma (``transaction.on_commit``; si hay rollback
+el evento se descarta). El buffer se escribe con un solo ``bulk_create`` cuando:
+
+- junta ``AUDITORIA_TAMANO_LOTE`` eventos, o
+- pasan ``AUDITORIA_INTERVALO`` segundos desde la última escritura,
+
+y siempre al terminar cada request (``request_finished``) y al salir del
+proceso (comandos de gestión, shell).
+
+Los textos que mencionan el producto de un movimiento se completan al vaciar
+el buffer, con una sola consulta para todo el lote, en vez de leer
+``instance.producto`` en cada ``save()``.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.dispatch import receiver
+
+from sistema.models import RegistroActividad
+
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = getattr(settings, 'AUDITORIA_TAMANO_LOTE', 200)
+INTERVALO = getattr(settings, 'AUDITORIA_INTERVALO', 2.0)
+
+_lock = threading.Lock()
+_pendientes = []
+_ultimo_vaciado = time.monotonic()
+
+
+def registrar(usuario_id, descripcion, modelo, objeto_id=None, producto_id=None):
+    """
+    Encola un registro de actividad para cuando se confirme la transacción.
+    ``descripcion`` puede ser un callable que recibe el ``Producto`` de
+    ``producto_id`` (o None) y devuelve el texto.
+    """
+    evento = (usuario_id, descripcion, modelo, objeto_id, producto_id)
+    transaction.on_commit(lambda: _agregar(evento))
+
+
+def _agregar(evento):
+    with _lock:
+        _pendientes.append(evento)
+        lleno = len(_pendientes) >= TAMANO_LOTE
+        vencido = time.monotonic() - _ultimo_vaciado >= INTERVALO
+    if lleno or vencido:
+        vaciar()
+
+
+def vaciar():
+    """Escribe en la base todo lo pendiente. Devuelve cuántos registros escribió."""
+    global _pendientes, _ultimo_vaciado
+    with _lock:
+        eventos, _pendientes = _pendientes, []
+        _ultimo_vaciado = time.monotonic()
+    if not eventos:
+        return 0
+
+    try:
+        from productos.models import Producto
+
+        ids = {e[4] for e in eventos if e[4]}
+        productos = Producto.objects.in_bulk(ids) if ids else {}
+
+        registros = []
+        for usuario_id, descripcion, modelo, objeto_id, producto_id in eventos:
+            if callable(descripcion):
+                descripcion = descripcion(productos.get(producto_id))
+            registros.append(RegistroActividad(
+                usuario_id=usuario_id,
+                descripcion=descripcion,
+                modelo=modelo,
+                objeto_id=objeto_id,
+            ))
+        RegistroActividad.objects.bulk_create(registros, batch_size=TAMANO_LOTE)
+    except Exception:
+        # La auditoría nunca debe tumbar la operación que la originó
+        logger.exception("No se pudieron escribir %s registros de actividad", len(eventos))
+        return 0
+    return len(eventos)
+
+
+@receiver(request_finished)
+def vaciar_al_terminar_request(sender, **kwargs):
+    vaciar()
+
+
+atexit.register(vaciar)
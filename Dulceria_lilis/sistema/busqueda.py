@@ -0,0 +1,212 @@
+# sistema/busqueda.py
+"""
+Búsqueda de texto completo para movimientos, productos y proveedores.
+
+Cada objeto buscable tiene una fila en ``IndiceBusqueda`` con un documento de
+texto desnormalizado (SKU, nombres, RUT...). El documento se actualiza al
+guardar el objeto y, sobre él, la base de datos mantiene un índice de texto
+completo:
+
+- SQLite: tabla virtual FTS5 ``sistema_indicebusqueda_fts`` (contenido externo,
+  sincronizada por triggers, ver la migración 0004).
+- MySQL: índice FULLTEXT sobre ``documento``.
+
+Los listados filtran con ``filtrar(queryset, texto)``, que resuelve los ids en
+el índice en vez de encadenar ``LIKE '%x%'`` sobre varios JOIN. Busca por
+prefijo de palabra, no por cualquier trozo del texto (ver ``filtrar``).
+"""
+import re
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from sistema.models import IndiceBusqueda
+from utils.upsert import opciones_upsert
+
+
+TAMANO_BLOQUE = 500
+TABLA = IndiceBusqueda._meta.db_table
+TABLA_FTS = f'{TABLA}_fts'
+
+# Campos que forman el documento de cada modelo buscable
+CAMPOS = {
+    'inventario.movimientoinventario': (
+        'producto__sku', 'producto__nombre',
+        'proveedor__rut_nif', 'proveedor__razon_social', 'proveedor__nombre_fantasia',
+        'documento_referencia',
+    ),
+    'productos.producto': ('sku', 'ean_upc', 'nombre', 'marca'),
+    'proveedores.proveedor': ('rut_nif', 'razon_social', 'nombre_fantasia'),
+}
+
+# Documentos que copian datos de otro modelo: (modelo dependiente, campo FK)
+DEPENDIENTES = {
+    'productos.producto': ('inventario.movimientoinventario', 'producto'),
+    'proveedores.proveedor': ('inventario.movimientoinventario', 'proveedor'),
+}
+
+
+def reconstruir_fts():
+    """Regenera el índice FTS5 desde la tabla base (solo SQLite)."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+
+
+# ------------------------------------------------------------------
+#     C O N S U L T A
+# ------------------------------------------------------------------
+# MySQL no indexa las palabras más cortas que innodb_ft_min_token_size (3 por
+# defecto) ni las de su lista de palabras vacías: esas se buscan con LIKE
+# sobre el documento (una sola tabla, sin JOIN), igual que con un motor sin
+# texto completo
+TOKEN_MINIMO_MYSQL = 3
+PALABRAS_VACIAS_MYSQL = frozenset(
+    'a about an are as at be by com de en for from how i in is it la of on or '
+    'that the this to was what when where who will with und www'.split()
+)
+
+
+def _palabras(texto):
+    return re.findall(r'\w+', (texto or '').lower())
+
+
+def _indexadas(palabras):
+    """Palabras que el índice de texto completo del motor puede resolver."""
+    if connection.vendor == 'sqlite':
+        return palabras
+    if connection.vendor == 'mysql':
+        return [p for p in palabras if len(p) >= TOKEN_MINIMO_MYSQL and p not in PALABRAS_VACIAS_MYSQL]
+    return []
+
+
+def filtrar(queryset, texto):
+    """
+    Filtra ``queryset`` (movimientos, productos o proveedores) por ``texto``.
+
+    Cada palabra debe aparecer como prefijo de alguna palabra del documento:
+    "choco ros" encuentra "Chocolate Rosa" y "dul 00123" encuentra
+    "DUL-00123", pero "ocolate" o "0123" no (el ``icontains`` anterior sí
+    encontraba trozos del medio). Las palabras que el índice no cubre se
+    buscan como texto contenido en el documento.
+    """
+    palabras = _palabras(texto)
+    if not palabras:
+        return queryset
+    modelo = queryset.model._meta.label_lower
+    documentos = IndiceBusqueda.objects.filter(modelo=modelo)
+
+    indexadas = _indexadas(palabras)
+    if indexadas and connection.vendor == 'sqlite':
+        consulta = ' AND '.join(f'"{p}"*' for p in indexadas)
+        documentos = documentos.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", (consulta,))
+        )
+    elif indexadas:
+        consulta = ' '.join(f'+{p}*' for p in indexadas)
+        documentos = documentos.filter(
+            RawSQL("MATCH(documento) AGAINST (%s IN BOOLEAN MODE)", (consulta,), output_field=BooleanField())
+        )
+    for p in palabras:
+        if p not in indexadas:
+            documentos = documentos.filter(documento__icontains=p)
+
+    return queryset.filter(pk__in=documentos.values('objeto_id'))
+
+
+# ------------------------------------------------------------------
+#     I N D E X A C I Ó N
+# ------------------------------------------------------------------
+def _documentos(queryset, modelo):
+    """(pk, documento) de cada fila de ``queryset``, leídos por bloques de pk."""
+    campos = CAMPOS[modelo]
+    queryset = queryset.order_by('pk')
+    ultimo = None
+    while True:
+        bloque = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+        filas = list(bloque.values_list('pk', *campos)[:TAMANO_BLOQUE])
+        if not filas:
+            return
+        for fila in filas:
+            yield fila[0], ' '.join(str(v) for v in fila[1:] if v)
+        ultimo = filas[-1][0]
+
+
+def _guardar(modelo, documentos):
+    # En MySQL el conflicto es el de la única clave única (modelo, objeto_id)
+    IndiceBusqueda.objects.bulk_create(
+        [IndiceBusqueda(modelo=modelo, objeto_id=pk, documento=doc) for pk, doc in documentos],
+        **opciones_upsert(['modelo', 'objeto_id'], ['documento']),
+    )
+
+
+def indexar(queryset):
+    """Crea o actualiza el documento de cada objeto de ``queryset``. Devuelve cuántos."""
+    modelo = queryset.model._meta.label_lower
+    total = 0
+    pendientes = []
+    for par in _documentos(queryset, modelo):
+        pendientes.append(par)
+        if len(pendientes) >= TAMANO_BLOQUE:
+            _guardar(modelo, pendientes)
+            total += len(pendientes)
+            pendientes = []
+    if pendientes:
+        _guardar(modelo, pendientes)
+        total += len(pendientes)
+    return total
+
+
+def _dependientes(modelo, pk):
+    dependiente, campo = DEPENDIENTES[modelo]
+    return apps.get_model(dependiente).objects.filter(**{f'{campo}_id': pk})
+
+
+# ------------------------------------------------------------------
+#     S E Ñ A L E S
+# ------------------------------------------------------------------
+@receiver(post_save, sender='inventario.MovimientoInventario')
+@receiver(post_save, sender='productos.Producto')
+@receiver(post_save, sender='proveedores.Proveedor')
+def indexar_al_guardar(sender, instance, created, **kwargs):
+    modelo = sender._meta.label_lower
+    anterior = None
+    if not created and modelo in DEPENDIENTES:
+        anterior = (
+            IndiceBusqueda.objects.filter(modelo=modelo, objeto_id=instance.pk)
+            .values_list('documento', flat=True).first()
+        )
+
+    documentos = list(_documentos(sender.objects.filter(pk=instance.pk), modelo))
+    _guardar(modelo, documentos)
+
+    # Si cambió el texto (ej. SKU o razón social), se rehacen los movimientos que lo copian
+    if anterior is not None and documentos and documentos[0][1] != anterior:
+        indexar(_dependientes(modelo, instance.pk))
+
+
+@receiver(pre_delete, sender='proveedores.Proveedor')
+def recordar_dependientes(sender, instance, **kwargs):
+    # Los movimientos quedan con proveedor NULL sin disparar señales
+    instance._pendientes_busqueda = list(
+        _dependientes(sender._meta.label_lower, instance.pk).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender='inventario.MovimientoInventario')
+@receiver(post_delete, sender='productos.Producto')
+@receiver(post_delete, sender='proveedores.Proveedor')
+def desindexar_al_eliminar(sender, instance, **kwargs):
+    modelo = sender._meta.label_lower
+    IndiceBusqueda.objects.filter(modelo=modelo, objeto_id=instance.pk).delete()
+
+    pendientes = getattr(instance, '_pendientes_busqueda', None)
+    if pendientes:
+        dependiente, _ = DEPENDIENTES[modelo]
+        objetos = apps.get_model(dependiente).objects
+        for i in range(0, len(pendientes), TAMANO_BLOQUE):
+            indexar(objetos.filter(pk__in=pendientes[i:i + TAMANO_BLOQUE]))
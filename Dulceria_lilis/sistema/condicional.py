@@ -0,0 +1,142 @@
+# sistema/condicional.py
+"""
+GET condicional (ETag / 304) para los listados.
+
+Cada familia de datos tiene un sello de versión (``sistema/versiones.py``) que
+sube con cada escritura: señales ``post_save``/``post_delete`` de los modelos
+de ``FAMILIAS`` y llamadas explícitas donde se escribe con ``update()`` o
+``bulk_create`` (motor de stock, comandos de carga y conciliación).
+
+El ETag de una página combina:
+
+- los sellos de las familias que muestra,
+- los filtros efectivos (GET + los guardados en sesión) y el resto del GET,
+- el usuario, sus permisos y su token CSRF (el HTML los incluye).
+
+No se emite ETag (respuesta completa, como antes) para métodos distintos de
+GET/HEAD, exportaciones, cuando hay mensajes pendientes de mostrar ni fuera de
+HTTPS (ver ``revalidable``).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from sistema import versiones
+
+
+# modelo -> familias que cambian al escribirlo
+FAMILIAS = {
+    'productos.producto': ('productos',),
+    'proveedores.proveedor': ('proveedores',),
+    'proveedores.productoproveedor': ('proveedores',),
+    # Un movimiento cambia stock_actual y cantidad_disponible con update() (sin señales)
+    'inventario.movimientoinventario': ('inventario', 'productos', 'lotes'),
+    # reconciliar_stock --fix corrige StockBodega con update() y llama a tocar_modelo
+    'inventario.stockbodega': ('inventario',),
+    'inventario.bodega': ('bodegas',),
+    'inventario.lote': ('lotes',),
+    'usuarios.usuario': ('usuarios',),
+}
+
+
+def tocar(*familias):
+    """Sube el sello de las familias al confirmarse la transacción."""
+    for familia in familias:
+        versiones.tocar(f'pagina:{familia}')
+
+
+def tocar_modelo(modelo):
+    """Para escrituras sin señales (``update()``, ``bulk_create``) sobre ``modelo``."""
+    tocar(*FAMILIAS.get(modelo._meta.label_lower, ()))
+
+
+def tocar_todo():
+    tocar(*{familia for familias in FAMILIAS.values() for familia in familias})
+
+
+async def asellos(*familias):
+    """Sellos vigentes de las familias, para ETags de vistas asíncronas."""
+    return [await versiones.aobtener(f'pagina:{f}') for f in familias]
+
+
+def _al_escribir(sender, **kwargs):
+    tocar(*FAMILIAS[sender._meta.label_lower])
+
+
+for _label in FAMILIAS:
+    post_save.connect(_al_escribir, sender=_label, dispatch_uid=f'condicional_guardado_{_label}')
+    post_delete.connect(_al_escribir, sender=_label, dispatch_uid=f'condicional_eliminacion_{_label}')
+
+
+# ----------------------------------------------------------
+# ETAG DE UNA PÁGINA
+# ----------------------------------------------------------
+def revalidable(request):
+    """
+    Si el navegador puede guardar la respuesta autenticada y revalidarla.
+
+    Solo bajo HTTPS (``settings.HTTPS``): en HTTP ``Clear-Site-Data`` no
+    funciona y las páginas van con ``no-store`` para que no se puedan ver
+    tras el logout (``usuarios/middleware.py``). Sin copia guardada no hay
+    If-None-Match que responder, así que tampoco se calcula ETag.
+    """
+    return request.is_secure()
+
+
+def _huella_usuario(request):
+    user = request.user
+    return [
+        str(user.pk),
+        user.get_username(),
+        str(user.is_superuser),
+        ','.join(sorted(user.get_all_permissions())),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+
+
+def etag_pagina(request, familias, filtros=None):
+    """ETag de un listado, o None si la respuesta no debe ser condicional."""
+    if request.method not in ('GET', 'HEAD') or 'export' in request.GET:
+        return None
+    if not revalidable(request):
+        return None
+    if not request.user.is_authenticated:
+        return None
+    # Los mensajes se consumen al renderizar: con un 304 no se verían
+    if len(messages.get_messages(request)):
+        return None
+
+    # filtros(request) aplica la misma lógica GET/sesión que la vista (y
+    # la persiste), así un 304 deja la sesión igual que un render completo
+    efectivos = filtros(request) if filtros else {}
+
+    partes = [versiones.obtener(f'pagina:{f}') for f in familias]
+    partes += _huella_usuario(request)
+    partes += [f'{k}={v}' for k, v in sorted(efectivos.items())]
+    partes += [f'{k}={v}' for k, v in sorted(request.GET.lists())]
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+def condicional(*familias, filtros=None):
+    """
+    Decorador de vista: responde 304 si el ETag coincide con If-None-Match.
+    ``filtros`` es un callable ``request -> dict`` con los filtros efectivos.
+    Para vistas de clase: ``method_decorator(condicional(...), name='get')``.
+    """
+    def decorador(vista):
+        condicionada = condition(etag_func=lambda request, *a, **kw: etag_pagina(request, familias, filtros))(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = condicionada(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                # Se guarda, pero se revalida siempre (nunca se muestra sin preguntar)
+                patch_cache_control(response, private=True, no_cache=True, must_revalidate=True)
+            return response
+        return envoltura
+    return decorador
@@ -0,0 +1,158 @@
+# sistema/contadores.py
+"""
+Contadores del dashboard (productos, proveedores, usuarios, movimientos).
+
+En vez de un ``COUNT(*)`` por tabla en cada carga, los totales viven en la
+caché (``CACHES['default']``) y se mantienen con incrementos/decrementos desde
+las señales ``post_save``/``post_delete`` de ``sistema/signals.py``, aplicados
+solo cuando la transacción se confirma.
+
+Cada ``CONTADORES_RECUENTO`` segundos se hace un recuento exacto en un hilo
+aparte, que corrige cualquier desvío (operaciones con ``update()``/SQL directo,
+varios procesos con caché local, etc.) sin que el request lo espere.
+
+La caché no ofrece compare-and-set: un incremento que llega entre el COUNT y
+el ``set()`` del recuento se perdería. Por eso cada incremento sube además una
+versión del contador y el recuento se repite si la versión cambió mientras
+contaba (ver ``contar``).
+"""
+import logging
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# nombre del contador -> modelo
+MODELOS = {
+    'productos': 'productos.Producto',
+    'proveedores': 'proveedores.Proveedor',
+    'usuarios': 'usuarios.Usuario',
+    'inventario': 'inventario.MovimientoInventario',
+}
+POR_MODELO = {label.lower(): nombre for nombre, label in MODELOS.items()}
+
+RECUENTO = getattr(settings, 'CONTADORES_RECUENTO', 5 * 60)
+CLAVE_RECUENTO = 'contadores:recuento'
+
+
+INTENTOS = 3
+
+
+def _clave(nombre):
+    return f'contadores:{nombre}'
+
+
+def _clave_version(nombre):
+    return f'contadores:{nombre}:version'
+
+
+def contar(nombre):
+    """
+    Recuento exacto de un contador y lo deja en caché.
+
+    La versión se compara después del ``set()``: si cambió, algún incremento
+    pudo pisarse (o contarse dos veces) y se vuelve a contar. Si no se
+    estabiliza en ``INTENTOS`` se borra el valor y la próxima lectura cuenta.
+    """
+    modelo = apps.get_model(MODELOS[nombre])
+    for _ in range(INTENTOS):
+        version = cache.get(_clave_version(nombre))
+        total = modelo.objects.count()
+        cache.set(_clave(nombre), total, timeout=None)
+        if cache.get(_clave_version(nombre)) == version:
+            return total
+    cache.delete(_clave(nombre))
+    return total
+
+
+async def acontar(nombre):
+    """Igual que ``contar()``, para vistas asíncronas."""
+    modelo = apps.get_model(MODELOS[nombre])
+    for _ in range(INTENTOS):
+        version = await cache.aget(_clave_version(nombre))
+        total = await modelo.objects.acount()
+        await cache.aset(_clave(nombre), total, timeout=None)
+        if await cache.aget(_clave_version(nombre)) == version:
+            return total
+    await cache.adelete(_clave(nombre))
+    return total
+
+
+def recontar():
+    return {nombre: contar(nombre) for nombre in MODELOS}
+
+
+def _recontar_en_segundo_plano():
+    def tarea():
+        try:
+            recontar()
+        except Exception:
+            logger.exception("Falló el recuento de contadores")
+            cache.delete(CLAVE_RECUENTO)  # se reintenta en la próxima lectura
+        finally:
+            connection.close()
+
+    threading.Thread(target=tarea, name='contadores', daemon=True).start()
+
+
+def obtener():
+    """Totales para el dashboard: {'productos': n, 'proveedores': n, ...}."""
+    claves = {nombre: _clave(nombre) for nombre in MODELOS}
+    en_cache = cache.get_many(claves.values())
+
+    totales = {}
+    for nombre, clave in claves.items():
+        # Solo en frío (caché vacía) se cuenta dentro del request
+        totales[nombre] = en_cache[clave] if clave in en_cache else contar(nombre)
+
+    # add() es atómico: un único request por período dispara el recuento
+    if cache.add(CLAVE_RECUENTO, True, timeout=RECUENTO) and len(en_cache) == len(claves):
+        _recontar_en_segundo_plano()
+    return totales
+
+
+async def aobtener():
+    """Igual que ``obtener()``, para vistas asíncronas."""
+    claves = {nombre: _clave(nombre) for nombre in MODELOS}
+    en_cache = await cache.aget_many(claves.values())
+
+    totales = {}
+    for nombre, clave in claves.items():
+        totales[nombre] = en_cache[clave] if clave in en_cache else await acontar(nombre)
+
+    if await cache.aadd(CLAVE_RECUENTO, True, timeout=RECUENTO) and len(en_cache) == len(claves):
+        _recontar_en_segundo_plano()
+    return totales
+
+
+# ----------------------------------------------------------
+# INCREMENTOS (desde las señales)
+# ----------------------------------------------------------
+def _sumar(nombre, delta):
+    try:
+        cache.incr(_clave(nombre), delta)
+    except ValueError:
+        pass  # aún no se ha contado: la próxima lectura hace el COUNT
+    # Después del incr (un recuento en curso lo ve sí o sí); también sin
+    # valor en caché, por si un recuento en frío está contando ahora mismo
+    try:
+        cache.incr(_clave_version(nombre))
+    except ValueError:
+        cache.add(_clave_version(nombre), 1, timeout=None)
+
+
+def sumar(nombre, delta):
+    """Ajusta el contador cuando (y si) la transacción en curso se confirma."""
+    if delta:
+        transaction.on_commit(lambda: _sumar(nombre, delta))
+
+
+def registrar_cambio(sender, delta):
+    nombre = POR_MODELO.get(sender._meta.label_lower)
+    if nombre:
+        sumar(nombre, delta)
@@ -0,0 +1,204 @@
+# sistema/exportaciones.py
+"""
+Exportaciones en segundo plano.
+
+Un listado grande no se exporta dentro del request: se crea un
+``TrabajoExportacion`` con los filtros y un pool local de hilos genera el
+archivo en ``MEDIA_ROOT/exports`` (no requiere broker externo). El navegador
+consulta el avance en ``exportaciones/<id>/`` y descarga al terminar.
+
+Si el mismo usuario pide la misma exportación (tipo + formato + filtros)
+dentro del TTL, se reutiliza el archivo ya generado o el trabajo que sigue en
+curso. Cada trabajo es de quien lo pidió: nadie más consulta su avance ni lo
+descarga (ver ``trabajo_de``).
+"""
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from sistema.models import TrabajoExportacion
+from utils.export_excel import FORMATOS, generar
+
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (función filtros -> (columns, queryset), permiso para ver/descargar)
+EXPORTACIONES = {
+    'movimientos_inventario': ('inventario.views.exportacion_movimientos', 'inventario.ver_movimientos'),
+    'productos': ('productos.views.exportacion_productos', 'productos.view_producto'),
+    'proveedores': ('proveedores.views.exportacion_proveedores', None),
+    'usuarios': ('usuarios.views.exportacion_usuarios', None),
+}
+
+CARPETA = 'exports'
+TTL = timedelta(seconds=getattr(settings, 'EXPORTACIONES_TTL', 10 * 60))
+RETENCION = timedelta(seconds=getattr(settings, 'EXPORTACIONES_RETENCION', 24 * 60 * 60))
+WORKERS = getattr(settings, 'EXPORTACIONES_WORKERS', 2)
+# Un trabajo en curso que no avanza en este tiempo se da por perdido (ej. se reinició el proceso)
+SIN_AVANCE = timedelta(minutes=5)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='exportacion')
+    return _pool
+
+
+def huella(tipo, formato, filtros, usuario_id=None):
+    datos = json.dumps(
+        {'tipo': tipo, 'formato': formato, 'filtros': filtros, 'usuario': usuario_id},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def puede_ver(usuario, tipo):
+    permiso = EXPORTACIONES[tipo][1]
+    return usuario.is_authenticated and (permiso is None or usuario.has_perm(permiso))
+
+
+def trabajo_de(usuario, pk):
+    """
+    El trabajo ``pk`` si es de ``usuario`` y este aún puede ver ese tipo de
+    exportación; si no, None (el id es correlativo: no basta con conocerlo).
+    """
+    if not usuario.is_authenticated:
+        return None
+    trabajo = TrabajoExportacion.objects.filter(pk=pk, usuario=usuario).first()
+    if trabajo is None or not puede_ver(usuario, trabajo.tipo):
+        return None
+    return trabajo
+
+
+# ----------------------------------------------------------
+# SOLICITAR
+# ----------------------------------------------------------
+def solicitar(tipo, formato, filtros, usuario=None):
+    """Devuelve el trabajo que atiende la exportación: uno reutilizable o uno nuevo."""
+    if tipo not in EXPORTACIONES:
+        raise ValueError(f"Exportación desconocida: {tipo}")
+    if formato not in FORMATOS:
+        formato = 'xlsx'
+
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    h = huella(tipo, formato, filtros, getattr(usuario, 'pk', None))
+    ahora = timezone.now()
+    reciente = (
+        TrabajoExportacion.objects.filter(huella=h, usuario=usuario)
+        .filter(
+            Q(estado='LISTO', terminado__gte=ahora - TTL)
+            | Q(estado__in=('PENDIENTE', 'EN_PROCESO'), actualizado__gte=ahora - SIN_AVANCE)
+        )
+        .order_by('-creado')
+        .first()
+    )
+    if reciente and (reciente.estado != 'LISTO' or os.path.exists(reciente.archivo.path)):
+        return reciente
+
+    limpiar_vencidos()
+    trabajo = TrabajoExportacion.objects.create(
+        tipo=tipo,
+        formato=formato,
+        filtros=filtros,
+        huella=h,
+        usuario=usuario,
+    )
+    transaction.on_commit(lambda: _executor().submit(_ejecutar, trabajo.pk))
+    return trabajo
+
+
+def responder(request, tipo, formato, filtros):
+    """Respuesta JSON para el botón de exportar de los listados."""
+    trabajo = solicitar(tipo, formato, filtros, request.user)
+    return JsonResponse(a_dict(trabajo), status=202)
+
+
+def a_dict(trabajo):
+    return {
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'procesadas': trabajo.procesadas,
+        'total': trabajo.total,
+        'porcentaje': trabajo.porcentaje,
+        'error': trabajo.error,
+        'estado_url': reverse('estado_exportacion', args=[trabajo.pk]),
+        'descarga_url': reverse('descargar_exportacion', args=[trabajo.pk]) if trabajo.estado == 'LISTO' else None,
+    }
+
+
+# ----------------------------------------------------------
+# TRABAJADOR
+# ----------------------------------------------------------
+def _actualizar(pk, **campos):
+    # update() no pasa por auto_now: el "latido" se marca a mano
+    TrabajoExportacion.objects.filter(pk=pk).update(actualizado=timezone.now(), **campos)
+
+
+def _ejecutar(pk):
+    close_old_connections()
+    try:
+        trabajo = TrabajoExportacion.objects.get(pk=pk)
+        columns, queryset = import_string(EXPORTACIONES[trabajo.tipo][0])(trabajo.filtros)
+        total = queryset.count()
+        _actualizar(pk, estado='EN_PROCESO', total=total)
+
+        # Sufijo aleatorio: el nombre no se deduce del id aunque MEDIA se sirva en DEBUG
+        nombre = (
+            f"{CARPETA}/{trabajo.tipo}_{trabajo.pk}_{timezone.now():%Y%m%d%H%M%S}_"
+            f"{secrets.token_hex(8)}.{trabajo.formato}"
+        )
+        ruta = os.path.join(settings.MEDIA_ROOT, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        # Se escribe a un temporal y se renombra: nunca se sirve un archivo a medias
+        parcial = f"{ruta}.parcial"
+        with open(parcial, 'wb') as destino:
+            for trozo in generar(columns, queryset, trabajo.formato,
+                                 al_avanzar=lambda n: _actualizar(pk, procesadas=n)):
+                destino.write(trozo)
+        os.replace(parcial, ruta)
+
+        _actualizar(pk, estado='LISTO', procesadas=total, archivo=nombre, terminado=timezone.now())
+    except Exception as e:
+        logger.exception("Falló la exportación %s", pk)
+        _actualizar(pk, estado='ERROR', error=str(e)[:500], terminado=timezone.now())
+    finally:
+        connection.close()
+
+
+# ----------------------------------------------------------
+# LIMPIEZA
+# ----------------------------------------------------------
+def limpiar_vencidos():
+    """Borra los trabajos (y sus archivos) más antiguos que la retención."""
+    ahora = timezone.now()
+    TrabajoExportacion.objects.filter(
+        estado__in=('PENDIENTE', 'EN_PROCESO'), actualizado__lt=ahora - SIN_AVANCE
+    ).update(estado='ERROR', error='Interrumpido', terminado=ahora, actualizado=ahora)
+
+    vencidos = TrabajoExportacion.objects.filter(creado__lt=ahora - RETENCION)
+    for archivo in vencidos.exclude(archivo='').values_list('archivo', flat=True):
+        ruta = os.path.join(settings.MEDIA_ROOT, archivo)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    vencidos.delete()
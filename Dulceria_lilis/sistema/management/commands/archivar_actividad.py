@@ -0,0 +1,59 @@
+# sistema/management/commands/archivar_actividad.py
+"""
+Mueve los registros de actividad antiguos de la tabla a archivos JSONL
+comprimidos (ver ``sistema/archivo_actividad.py``). Pensado para cron diario.
+
+Ejemplos:
+    python manage.py archivar_actividad
+    python manage.py archivar_actividad --older-than 90d
+    python manage.py archivar_actividad --older-than 30d --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sistema import archivo_actividad
+
+
+class Command(BaseCommand):
+    help = 'Archiva (y quita de la tabla) los registros de actividad más antiguos que la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', dest='antiguedad', default=f"{archivo_actividad.RETENCION_DIAS}d",
+            help='Antigüedad mínima a archivar, ej. 90d, 12h, 4w (por defecto ACTIVIDAD_RETENCION_DIAS)',
+        )
+        parser.add_argument(
+            '--directorio', default=None,
+            help='Carpeta de los archivos (por defecto ACTIVIDAD_ARCHIVO_DIR)',
+        )
+        parser.add_argument('--tamano', type=int, default=archivo_actividad.TAMANO_BLOQUE,
+                            help='Registros por bloque')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo informa cuántos registros se archivarían')
+
+    def handle(self, *args, **options):
+        try:
+            antiguedad = archivo_actividad.parse_antiguedad(options['antiguedad'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['tamano'] <= 0:
+            raise CommandError("--tamano debe ser mayor que 0")
+
+        corte = timezone.now() - antiguedad
+        self.stdout.write(f"Archivando registros anteriores a {timezone.localtime(corte):%d/%m/%Y %H:%M}...")
+
+        escritos = archivo_actividad.archivar(
+            corte,
+            directorio=options['directorio'],
+            tamano=options['tamano'],
+            simular=options['dry_run'],
+            al_avanzar=lambda n: self.stdout.write(f"  ... {n} registros"),
+        )
+
+        for nombre, total in sorted(escritos.items()):
+            self.stdout.write(f"  {nombre}: {total}")
+        total = sum(escritos.values())
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Simulación: se archivarían {total} registros."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {total} registros archivados."))
@@ -0,0 +1,21 @@
+# sistema/management/commands/recontar_contadores.py
+"""
+Recuento exacto de los contadores del dashboard (ver ``sistema/contadores.py``).
+
+El dashboard ya lo hace solo cada ``CONTADORES_RECUENTO`` segundos; el comando
+sirve tras cargas con SQL directo o para programarlo en cron.
+
+    python manage.py recontar_contadores
+"""
+from django.core.management.base import BaseCommand
+
+from sistema import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recuenta los totales del dashboard y los deja en caché'
+
+    def handle(self, *args, **options):
+        for nombre, total in contadores.recontar().items():
+            self.stdout.write(f"  {nombre}: {total}")
+        self.stdout.write(self.style.SUCCESS("✅ Contadores actualizados."))
@@ -0,0 +1,48 @@
+# sistema/management/commands/reindexar_busqueda.py
+"""
+Reconstruye el índice de búsqueda de texto completo (``IndiceBusqueda``).
+
+Normalmente no hace falta: el índice se mantiene al guardar cada objeto.
+Sirve después de cargas masivas hechas con ``update()``/SQL directo o si se
+cambian los campos que forman el documento en ``sistema/busqueda.py``.
+
+Ejemplos:
+    python manage.py reindexar_busqueda
+    python manage.py reindexar_busqueda --modelo productos.producto
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sistema import busqueda
+from sistema.models import IndiceBusqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de movimientos, productos y proveedores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modelo', action='append', choices=sorted(busqueda.CAMPOS),
+            help='Solo este modelo (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        modelos = options['modelo'] or sorted(busqueda.CAMPOS)
+
+        for modelo in modelos:
+            try:
+                clase = apps.get_model(modelo)
+            except LookupError as e:
+                raise CommandError(str(e))
+
+            with transaction.atomic():
+                total = busqueda.indexar(clase.objects.all())
+                # Documentos de objetos que ya no existen
+                huerfanos = IndiceBusqueda.objects.filter(modelo=modelo).exclude(
+                    objeto_id__in=clase.objects.values('pk')
+                ).delete()[0]
+            self.stdout.write(f"  {modelo}: {total} indexados, {huerfanos} eliminados")
+
+        busqueda.reconstruir_fts()
+        self.stdout.write(self.style.SUCCESS("✅ Índice de búsqueda reconstruido."))
@@ -1,32 +1,66 @@
 # sistema/middleware.py
-import threading
+"""
+Middlewares del sistema, utilizables tanto en WSGI como en ASGI.
 
+El usuario del request en curso se guarda en una ``ContextVar`` (no en
+``threading.local``): bajo ASGI varios requests comparten hilo, pero cada uno
+corre en su propio contexto, y ``sync_to_async`` copia ese contexto al hilo
+donde se ejecutan el ORM y las señales. Así la auditoría atribuye cada cambio
+al usuario correcto aunque haya muchas conexiones concurrentes por worker.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse
 
-_thread_locals = threading.local()
+_usuario_actual = ContextVar('usuario_actual', default=None)
+
 
 def get_current_user():
-    return getattr(_thread_locals, 'user', None)
+    return _usuario_actual.get()
 
-class CurrentUserMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
 
-    def __call__(self, request):
-        _thread_locals.user = request.user if request.user.is_authenticated else None
-        response = self.get_response(request)
-        _thread_locals.user = None
-        return response
-    
-# 🔐 Middleware para forzar cambio de clave temporal
-# 🔐 Middleware para forzar cambio de clave temporal
-class ForzarCambioClaveMiddleware:
+class _MiddlewareHibrido:
+    """Base para middlewares con entrada síncrona y asíncrona."""
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return self.procesar(request, request.user)
+
+    async def __acall__(self, request):
+        return await self.aprocesar(request, await request.auser())
+
 
+class CurrentUserMiddleware(_MiddlewareHibrido):
+    def procesar(self, request, user):
+        token = _usuario_actual.set(user if user.is_authenticated else None)
+        try:
+            return self.get_response(request)
+        finally:
+            _usuario_actual.reset(token)
+
+    async def aprocesar(self, request, user):
+        token = _usuario_actual.set(user if user.is_authenticated else None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _usuario_actual.reset(token)
+
+
+# 🔐 Middleware para forzar cambio de clave temporal
+class ForzarCambioClaveMiddleware(_MiddlewareHibrido):
+
+    def _debe_cambiar(self, request, user):
         # Rutas permitidas sin obligar cambio de clave
         rutas_exentas = [
             reverse('usuarios:login'),
@@ -35,11 +69,18 @@ class ForzarCambioClaveMiddleware:
         ]
 
         # Si está autenticado, tiene la bandera activada y NO está en una ruta exenta → redirigir
-        if (
-            request.user.is_authenticated
-            and getattr(request.user, "debe_cambiar_clave", False)
+        return (
+            user.is_authenticated
+            and getattr(user, "debe_cambiar_clave", False)
             and request.path not in rutas_exentas
-        ):
-            return redirect("usuarios:cambiar_clave_obligatorio")
+        )
 
+    def procesar(self, request, user):
+        if self._debe_cambiar(request, user):
+            return redirect("usuarios:cambiar_clave_obligatorio")
         return self.get_response(request)
+
+    async def aprocesar(self, request, user):
+        if self._debe_cambiar(request, user):
+            return redirect("usuarios:cambiar_clave_obligatorio")
+        return await self.get_response(request)
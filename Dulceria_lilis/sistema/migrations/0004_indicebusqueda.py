@@ -0,0 +1,110 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+TABLA = 'sistema_indicebusqueda'
+TABLA_FTS = f'{TABLA}_fts'
+
+SQL_CREAR = {
+    # FTS5 de contenido externo: los triggers lo mantienen al día con la tabla base
+    'sqlite': [
+        f"""CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5(
+            documento, content='{TABLA}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}(rowid, documento) VALUES (new.id, new.documento);
+        END""",
+        f"""CREATE TRIGGER {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, documento) VALUES ('delete', old.id, old.documento);
+        END""",
+        f"""CREATE TRIGGER {TABLA_FTS}_au AFTER UPDATE ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, documento) VALUES ('delete', old.id, old.documento);
+            INSERT INTO {TABLA_FTS}(rowid, documento) VALUES (new.id, new.documento);
+        END""",
+    ],
+    'mysql': [f"CREATE FULLTEXT INDEX {TABLA}_ft ON {TABLA} (documento)"],
+}
+
+SQL_BORRAR = {
+    'sqlite': [
+        f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ai",
+        f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ad",
+        f"DROP TRIGGER IF EXISTS {TABLA_FTS}_au",
+        f"DROP TABLE IF EXISTS {TABLA_FTS}",
+    ],
+    'mysql': [f"DROP INDEX {TABLA}_ft ON {TABLA}"],
+}
+
+# Campos del documento de cada modelo (copia de sistema/busqueda.py al crear el índice)
+CAMPOS = {
+    ('inventario', 'MovimientoInventario'): (
+        'producto__sku', 'producto__nombre',
+        'proveedor__rut_nif', 'proveedor__razon_social', 'proveedor__nombre_fantasia',
+        'documento_referencia',
+    ),
+    ('productos', 'Producto'): ('sku', 'ean_upc', 'nombre', 'marca'),
+    ('proveedores', 'Proveedor'): ('rut_nif', 'razon_social', 'nombre_fantasia'),
+}
+
+
+def crear_estructuras(apps, schema_editor):
+    for sql in SQL_CREAR.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def borrar_estructuras(apps, schema_editor):
+    for sql in SQL_BORRAR.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def poblar_indice(apps, schema_editor):
+    """Indexa los movimientos, productos y proveedores ya existentes."""
+    IndiceBusqueda = apps.get_model('sistema', 'IndiceBusqueda')
+    for (app_label, nombre), campos in CAMPOS.items():
+        modelo = f'{app_label}.{nombre.lower()}'
+        qs = apps.get_model(app_label, nombre).objects.order_by('pk')
+        ultimo = 0
+        while True:
+            filas = list(qs.filter(pk__gt=ultimo).values_list('pk', *campos)[:500])
+            if not filas:
+                break
+            IndiceBusqueda.objects.bulk_create([
+                IndiceBusqueda(
+                    modelo=modelo,
+                    objeto_id=fila[0],
+                    documento=' '.join(str(v) for v in fila[1:] if v),
+                )
+                for fila in filas
+            ])
+            ultimo = filas[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema', '0003_alter_registroactividad_options_and_more'),
+        ('inventario', '0008_indices_movimientos'),
+        ('productos', '0002_producto_fecha_vencimiento'),
+        ('proveedores', '0003_alter_productoproveedor_min_lote_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('documento', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda',
+                'verbose_name_plural': 'Índice de búsqueda',
+                'unique_together': {('modelo', 'objeto_id')},
+            },
+        ),
+        migrations.RunPython(crear_estructuras, borrar_estructuras),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
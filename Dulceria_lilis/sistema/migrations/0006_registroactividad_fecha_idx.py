@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sistema', '0005_trabajoexportacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroactividad',
+            index=models.Index(fields=['fecha'], name='sistema_reg_fecha_idx'),
+        ),
+    ]
@@ -26,6 +26,8 @@ class RegistroActividad(models.Model):
         verbose_name = 'Registro de actividad'
         verbose_name_plural = 'Registros de actividad'
         ordering = ['-fecha']
+        # Dashboard (últimos registros) y archivado por antigüedad filtran/ordenan por fecha
+        indexes = [models.Index(fields=['fecha'], name='sistema_reg_fecha_idx')]
 
     def __str__(self):
         return f"{self.usuario.username} - {self.descripcion} ({self.fecha.strftime('%d/%m/%Y %H:%M')})"
@@ -43,7 +45,68 @@ class RegistroActividad(models.Model):
         verbose_name = "Registro de Actividad"
         verbose_name_plural = "Registros de Actividad"
         ordering = ['-fecha']
+        # Dashboard (últimos registros) y archivado por antigüedad filtran/ordenan por fecha
+        indexes = [models.Index(fields=['fecha'], name='sistema_reg_fecha_idx')]
 
     def __str__(self):
         return f"{self.fecha.strftime('%d/%m/%Y %H:%M')} - {self.usuario or 'Sistema'} - {self.descripcion[:60]}"
 >>>>>>> c9bd708 (cloude)
+
+
+class IndiceBusqueda(models.Model):
+    """
+    Documento de texto desnormalizado por objeto buscable (movimiento,
+    producto, proveedor). Sobre ``documento`` se mantiene un índice de texto
+    completo: FTS5 en SQLite y FULLTEXT en MySQL (ver ``sistema/busqueda.py``).
+    """
+    modelo = models.CharField(max_length=100)  # app_label.modelo
+    objeto_id = models.PositiveBigIntegerField()
+    documento = models.TextField()
+
+    class Meta:
+        verbose_name = "Índice de búsqueda"
+        verbose_name_plural = "Índice de búsqueda"
+        unique_together = ('modelo', 'objeto_id')
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id}"
+
+
+class TrabajoExportacion(models.Model):
+    """Exportación XLSX/CSV generada en segundo plano (ver ``sistema/exportaciones.py``)."""
+    ESTADOS = (
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('LISTO', 'Listo'),
+        ('ERROR', 'Error'),
+    )
+
+    tipo = models.CharField(max_length=50)  # clave del registro EXPORTACIONES
+    formato = models.CharField(max_length=10, default='xlsx')
+    filtros = models.JSONField(default=dict, blank=True)
+    huella = models.CharField(max_length=64, db_index=True)  # sha256 de tipo+formato+filtros+usuario
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    total = models.PositiveIntegerField(default=0)
+    procesadas = models.PositiveIntegerField(default=0)
+    archivo = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de exportación"
+        verbose_name_plural = "Trabajos de exportación"
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"{self.tipo}.{self.formato} ({self.get_estado_display()})"
+
+    @property
+    def porcentaje(self):
+        if self.estado == 'LISTO':
+            return 100
+        return int(self.procesadas * 100 / self.total) if self.total else 0
@@ -0,0 +1,118 @@
+# sistema/permisos.py
+"""
+Instantánea de permisos por usuario.
+
+``PermisosBackend`` reemplaza a ``ModelBackend`` (ver AUTHENTICATION_BACKENDS,
+donde ``ModelBackend`` sigue después por una versión para no cerrar las
+sesiones ya abiertas con él): autentica igual, pero el conjunto de permisos efectivos (propios + de sus
+grupos) se calcula una vez y se guarda en la caché compartida bajo la versión
+de permisos vigente (``sistema/versiones.py``). ``has_perm`` —lo que usan
+``permiso_requerido``, ``{{ perms }}`` en las plantillas y DRF— pasa a ser una
+búsqueda en un conjunto, sin consultas.
+
+Además se memoriza en el objeto usuario: dentro de un request la caché se
+consulta una sola vez aunque se apilen varios decoradores.
+
+Invalidación (al confirmarse la transacción):
+
+- cambios en los permisos de un grupo, o alta/baja de grupos y permisos:
+  todos los usuarios (``inicializar_permisos`` cae aquí);
+- cambios en los grupos o permisos directos de un usuario, o al guardarlo
+  (``is_superuser``/``is_active``): solo ese usuario.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from sistema import versiones
+
+
+FAMILIA = 'permisos'
+ACCIONES = ('post_add', 'post_remove', 'post_clear')
+
+
+def _calcular(user):
+    return sorted(ModelBackend.get_all_permissions(_backend, user))
+
+
+def instantanea(user):
+    """Permisos efectivos de ``user`` como frozenset de 'app_label.codename'."""
+    memo = getattr(user, '_permisos_instantanea', None)
+    if memo is None:
+        if transaction.get_connection().in_atomic_block:
+            # Dentro de una transacción puede haber cambios aún sin confirmar:
+            # ni se lee ni se escribe la caché compartida
+            permisos = _calcular(user)
+        else:
+            _, permisos = versiones.cacheado(FAMILIA, user.pk, lambda: _calcular(user))
+        memo = user._permisos_instantanea = frozenset(permisos)
+    return memo
+
+
+def _olvidar(user):
+    """Descarta lo memorizado en el objeto (puede seguir en uso, ej. request.user)."""
+    for atributo in ('_permisos_instantanea', '_perm_cache', '_user_perm_cache', '_group_perm_cache'):
+        user.__dict__.pop(atributo, None)
+
+
+class PermisosBackend(ModelBackend):
+    """ModelBackend con los permisos servidos desde la instantánea en caché."""
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return instantanea(user_obj)
+
+
+_backend = PermisosBackend()
+
+
+# ----------------------------------------------------------
+# INVALIDACIÓN
+# ----------------------------------------------------------
+def invalidar(*usuario_ids):
+    """Sin ids invalida a todos los usuarios."""
+    versiones.tocar(FAMILIA, *usuario_ids)
+
+
+Usuario = get_user_model()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def permisos_de_grupo(sender, action, **kwargs):
+    if action in ACCIONES:
+        invalidar()
+
+
+def _usuarios_afectados(instance, action, reverse, pk_set, **kwargs):
+    if action not in ACCIONES:
+        return
+    if not reverse:
+        invalidar(instance.pk)
+        _olvidar(instance)
+    elif pk_set:
+        invalidar(*pk_set)  # grupo.user_set.add(...) / permiso.user_set.add(...)
+    else:
+        invalidar()  # ...clear() desde el grupo/permiso: no sabemos a quiénes
+
+
+m2m_changed.connect(_usuarios_afectados, sender=Usuario.groups.through,
+                    dispatch_uid='permisos_grupos_usuario')
+m2m_changed.connect(_usuarios_afectados, sender=Usuario.user_permissions.through,
+                    dispatch_uid='permisos_directos_usuario')
+
+
+@receiver([post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Permission)
+def grupos_y_permisos(sender, **kwargs):
+    invalidar()
+
+
+@receiver(post_save, sender=Usuario)
+def usuario_guardado(sender, instance, created, **kwargs):
+    if not created:
+        invalidar(instance.pk)
+    _olvidar(instance)
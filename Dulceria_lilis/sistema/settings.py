@@ -83,6 +83,9 @@ MIDDLEWARE = [
 
 AUTHENTICATION_BACKENDS = [
     'axes.backends.AxesStandaloneBackend',  # ← AGREGAR PRIMERO
+    'sistema.permisos.PermisosBackend',  # ModelBackend con permisos en caché
+    # Se mantiene una versión más: las sesiones abiertas guardan la ruta de este
+    # backend y, si no está en la lista, Django las cierra. Quitar en la próxima
     'django.contrib.auth.backends.ModelBackend',
 ]
 
@@ -213,7 +216,16 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 SESSION_SAVE_EVERY_REQUEST = False
 
-SESSION_COOKIE_SECURE = False
+# HTTPS (DJANGO_HTTPS=True) detrás de un proxy que informa X-Forwarded-Proto.
+# Es requisito para que el navegador guarde las páginas autenticadas y las
+# revalide con ETag/304 (sistema/condicional.py): en HTTP van con no-store y
+# no se emite ETag (usuarios/middleware.py).
+HTTPS = os.getenv('DJANGO_HTTPS', 'False') == 'True'
+if HTTPS:
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+SESSION_COOKIE_SECURE = HTTPS
+CSRF_COOKIE_SECURE = HTTPS
 
 SESSION_COOKIE_SAME_SITE = 'Lax'
 
@@ -232,3 +244,28 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'yearshono@gmail.com'           # Tu cuenta de Gmail 
 EMAIL_HOST_PASSWORD = 'xdeaykdeezoyxrxq'          # Tu contraseña de aplicación 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Exportaciones en segundo plano (sistema/exportaciones.py)
+EXPORTACIONES_TTL = 10 * 60              # segundos que se reutiliza un archivo con los mismos filtros
+EXPORTACIONES_RETENCION = 24 * 60 * 60   # segundos que se guardan los archivos en MEDIA_ROOT/exports
+EXPORTACIONES_WORKERS = 2                # hilos que generan exportaciones por proceso
+
+# Caché (contadores del dashboard y otros datos derivados).
+# LocMem sirve para un solo proceso; con varios workers usar un backend
+# compartido, ej. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# y CACHE_LOCATION=cache_sistema (luego: python manage.py createcachetable).
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "dulceria-lilis"),
+    }
+}
+CONTADORES_RECUENTO = 5 * 60  # segundos entre recuentos exactos (COUNT) de los contadores
+
+# Registro de actividad por lotes (sistema/auditoria.py)
+AUDITORIA_TAMANO_LOTE = 200   # eventos acumulados antes de escribir
+AUDITORIA_INTERVALO = 2.0     # segundos máximos entre escrituras
+
+# Retención del registro de actividad (sistema/archivo_actividad.py)
+ACTIVIDAD_RETENCION_DIAS = 90   # días que quedan en la tabla; lo anterior va a archivo
+ACTIVIDAD_ARCHIVO_DIR = os.getenv("ACTIVIDAD_ARCHIVO_DIR", str(BASE_DIR / 'archivo' / 'actividad'))
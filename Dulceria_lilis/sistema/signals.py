@@ -1,8 +1,7 @@
 # sistema/signals.py
 from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
 from sistema.middleware import get_current_user
-from sistema.models import RegistroActividad
+from sistema import auditoria, contadores
 
 # Modelos que quieres auditar
 from usuarios.models import Usuario
@@ -10,59 +9,64 @@ from productos.models import Producto
 from proveedores.models import Proveedor
 from inventario.models import MovimientoInventario
 
+MODELOS_AUDITADOS = (Usuario, Producto, Proveedor, MovimientoInventario)
 
-# ===== SOLUCIÓN AL RECURSIÓN: bandera para evitar bucle infinito =====
-@receiver(post_save)
-def auditar_creacion_modificacion(sender, instance, created, **kwargs):
-    # IGNORAMOS completamente el modelo RegistroActividad
-    if sender == RegistroActividad:
-        return
 
-    # Evitamos registrar si no hay usuario autenticado
+def _usuario_auditable():
+    """Usuario del request en curso, o None si la acción no se audita."""
     user = get_current_user()
+    # Evitamos registrar si no hay usuario autenticado
     if not user or not user.is_authenticated:
-        return
-
+        return None
     # Evitamos registrar acciones del propio sistema o admin interno
     if getattr(user, 'is_staff', False) and user.username == 'admin':
+        return None
+    return user
+
+
+def _texto_movimiento(instance):
+    # El nombre del producto se completa al escribir el lote (una consulta por lote)
+    tipo, cantidad = instance.get_tipo_display(), instance.cantidad
+    return lambda producto: f"movimiento {tipo} de {cantidad} unidades del producto {producto.nombre if producto else '-'}"
+
+
+# ===== Solo los modelos auditados tienen receptor (antes: post_save global) =====
+def auditar_creacion_modificacion(sender, instance, created, **kwargs):
+    # Contadores del dashboard: antes de los filtros de auditoría (cuenta todo alta)
+    if created:
+        contadores.registrar_cambio(sender, 1)
+
+    user = _usuario_auditable()
+    if user is None:
         return
 
     # Construimos el mensaje según el modelo
+    producto_id = None
     if sender == Usuario:
-        # ❌ QUITAR ESTO: texto = f"usuario '{instance.username}' (Rol: {instance.get_rol_display()})"
-        # ✅ USAR ESTO:
         texto = f"usuario '{instance.username}' (Rol: {instance.rol or 'Sin rol'})"
     elif sender == Producto:
         texto = f"producto '{instance.sku}' - {instance.nombre}"
     elif sender == Proveedor:
         texto = f"proveedor '{instance.rut_nif}' - {instance.razon_social}"
-    elif sender == MovimientoInventario:
-        texto = f"movimiento {instance.get_tipo_display()} de {instance.cantidad} unidades del producto {instance.producto.nombre}"
     else:
-        texto = str(instance)
+        texto, producto_id = _texto_movimiento(instance), instance.producto_id
 
     accion = "creado" if created else "modificado"
+    prefijo = f"{sender.__name__} {accion}: "
+    descripcion = (lambda p: prefijo + texto(p)) if callable(texto) else prefijo + texto
 
-    # CREAMOS EL REGISTRO SIN DISPARAR MÁS SIGNALS
-    RegistroActividad.objects.bulk_create([
-        RegistroActividad(
-            usuario=user,
-            descripcion=f"{sender.__name__} {accion}: {texto}",
-            modelo=sender.__name__,
-            objeto_id=instance.pk
-        )
-    ], ignore_conflicts=True)
+    # Se encola: se escribe por lotes cuando la transacción se confirma
+    auditoria.registrar(user.pk, descripcion, sender.__name__, instance.pk, producto_id)
 
 
-@receiver(post_delete)
 def auditar_eliminacion(sender, instance, **kwargs):
-    if sender == RegistroActividad:
-        return
+    contadores.registrar_cambio(sender, -1)
 
-    user = get_current_user()
-    if not user or not user.is_authenticated:
+    user = _usuario_auditable()
+    if user is None:
         return
 
+    producto_id = None
     if sender == Usuario:
         texto = f"usuario '{instance.username}'"
     elif sender == Producto:
@@ -70,12 +74,15 @@ def auditar_eliminacion(sender, instance, **kwargs):
     elif sender == Proveedor:
         texto = f"proveedor '{instance.rut_nif}'"
     else:
-        texto = str(instance)
-
-    RegistroActividad.objects.bulk_create([
-        RegistroActividad(
-            usuario=user,
-            descripcion=f"{sender.__name__} eliminado: {texto}",
-            modelo=sender.__name__,
-        )
-    ], ignore_conflicts=True)
\ No newline at end of file
+        tipo, cantidad = instance.tipo, instance.cantidad
+        texto = lambda p: f"{tipo} - {p or '-'} - {cantidad}"
+        producto_id = instance.producto_id
+
+    prefijo = f"{sender.__name__} eliminado: "
+    descripcion = (lambda p: prefijo + texto(p)) if callable(texto) else prefijo + texto
+    auditoria.registrar(user.pk, descripcion, sender.__name__, producto_id=producto_id)
+
+
+for _modelo in MODELOS_AUDITADOS:
+    post_save.connect(auditar_creacion_modificacion, sender=_modelo, dispatch_uid=f'auditar_guardado_{_modelo.__name__}')
+    post_delete.connect(auditar_eliminacion, sender=_modelo, dispatch_uid=f'auditar_eliminacion_{_modelo.__name__}')
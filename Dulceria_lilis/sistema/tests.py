@@ -0,0 +1,215 @@
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+import openpyxl
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from productos.models import Producto
+from sistema import busqueda, contadores, exportaciones
+from sistema.models import IndiceBusqueda
+from usuarios.models import Usuario
+from utils import export_excel
+from utils.upsert import opciones_upsert
+
+
+def sin_objetivo_de_conflicto():
+    """Simula MySQL: ON DUPLICATE KEY UPDATE, sin ``unique_fields``."""
+    return mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False)
+
+
+class IndiceBusquedaTests(TestCase):
+
+    def crear_producto(self, sku='SKU-1', nombre='Chocolate Rosa'):
+        return Producto.objects.create(sku=sku, nombre=nombre, categoria='Dulces')
+
+    def test_guardar_crea_y_actualiza_el_documento(self):
+        producto = self.crear_producto()
+        self.assertEqual(list(busqueda.filtrar(Producto.objects.all(), 'choco ros')), [producto])
+
+        producto.nombre = 'Caramelo Menta'
+        producto.save()
+        self.assertEqual(IndiceBusqueda.objects.filter(modelo='productos.producto').count(), 1)
+        self.assertEqual(list(busqueda.filtrar(Producto.objects.all(), 'menta')), [producto])
+        self.assertFalse(busqueda.filtrar(Producto.objects.all(), 'choco').exists())
+
+    def test_busca_por_prefijo_de_palabra_no_por_trozos(self):
+        producto = self.crear_producto(sku='DUL-00123')
+        productos = Producto.objects.all()
+        for texto in ('choco', 'CHOCOLATE rosa', 'dul 00123', 'DUL-00123'):
+            with self.subTest(texto=texto):
+                self.assertEqual(list(busqueda.filtrar(productos, texto)), [producto])
+        # Cambio respecto del icontains anterior: los trozos del medio no se encuentran
+        for texto in ('ocolate', '0123', 'choco menta'):
+            with self.subTest(texto=texto):
+                self.assertFalse(busqueda.filtrar(productos, texto).exists())
+
+    def test_mysql_busca_palabras_cortas_y_vacias_fuera_del_indice(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(busqueda._indexadas(['de', 'choco', 'the', 'ro', 'sa', 'dul']), ['choco', 'dul'])
+
+    def test_motor_sin_texto_completo_busca_trozos(self):
+        producto = self.crear_producto(sku='DUL-00123')
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(busqueda._indexadas(['choco']), [])
+            self.assertEqual(list(busqueda.filtrar(Producto.objects.all(), 'ocolate 0123')), [producto])
+
+    def test_guardar_sin_objetivo_de_conflicto(self):
+        # Antes: NotSupportedError en cada save() de Producto/Proveedor/Movimiento con MySQL
+        with sin_objetivo_de_conflicto():
+            producto = self.crear_producto()
+        self.assertTrue(IndiceBusqueda.objects.filter(modelo='productos.producto', objeto_id=producto.pk).exists())
+
+    def test_opciones_validas_con_y_sin_objetivo(self):
+        for soporta in (True, False):
+            with self.subTest(supports_update_conflicts_with_target=soporta), \
+                    mock.patch.object(connection.features, 'supports_update_conflicts_with_target', soporta):
+                opciones = opciones_upsert(['modelo', 'objeto_id'], ['documento'])
+                self.assertEqual('unique_fields' in opciones, soporta)
+                # La misma validación que hace bulk_create antes de escribir
+                campos = IndiceBusqueda._meta.get_field
+                IndiceBusqueda.objects.all()._check_bulk_create_options(
+                    False, True,
+                    [campos(c) for c in opciones['update_fields']],
+                    [campos(c) for c in opciones.get('unique_fields', [])],
+                )
+
+
+class ExportacionesTests(TestCase):
+
+    def setUp(self):
+        self.ana = Usuario.objects.create_user('ana', 'ana@a.cl', 'x')
+        self.beto = Usuario.objects.create_user('beto', 'beto@a.cl', 'x')
+
+    def test_cada_usuario_tiene_su_trabajo(self):
+        # Antes: misma huella → el mismo trabajo (y archivo) para los dos
+        de_ana = exportaciones.solicitar('usuarios', 'csv', {}, self.ana)
+        self.assertEqual(exportaciones.solicitar('usuarios', 'csv', {}, self.ana), de_ana)
+        de_beto = exportaciones.solicitar('usuarios', 'csv', {}, self.beto)
+        self.assertNotEqual(de_beto, de_ana)
+        self.assertEqual(de_beto.usuario, self.beto)
+
+    def test_solo_el_dueno_consulta_y_descarga(self):
+        trabajo = exportaciones.solicitar('proveedores', 'csv', {}, self.ana)
+        estado = reverse('estado_exportacion', args=[trabajo.pk])
+        descarga = reverse('descargar_exportacion', args=[trabajo.pk])
+
+        self.client.force_login(self.beto)
+        self.assertEqual(self.client.get(estado).status_code, 404)
+        self.assertEqual(self.client.get(descarga).status_code, 404)
+
+        self.client.force_login(self.ana)
+        respuesta = self.client.get(estado)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['id'], trabajo.pk)
+
+
+class GenerarArchivoTests(TestCase):
+    """El XLSX/CSV escrito a mano se vuelve a leer con openpyxl / csv."""
+
+    def setUp(self):
+        self.creado = timezone.make_aware(datetime(2025, 1, 15, 13, 45))
+        Producto.objects.create(
+            sku='SKU-1', nombre='Caramelo\x01 <Ñandú> & "mix"\nsurtido', categoria='Dulces',
+            precio_venta=Decimal('1234.50'), fecha_vencimiento=date(2026, 3, 1), perishable=True,
+        )
+        Producto.objects.create(sku='SKU-2', nombre='Alfajor', categoria='Dulces')
+        Producto.objects.create(sku='SKU-3', nombre='Bombón', categoria='Dulces', precio_venta=Decimal('0.1'))
+        self.columnas = [
+            ('SKU', lambda p: p.sku),
+            ('Nombre', lambda p: p.nombre),
+            ('Precio', lambda p: p.precio_venta),
+            ('Vence', lambda p: p.fecha_vencimiento),
+            ('Creado', lambda p: self.creado),
+            ('Perecible', lambda p: p.perishable),
+        ]
+
+    def generar(self, formato):
+        # Bloques y muestra chicos para pasar por la lectura por bloques de pk
+        with mock.patch.object(export_excel, 'TAMANO_BLOQUE', 2), \
+                mock.patch.object(export_excel, 'FILAS_MUESTRA', 1):
+            return b''.join(export_excel.generar(self.columnas, Producto.objects.order_by('sku'), formato))
+
+    def test_xlsx_se_abre_con_openpyxl(self):
+        libro = openpyxl.load_workbook(io.BytesIO(self.generar('xlsx')))
+        filas = list(libro.active.iter_rows(values_only=True))
+
+        self.assertEqual(filas[0], ('SKU', 'Nombre', 'Precio', 'Vence', 'Creado', 'Perecible'))
+        self.assertEqual([f[0] for f in filas[1:]], ['SKU-1', 'SKU-2', 'SKU-3'])
+        sku1 = filas[1]
+        # El carácter de control (no válido en XML) se quita; el resto del texto queda igual
+        self.assertEqual(sku1[1], 'Caramelo <Ñandú> & "mix"\nsurtido')
+        self.assertEqual(sku1[2], 1234.5)
+        self.assertEqual(sku1[3], datetime(2026, 3, 1))
+        # Las fechas con zona se escriben en hora local
+        self.assertEqual(sku1[4], datetime(2025, 1, 15, 13, 45))
+        self.assertIs(sku1[5], True)
+        # None queda como celda vacía
+        self.assertEqual(filas[2][2:4], (None, None))
+        self.assertEqual(filas[3][2], 0.1)
+
+    def test_csv_ida_y_vuelta(self):
+        texto = self.generar('csv').decode('utf-8')
+        self.assertTrue(texto.startswith('\ufeff'))
+        filas = list(csv.reader(io.StringIO(texto[1:], newline='')))
+
+        self.assertEqual(filas[0], ['SKU', 'Nombre', 'Precio', 'Vence', 'Creado', 'Perecible'])
+        self.assertEqual(filas[1], [
+            'SKU-1', 'Caramelo\x01 <Ñandú> & "mix"\nsurtido', '1234.50', '01/03/2026', '15/01/2025 13:45', 'Sí',
+        ])
+        self.assertEqual(filas[2], ['SKU-2', 'Alfajor', '', '', '15/01/2025 13:45', 'No'])
+        self.assertEqual(filas[3][2], '0.10')
+        self.assertEqual(len(filas), 4)
+
+
+class ActividadTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(Usuario.objects.create_superuser('admin', 'admin@a.cl', 'x'))
+
+    def test_fecha_imposible_es_400(self):
+        url = reverse('actividad')
+        for fecha in ('2025-02-30', '30/02/2025'):
+            with self.subTest(desde=fecha):
+                self.assertEqual(self.client.get(url, {'desde': fecha}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'hasta': '2025-13-01'}).status_code, 400)
+
+        respuesta = self.client.get(url, {'desde': '2025-02-28', 'hasta': '2025-03-01'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('resultados', respuesta.json())
+
+
+class ContadoresTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_incremento_durante_el_recuento_no_se_pierde(self):
+        contar = Producto.objects.count
+
+        def count_con_alta_concurrente():
+            total = contar()
+            if not Producto.objects.exists():
+                # Otra terminal confirma un producto entre el COUNT y el set()
+                Producto.objects.bulk_create([Producto(sku='SKU-1', nombre='Chocolate', categoria='Dulces')])
+                contadores._sumar('productos', 1)
+            return total
+
+        with mock.patch.object(Producto.objects, 'count', side_effect=count_con_alta_concurrente):
+            total = contadores.contar('productos')
+        # Antes: el set() del recuento pisaba el incremento y quedaba en 0
+        self.assertEqual(total, 1)
+        self.assertEqual(contadores.obtener()['productos'], 1)
+
+    def test_incrementos_sobre_el_valor_contado(self):
+        self.assertEqual(contadores.obtener()['productos'], 0)
+        contadores._sumar('productos', 2)
+        contadores._sumar('productos', -1)
+        self.assertEqual(contadores.obtener()['productos'], 1)
@@ -16,6 +16,9 @@ urlpatterns = [
     path('inventario/', include('inventario.urls', namespace='inventario')),
     path('proveedores/', include('proveedores.urls', namespace='proveedores')),
     path('cambiar_clave/', views.cambiar_clave, name='cambiar_clave'),
+    path('exportaciones/<int:pk>/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:pk>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
+    path('actividad/', views.actividad, name='actividad'),
     path('api/', include('api.urls')),
     path('api/login/', obtain_auth_token, name='api_login'),
 ]
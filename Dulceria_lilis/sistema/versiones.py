@@ -0,0 +1,117 @@
+# sistema/versiones.py
+"""
+Sellos de versión en caché para datos derivados (consultas AJAX, ETags).
+
+Cada familia de datos (ej. ``lotes_producto``) tiene un sello general y,
+opcionalmente, uno por clave (ej. el id del producto). Ambos sólo crecen:
+
+- ``tocar(familia, clave)`` invalida una clave,
+- ``tocar(familia)`` invalida la familia completa (cargas masivas, conciliación).
+
+Los datos se guardan bajo una clave que incluye la versión vigente, así que
+invalidar no borra nada: las entradas viejas simplemente dejan de leerse y
+la caché las descarta al vencer.
+
+``aobtener``/``acacheado`` son las variantes para vistas asíncronas (usan la
+API asíncrona de la caché; ``acalcular`` es una corrutina).
+
+Si la caché pierde un sello (reinicio, desalojo) se vuelve a crear a partir
+del reloj en microsegundos, siempre mayor que cualquier valor anterior; por
+eso nunca se reutiliza una versión vieja.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+TTL = getattr(settings, 'VERSIONES_TTL', 60 * 60)  # vida de los datos cacheados
+
+
+def _clave(familia, clave=None):
+    return f'version:{familia}' if clave is None else f'version:{familia}:{clave}'
+
+
+def _inicial():
+    return time.time_ns() // 1000
+
+
+def _leer(claves):
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            inicial = _inicial()
+            # add() no pisa el sello si otro proceso lo creó al mismo tiempo
+            valores[clave] = inicial if cache.add(clave, inicial, timeout=None) else cache.get(clave, inicial)
+    return valores
+
+
+def obtener(familia, clave=None):
+    """Versión vigente de la familia (y de la clave, si se indica) como texto."""
+    claves = [_clave(familia)] if clave is None else [_clave(familia), _clave(familia, clave)]
+    valores = _leer(claves)
+    return '.'.join(str(valores[c]) for c in claves)
+
+
+def _incrementar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, _inicial(), timeout=None)
+
+
+def tocar(familia, *claves):
+    """Invalida las claves indicadas (o toda la familia) al confirmarse la transacción."""
+    objetivos = [_clave(familia, c) for c in set(claves)] if claves else [_clave(familia)]
+
+    def aplicar():
+        for objetivo in objetivos:
+            _incrementar(objetivo)
+
+    transaction.on_commit(aplicar)
+
+
+def cacheado(familia, clave, calcular, timeout=TTL):
+    """
+    Lectura con caché: devuelve ``(version, datos)``. ``calcular()`` solo se
+    ejecuta si no hay datos para la versión vigente.
+    """
+    # La versión se lee ANTES que la base: si alguien escribe mientras
+    # calculamos, su tocar() deja estos datos bajo una versión ya superada
+    version = obtener(familia, clave)
+    llave = f'datos:{familia}:{clave}:{version}'
+    datos = cache.get(llave)
+    if datos is None:
+        datos = calcular()
+        cache.set(llave, datos, timeout)
+    return version, datos
+
+
+# ----------------------------------------------------------
+# VARIANTES ASÍNCRONAS (vistas async bajo ASGI)
+# ----------------------------------------------------------
+async def _aleer(claves):
+    valores = await cache.aget_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            inicial = _inicial()
+            creado = await cache.aadd(clave, inicial, timeout=None)
+            valores[clave] = inicial if creado else await cache.aget(clave, inicial)
+    return valores
+
+
+async def aobtener(familia, clave=None):
+    claves = [_clave(familia)] if clave is None else [_clave(familia), _clave(familia, clave)]
+    valores = await _aleer(claves)
+    return '.'.join(str(valores[c]) for c in claves)
+
+
+async def acacheado(familia, clave, acalcular, timeout=TTL):
+    version = await aobtener(familia, clave)
+    llave = f'datos:{familia}:{clave}:{version}'
+    datos = await cache.aget(llave)
+    if datos is None:
+        datos = await acalcular()
+        await cache.aset(llave, datos, timeout)
+    return version, datos
@@ -1,13 +1,14 @@
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-from productos.models import Producto
-from proveedores.models import Proveedor
-from inventario.models import MovimientoInventario
-from usuarios.models import Usuario  # Modelo de usuario personalizado
 from sistema.models import RegistroActividad  # Modelo de actividad
+from sistema import archivo_actividad, contadores, exportaciones
+from inventario import vencimientos
 
 
 @login_required
@@ -19,11 +20,12 @@ def dashboard(request):
     else:
         visitas = request.session.get('visitas', 0)
 
-    # Totales
-    total_productos = Producto.objects.count()
-    total_proveedores = Proveedor.objects.count()
-    total_usuarios = Usuario.objects.count()
-    total_inventario = MovimientoInventario.objects.count()
+    # Totales (desde caché, mantenidos por señales; ver sistema/contadores.py)
+    totales = contadores.obtener()
+    total_productos = totales['productos']
+    total_proveedores = totales['proveedores']
+    total_usuarios = totales['usuarios']
+    total_inventario = totales['inventario']
 
     # Categorías para el gráfico
     categorias = ['Productos', 'Proveedores', 'Usuarios', 'Inventario']
@@ -53,6 +55,10 @@ def dashboard(request):
         'logs_recientes': logs_recientes,  # Para la tabla "Actividad reciente"
     }
 
+    # Vencimientos: se lee la foto diaria (manage.py snapshot_vencimientos)
+    if request.user.has_perm('inventario.view_lote'):
+        contexto['vencimientos'] = vencimientos.ultimo_resumen()
+
     return render(request, 'dashboard.html', contexto)
 
 
@@ -62,3 +68,75 @@ def cambiar_clave(request):
     request.session['productos'] = {'sku': 1}
     messages.success(request, 'Clave "productos" creada en la sesión.')
     return redirect('dashboard')
+
+
+# ----------------------------------------------------------
+# EXPORTACIONES EN SEGUNDO PLANO (avance y descarga)
+# ----------------------------------------------------------
+@login_required
+def estado_exportacion(request, pk):
+    trabajo = exportaciones.trabajo_de(request.user, pk)
+    if trabajo is None:
+        return JsonResponse({'error': 'Exportación no encontrada'}, status=404)
+    return JsonResponse(exportaciones.a_dict(trabajo))
+
+
+@login_required
+def descargar_exportacion(request, pk):
+    trabajo = exportaciones.trabajo_de(request.user, pk)
+    if trabajo is None:
+        raise Http404("Exportación no encontrada.")
+    if trabajo.estado != 'LISTO' or not trabajo.archivo:
+        raise Http404("La exportación no está lista.")
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=f"{trabajo.tipo}.{trabajo.formato}",
+    )
+
+
+# ----------------------------------------------------------
+# REGISTRO DE ACTIVIDAD (tabla + archivo)
+# ----------------------------------------------------------
+def _inicio_del_dia(texto):
+    """Inicio del día ``texto`` (YYYY-MM-DD); None si no viene. ValueError si no es una fecha."""
+    if not texto:
+        return None
+    fecha = parse_date(texto)  # ValueError en fechas imposibles (2025-02-30)
+    if fecha is None:
+        raise ValueError(texto)
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+@login_required
+def actividad(request):
+    """
+    Consulta JSON del registro de actividad, incluidos los registros ya
+    archivados. Parámetros: desde, hasta (YYYY-MM-DD, ambos inclusive),
+    usuario, modelo, q, archivo=1 (buscar también en el archivo), limite.
+    """
+    if not request.user.has_perm('sistema.view_registroactividad'):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    try:
+        desde = _inicio_del_dia(request.GET.get('desde'))
+        hasta = _inicio_del_dia(request.GET.get('hasta'))
+    except ValueError:
+        return JsonResponse({'error': 'Fecha inválida: use el formato AAAA-MM-DD.'}, status=400)
+    if hasta:
+        hasta += timedelta(days=1)
+    try:
+        limite = min(max(int(request.GET.get('limite', 100)), 1), 500)
+    except ValueError:
+        limite = 100
+
+    resultados = archivo_actividad.consultar(
+        desde=desde,
+        hasta=hasta,
+        usuario=request.GET.get('usuario') or None,
+        modelo=request.GET.get('modelo') or None,
+        texto=request.GET.get('q') or None,
+        limite=limite,
+        incluir_archivo=request.GET.get('archivo') == '1',
+    )
+    return JsonResponse({'resultados': resultados, 'total': len(resultados)})
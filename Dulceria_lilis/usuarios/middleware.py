@@ -1,15 +1,29 @@
 # usuarios/middleware.py
 from django.utils.deprecation import MiddlewareMixin
 
+from sistema import condicional
+
 
 class NoCacheAuthenticatedMiddleware(MiddlewareMixin):
     """
     Agrega headers anti-caché a TODAS las páginas de usuarios autenticados.
     Refuerza S-SES-02: evita volver atrás después de logout.
+
+    Excepción, solo en HTTPS (``condicional.revalidable``): las respuestas con
+    ETag (listados y consultas AJAX, ver ``sistema/condicional.py``) quedan en
+    caché privada pero se revalidan siempre; tras el logout la revalidación ya
+    no devuelve 304 y el logout pide al navegador borrar su caché
+    (``Clear-Site-Data``). En HTTP los navegadores ignoran ese header: todo va
+    con ``no-store`` y las páginas no emiten ETag.
     """
     def process_response(self, request, response):
-        if request.user.is_authenticated:
+        revalidable = response.has_header('ETag') and condicional.revalidable(request)
+        if request.user.is_authenticated and not revalidable:
             response['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
             response['Pragma'] = 'no-cache'
             response['Expires'] = '0'
+
+        match = getattr(request, 'resolver_match', None)
+        if match and match.view_name == 'usuarios:logout':
+            response['Clear-Site-Data'] = '"cache"'
         return response
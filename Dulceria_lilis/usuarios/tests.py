@@ -1,3 +1,53 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from usuarios.models import Usuario
+
+
+class NoCacheAuthenticatedTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('ana', 'ana@a.cl', 'x')
+        self.client.force_login(self.usuario)
+        self.url = reverse('inventario:productos_por_proveedor', args=[1])
+
+    def test_en_http_no_store_y_sin_etag(self):
+        # Clear-Site-Data no se aplica en HTTP: sin no-store se podría volver atrás tras el logout,
+        # y sin copia guardada el navegador nunca revalidaría un ETag
+        respuesta = self.client.get(self.url)
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertIn('no-store', respuesta['Cache-Control'])
+
+    def test_en_https_guarda_y_revalida_con_etag(self):
+        respuesta = self.client.get(self.url, secure=True)
+        self.assertNotIn('no-store', respuesta['Cache-Control'])
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        revalidada = self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag'], secure=True)
+        self.assertEqual(revalidada.status_code, 304)
+
+    def test_listado_solo_emite_etag_en_https(self):
+        self.client.force_login(Usuario.objects.create_superuser('admin', 'admin@a.cl', 'x'))
+        url = reverse('inventario:inicio')
+
+        respuesta = self.client.get(url)
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertIn('no-store', respuesta['Cache-Control'])
+
+        self.client.get(url, secure=True)  # deja la cookie CSRF, que es parte del ETag
+        respuesta = self.client.get(url, secure=True)
+        self.assertNotIn('no-store', respuesta['Cache-Control'])
+        revalidada = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'], secure=True)
+        self.assertEqual(revalidada.status_code, 304)
+
+
+class SesionesBackendTests(TestCase):
+
+    def test_sesion_abierta_con_model_backend_sigue_valida(self):
+        # Sesiones iniciadas antes de PermisosBackend guardan la ruta de ModelBackend
+        admin = Usuario.objects.create_superuser('admin', 'admin@a.cl', 'x')
+        self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+
+        respuesta = self.client.get(reverse('inventario:inicio'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.wsgi_request.user, admin)
@@ -2,10 +2,11 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
-from django.http import HttpResponse
 from .forms import UsuarioForm, PerfilForm
 from .models import Usuario
-from utils.export_excel import queryset_to_excel
+from utils.export_excel import FORMATOS, exportar_response
+from sistema import exportaciones
+from sistema.condicional import condicional
 
 # --- 💌 Recuperación de contraseña simplificada con SweetAlert ---
 from .models import Usuario
@@ -38,16 +39,38 @@ def perfil_editar(request):
     return render(request, "usuarios/perfil_editar.html", {"form": form})
 
 
-# 👥 LISTADO Y EXPORTACIÓN DE USUARIOS
-@login_required
-def usuario_list(request):
-    """
-    Lista con filtros (q, rol, estado) y formulario embebido para crear.
-    Los filtros se guardan en sesión para mantenerlos al recargar.
-    """
-    qs = Usuario.objects.all().order_by('username')
+# 📤 Filtros y columnas de exportación (compartidos con las exportaciones en segundo plano)
+COLUMNAS_USUARIOS = [
+    ("Username", lambda u: u.username),
+    ("Email", lambda u: u.email),
+    ("Nombre", lambda u: f"{u.nombres or ''} {u.apellidos or ''}".strip()),
+    ("Teléfono", lambda u: u.telefono or ""),
+    ("Rol", lambda u: u.rol),
+    ("Estado", lambda u: u.estado),
+    ("Área", lambda u: u.area or ""),
+    ("MFA habilitado", lambda u: "Sí" if u.mfa_habilitado else "No"),
+    ("Último acceso", lambda u: u.last_login),
+    ("Sesiones", lambda u: u.sesiones),
+]
 
-    # --- Obtener filtros desde GET o sesión ---
+
+def filtrar_usuarios(qs, q="", rol="", estado=""):
+    if q:
+        qs = qs.filter(username__icontains=q)
+    if rol:
+        qs = qs.filter(rol=rol)
+    if estado:
+        qs = qs.filter(estado=estado)
+    return qs
+
+
+def exportacion_usuarios(filtros):
+    """Columnas y queryset a exportar para los filtros del listado."""
+    return COLUMNAS_USUARIOS, filtrar_usuarios(Usuario.objects.all().order_by('username'), **filtros)
+
+
+def filtros_usuarios(request):
+    """Filtros efectivos (q, rol, estado): los del GET se guardan en sesión."""
     q = request.GET.get('q')
     rol = request.GET.get('rol')
     estado = request.GET.get('estado')
@@ -62,36 +85,31 @@ def usuario_list(request):
         request.session['f_q'] = q or ''
         request.session['f_rol'] = rol or ''
         request.session['f_estado'] = estado or ''
+    return {'q': q or '', 'rol': rol or '', 'estado': estado or ''}
+
+
+# 👥 LISTADO Y EXPORTACIÓN DE USUARIOS
+@login_required
+@condicional('usuarios', filtros=filtros_usuarios)
+def usuario_list(request):
+    """
+    Lista con filtros (q, rol, estado) y formulario embebido para crear.
+    Los filtros se guardan en sesión para mantenerlos al recargar.
+    """
+    qs = Usuario.objects.all().order_by('username')
+
+    # --- Obtener filtros desde GET o sesión ---
+    filtros = filtros_usuarios(request)
+    q, rol, estado = filtros['q'], filtros['rol'], filtros['estado']
 
     # --- Aplicar filtros ---
-    if q:
-        qs = qs.filter(username__icontains=q)
-    if rol:
-        qs = qs.filter(rol=rol)
-    if estado:
-        qs = qs.filter(estado=estado)
+    qs = filtrar_usuarios(qs, **filtros)
 
-    # 📤 Exportar a Excel
-    if request.GET.get("export") == "xlsx":
-        columns = [
-            ("Username", lambda u: u.username),
-            ("Email", lambda u: u.email),
-            ("Nombre", lambda u: f"{u.nombres or ''} {u.apellidos or ''}".strip()),
-            ("Teléfono", lambda u: u.telefono or ""),
-            ("Rol", lambda u: u.rol),
-            ("Estado", lambda u: u.estado),
-            ("Área", lambda u: u.area or ""),
-            ("MFA habilitado", lambda u: "Sí" if u.mfa_habilitado else "No"),
-            ("Último acceso", lambda u: u.last_login.replace(tzinfo=None) if u.last_login else ""),
-            ("Sesiones", lambda u: u.sesiones),
-        ]
-        raw, fname = queryset_to_excel("usuarios", columns, qs)
-        resp = HttpResponse(
-            raw,
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        resp["Content-Disposition"] = f'attachment; filename="{fname}"'
-        return resp
+    # 📤 Exportar a Excel/CSV
+    if request.GET.get("export") in FORMATOS:
+        if request.GET.get("segundo_plano"):
+            return exportaciones.responder(request, 'usuarios', request.GET["export"], filtros)
+        return exportar_response("usuarios", COLUMNAS_USUARIOS, qs, request.GET["export"])
 
     # --- Contexto ---
     form = UsuarioForm()
@@ -1,70 +1,264 @@
-from io import BytesIO
-from datetime import datetime
+"""
+Exportación de listados a XLSX / CSV en streaming.
+
+El archivo se genera mientras se envía (``StreamingHttpResponse``): las filas
+se leen de la base por bloques y se escriben directo al ZIP del XLSX (o al
+CSV), sin armar el libro completo en memoria. Así exportar 200 mil
+movimientos usa la misma memoria que exportar 200.
+
+Uso desde una vista:
+    columns = [("SKU", lambda p: p.sku), ("Nombre", lambda p: p.nombre)]
+    return exportar_response("productos", columns, qs, request.GET.get("export"))
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time
 from decimal import Decimal
+from itertools import chain, islice
+from xml.sax.saxutils import escape
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from openpyxl.utils import get_column_letter
 
 
-def queryset_to_excel(filename, columns, rows_iter):
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Datos"
-
-    # Estilos simples
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="44546A")
-    center = Alignment(horizontal="center", vertical="center")
-    thin = Side(style="thin", color="CCCCCC")
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-    # Encabezados
-    ws.append([h for (h, _) in columns])
-    for col_idx in range(1, len(columns) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center
-        cell.border = border
-
-    # Filas
-    rownum = 2
-    for obj in rows_iter:
-        row = []
+FORMATOS = ("xlsx", "csv")
+
+TAMANO_BLOQUE = 2000      # filas leídas de la base por consulta
+FILAS_MUESTRA = 200       # filas usadas para calcular el ancho de columnas
+ANCHO_MAXIMO = 50
+TAMANO_ENVIO = 64 * 1024  # bytes acumulados antes de entregar un trozo
+
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Caracteres de control que no se permiten en XML
+ILEGALES_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+# ----------------------------------------------------------
+# FILAS
+# ----------------------------------------------------------
+def _objetos(rows_iter):
+    """
+    Recorre el queryset por bloques de pk respetando su orden.
+    ``.iterator()`` no basta: con MySQL el driver igual trae todo el resultado
+    a memoria; leer primero solo los pk y luego los objetos por bloques sí
+    mantiene la memoria acotada en cualquier motor.
+    """
+    if not isinstance(rows_iter, QuerySet):
+        yield from rows_iter
+        return
+
+    pks = list(rows_iter.values_list("pk", flat=True).iterator(chunk_size=TAMANO_BLOQUE))
+    for i in range(0, len(pks), TAMANO_BLOQUE):
+        bloque = pks[i:i + TAMANO_BLOQUE]
+        objetos = rows_iter.order_by().in_bulk(bloque)
+        for pk in bloque:
+            if pk in objetos:
+                yield objetos[pk]
+
+
+def _valores(columns, rows_iter, al_avanzar=None):
+    for n, obj in enumerate(_objetos(rows_iter), start=1):
+        if al_avanzar and n % TAMANO_BLOQUE == 0:
+            al_avanzar(n)
+        fila = []
         for _, extractor in columns:
             try:
                 val = extractor(obj)
             except Exception:
                 val = ""
-            # Hint de formatos: fecha, Decimal, bool → Excel-friendly
-            if isinstance(val, datetime):
-                # openpyxl detecta datetime y Excel lo formatea como fecha
-                pass
-            elif isinstance(val, Decimal):
-                val = float(val)
-            elif val is None:
-                val = ""
-            row.append(val)
-        ws.append(row)
-        # bordes
-        for col_idx in range(1, len(columns) + 1):
-            ws.cell(row=rownum, column=col_idx).border = border
-        rownum += 1
-
-    # Auto ancho de columnas
-    for col_idx in range(1, len(columns) + 1):
-        col_letter = get_column_letter(col_idx)
-        max_len = 0
-        for cell in ws[col_letter]:
-            max_len = max(max_len, len(str(cell.value)) if cell.value is not None else 0)
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 50)
-
-    # Guardar a memoria
-    mem = BytesIO()
-    wb.save(mem)
-    mem.seek(0)
-
-    final_name = f"{filename}.xlsx"
-    return mem.read(), final_name
+            if isinstance(val, datetime) and timezone.is_aware(val):
+                val = timezone.localtime(val).replace(tzinfo=None)
+            fila.append("" if val is None else val)
+        yield fila
+
+
+def _texto(val):
+    if isinstance(val, datetime):
+        return val.strftime("%d/%m/%Y %H:%M")
+    if isinstance(val, date):
+        return val.strftime("%d/%m/%Y")
+    return str(val)
+
+
+# ----------------------------------------------------------
+# CSV
+# ----------------------------------------------------------
+class _Eco:
+    """Pseudo-archivo: ``csv.writer`` escribe y se devuelve la línea tal cual."""
+    def write(self, value):
+        return value
+
+
+def _csv(columns, rows_iter, al_avanzar=None):
+    writer = csv.writer(_Eco())
+    # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+    yield ("\ufeff" + writer.writerow([h for (h, _) in columns])).encode()
+    for fila in _valores(columns, rows_iter, al_avanzar):
+        yield writer.writerow([
+            val if isinstance(val, str) else ("Sí" if val is True else "No" if val is False else _texto(val))
+            for val in fila
+        ]).encode()
+
+
+# ----------------------------------------------------------
+# XLSX
+# ----------------------------------------------------------
+# Estilos (índice en cellXfs): 0 normal, 1 encabezado, 2 celda, 3 fecha-hora, 4 fecha
+ESTILOS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/><numFmt numFmtId="165" formatCode="dd/mm/yyyy"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font></fonts>
+<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill><fill><patternFill patternType="solid"><fgColor rgb="FF44546A"/><bgColor indexed="64"/></patternFill></fill></fills>
+<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border><border><left style="thin"><color rgb="FFCCCCCC"/></left><right style="thin"><color rgb="FFCCCCCC"/></right><top style="thin"><color rgb="FFCCCCCC"/></top><bottom style="thin"><color rgb="FFCCCCCC"/></bottom><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="5">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1"><alignment horizontal="center" vertical="center"/></xf>
+<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1"/>
+<xf numFmtId="165" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+ARCHIVOS_FIJOS = {
+    "[Content_Types].xml": """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>""",
+    "_rels/.rels": """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>""",
+    "xl/workbook.xml": """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets>
+</workbook>""",
+    "xl/_rels/workbook.xml.rels": """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>""",
+    "xl/styles.xml": ESTILOS_XML,
+}
+
+
+class _Salida:
+    """Destino del ZIP: acumula lo escrito hasta que el generador lo entrega."""
+    def __init__(self):
+        self.trozos = []
+        self.tamano = 0
+
+    def write(self, data):
+        self.trozos.append(bytes(data))
+        self.tamano += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        data = b"".join(self.trozos)
+        self.trozos, self.tamano = [], 0
+        return data
+
+
+def _celda(ref, val):
+    if val == "":
+        return ""
+    if isinstance(val, bool):
+        return f'<c r="{ref}" s="2" t="b"><v>{int(val)}</v></c>'
+    if isinstance(val, (int, float, Decimal)):
+        return f'<c r="{ref}" s="2"><v>{float(val)!r}</v></c>'
+    if isinstance(val, datetime):
+        return f'<c r="{ref}" s="3"><v>{(val - EPOCA_EXCEL).total_seconds() / 86400!r}</v></c>'
+    if isinstance(val, date):
+        return f'<c r="{ref}" s="4"><v>{(datetime.combine(val, time()) - EPOCA_EXCEL).days}</v></c>'
+    texto = escape(ILEGALES_XML.sub("", str(val)))
+    return f'<c r="{ref}" s="2" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(numero, letras, fila):
+    celdas = "".join(_celda(f"{letra}{numero}", val) for letra, val in zip(letras, fila))
+    return f'<row r="{numero}">{celdas}</row>'.encode()
+
+
+def _xlsx(columns, rows_iter, al_avanzar=None):
+    encabezados = [h for (h, _) in columns]
+    letras = [get_column_letter(i) for i in range(1, len(columns) + 1)]
+    filas = _valores(columns, rows_iter, al_avanzar)
+
+    # Ancho de columnas según una muestra de filas (no hay que releer todo al final)
+    muestra = list(islice(filas, FILAS_MUESTRA))
+    anchos = [len(h) for h in encabezados]
+    for fila in muestra:
+        for i, val in enumerate(fila):
+            anchos[i] = max(anchos[i], len(_texto(val)))
+    cols = "".join(
+        f'<col min="{i}" max="{i}" width="{min(ancho + 2, ANCHO_MAXIMO)}" customWidth="1"/>'
+        for i, ancho in enumerate(anchos, start=1)
+    )
+
+    salida = _Salida()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in ARCHIVOS_FIJOS.items():
+            zf.writestr(nombre, contenido)
+
+        with zf.open("xl/worksheets/sheet1.xml", "w") as hoja:
+            hoja.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols>{cols}</cols><sheetData>'.encode()
+            )
+            cabecera = "".join(
+                f'<c r="{letra}1" s="1" t="inlineStr"><is><t>{escape(h)}</t></is></c>'
+                for letra, h in zip(letras, encabezados)
+            )
+            hoja.write(f'<row r="1">{cabecera}</row>'.encode())
+
+            for numero, fila in enumerate(chain(muestra, filas), start=2):
+                hoja.write(_fila_xml(numero, letras, fila))
+                if salida.tamano >= TAMANO_ENVIO:
+                    yield salida.vaciar()
+
+            hoja.write(b"</sheetData></worksheet>")
+    yield salida.vaciar()
+
+
+# ----------------------------------------------------------
+# RESPUESTA
+# ----------------------------------------------------------
+def generar(columns, rows_iter, formato="xlsx", al_avanzar=None):
+    """
+    Generador de trozos de bytes del archivo. ``al_avanzar(n)`` se llama cada
+    ``TAMANO_BLOQUE`` filas escritas (lo usan las exportaciones en segundo plano).
+    """
+    if formato == "csv":
+        return _csv(columns, rows_iter, al_avanzar)
+    return _xlsx(columns, rows_iter, al_avanzar)
+
+
+def exportar_response(filename, columns, rows_iter, formato="xlsx"):
+    """
+    Devuelve un ``StreamingHttpResponse`` con el listado en ``formato``
+    ("xlsx" o "csv"). ``columns`` es una lista de (encabezado, extractor).
+    """
+    if formato not in FORMATOS:
+        formato = "xlsx"
+
+    resp = StreamingHttpResponse(generar(columns, rows_iter, formato), content_type=CONTENT_TYPES[formato])
+    resp["Content-Disposition"] = f'attachment; filename="{filename}.{formato}"'
+    return resp
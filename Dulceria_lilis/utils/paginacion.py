@@ -0,0 +1,125 @@
+from django.core import signing
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+SALT_CURSOR = "utils.paginacion.keyset"
+
+
+class PaginaKeyset:
+    """Página de resultados paginados por clave (fecha, id), sin COUNT ni OFFSET."""
+
+    def __init__(self, object_list, per_page, siguiente=None, anterior=None, total_aproximado=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.total_aproximado = total_aproximado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _firmar(obj, direccion):
+    return signing.dumps(
+        {"f": obj.fecha.isoformat(), "i": obj.pk, "d": direccion},
+        salt=SALT_CURSOR,
+        compress=True,
+    )
+
+
+def _leer(token):
+    """Devuelve (fecha, id, direccion) o None si el token es inválido."""
+    if not token:
+        return None
+    try:
+        datos = signing.loads(token, salt=SALT_CURSOR)
+        fecha = parse_datetime(datos["f"])
+        if fecha is None or datos["d"] not in ("n", "p"):
+            return None
+        return fecha, int(datos["i"]), datos["d"]
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def paginar_keyset(queryset, token, per_page):
+    """
+    Pagina ``queryset`` ordenado por (-fecha, -id) usando la última fila vista
+    como punto de partida: ``WHERE (fecha, id) < (f, i) ... LIMIT per_page + 1``.
+    Cualquier página cuesta lo mismo que la primera.
+    """
+    cursor = _leer(token)
+    qs = queryset.order_by("-fecha", "-pk")
+
+    if cursor is None:
+        filas = list(qs[:per_page + 1])
+        hay_mas = len(filas) > per_page
+        filas = filas[:per_page]
+        return PaginaKeyset(
+            filas, per_page,
+            siguiente=_firmar(filas[-1], "n") if hay_mas else None,
+        )
+
+    fecha, pk, direccion = cursor
+    if direccion == "n":
+        filas = list(
+            qs.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, pk__lt=pk))[:per_page + 1]
+        )
+        hay_mas = len(filas) > per_page
+        filas = filas[:per_page]
+        return PaginaKeyset(
+            filas, per_page,
+            siguiente=_firmar(filas[-1], "n") if hay_mas and filas else None,
+            anterior=_firmar(filas[0], "p") if filas else None,
+        )
+
+    # Hacia atrás: se recorre en orden ascendente y se invierte
+    filas = list(
+        queryset.order_by("fecha", "pk")
+        .filter(Q(fecha__gt=fecha) | Q(fecha=fecha, pk__gt=pk))[:per_page + 1]
+    )
+    hay_mas = len(filas) > per_page
+    filas = list(reversed(filas[:per_page]))
+    return PaginaKeyset(
+        filas, per_page,
+        siguiente=_firmar(filas[-1], "n") if filas else None,
+        anterior=_firmar(filas[0], "p") if hay_mas and filas else None,
+    )
+
+
+def estimar_total(modelo):
+    """
+    Total aproximado de filas de la tabla según las estadísticas del motor
+    (sin COUNT). Devuelve None si el motor no ofrece una estimación barata.
+    """
+    tabla = modelo._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [tabla],
+            )
+        elif connection.vendor == "sqlite":
+            # MAX(rowid) se resuelve con una búsqueda en el árbol de la tabla
+            cursor.execute(f'SELECT MAX(rowid) FROM "{tabla}"')
+        else:
+            return None
+        fila = cursor.fetchone()
+    return fila[0] if fila and fila[0] is not None else None
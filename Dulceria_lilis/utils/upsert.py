@@ -0,0 +1,17 @@
+from django.db import connection
+
+
+def opciones_upsert(unique_fields, update_fields):
+    """
+    Argumentos de ``bulk_create`` para insertar o actualizar según el motor.
+
+    SQLite necesita la restricción del conflicto (``ON CONFLICT (campos) DO
+    UPDATE``). MySQL no la acepta (Django lanza ``NotSupportedError`` si se
+    pasa ``unique_fields``): usa ``ON DUPLICATE KEY UPDATE``, que salta con
+    cualquier clave única de la tabla, así que quien llama debe haber
+    descartado antes los choques con las otras claves únicas.
+    """
+    opciones = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = unique_fields
+    return opciones